@@ -27,7 +27,7 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLI
 """
 
 import ScribusGeneratorBackend
-from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject, strip_sla_extension
 
 import tkinter
 from tkinter import Frame, LabelFrame, Label, Entry, Button, StringVar, OptionMenu, Checkbutton, IntVar, DISABLED, NORMAL, PhotoImage
@@ -71,14 +71,14 @@ class GeneratorControl:
             self.__scribusSourceFileEntryVariable.set(doc)
             self.__outputDirectoryEntryVariable.set(os.path.split(doc)[0])
             self.__dataSourceFileEntryVariable.set(
-                os.path.splitext(doc)[0]+".csv")
+                strip_sla_extension(doc)+".csv")
 
     def getDataSourceFileEntryVariable(self):
         return self.__dataSourceFileEntryVariable
 
     def dataSourceFileEntryVariableHandler(self):
         result = tkinter.filedialog.askopenfilename(title='Choose...', defaultextension='.csv', filetypes=[(
-            'CSV - comma separated values', '*.csv *.CSV'), ('TSV - tab separated values', '*.tsv *.TSV'), ('TXT - text', '*.txt *.TXT'), ('all', '*.*')], initialdir=os.path.dirname(self.__dataSourceFileEntryVariable.get()))
+            'CSV - comma separated values', '*.csv *.CSV'), ('TSV - tab separated values', '*.tsv *.TSV'), ('TXT - text', '*.txt *.TXT'), ('JSON - records array or JSON Lines', '*.json *.JSON *.jsonl *.ndjson'), ('all', '*.*')], initialdir=os.path.dirname(self.__dataSourceFileEntryVariable.get()))
         if result:
             self.__dataSourceFileEntryVariable.set(result)
         # todo: opt update separator to tab if tsv is selected?
@@ -88,7 +88,7 @@ class GeneratorControl:
 
     def scribusSourceFileEntryVariableHandler(self):
         result = tkinter.filedialog.askopenfilename(
-            title='Choose...', defaultextension='.sla', filetypes=[('SLA', '*.sla *.SLA')], initialdir=os.path.dirname(self.__scribusSourceFileEntryVariable.get()))
+            title='Choose...', defaultextension='.sla', filetypes=[('SLA', '*.sla *.SLA *.sla.gz')], initialdir=os.path.dirname(self.__scribusSourceFileEntryVariable.get()))
         if result:
             self.__scribusSourceFileEntryVariable.set(result)
 
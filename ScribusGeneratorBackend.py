@@ -26,17 +26,58 @@ Permission is hereby granted, free of charge, to any person obtaining a copy of
 THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
+import array
+import atexit
+import bisect
+import collections
+import collections.abc
+import concurrent.futures
+import contextlib
+import functools
 import csv
+import gzip
+import hashlib
+import io
+import itertools
+import mmap
 import os
+import pathlib
+import pickle
 import platform
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
 import logging
 import logging.config
+import logging.handlers
+import multiprocessing
 import sys
+import tarfile
 import xml.etree.ElementTree as ET
+from xml.parsers import expat
 import json
 import re
 import string, math
 
+try:
+    import resource
+
+except ImportError:
+    # not available on Windows, peak memory use is then not reported
+    resource = None
+
+try:
+    import sqlite3
+
+except ImportError:
+    # may be left out of the Python embedded by Scribus, SQLite data files are then not supported
+    sqlite3 = None
+
 
 class CONST:
     # Constants for general usage
@@ -48,6 +89,7 @@ class CONST:
     FORMAT_SLA = 'Scribus'
     FILE_EXTENSION_PDF = 'pdf'
     FILE_EXTENSION_SCRIBUS = 'sla'
+    FILE_EXTENSION_SCRIBUS_GZ = 'sla.gz'
     SEP_PATH = '/'  # In any case we use '/' as path separator on any platform
     SEP_EXT = os.extsep
     # CSV entry separator, comma by default; tab: " " is also common if using Excel.
@@ -69,18 +111,94 @@ class CONST:
     OUTPUTCOUNT_VAR = 'COUNT'
     # set to the minimum amount of numbers you want to force in the output files name counter. 3 leads to 001,002,...; default is 1, 
     OUTPUTCOUNT_FILL = 1
+    # size of the blocks read from JSON data files, that are decoded incrementally.
+    JSON_CHUNK_SIZE = 65536
+    # data rows between two rows whose byte offset is recorded in the index of a CSV file, see CSVIndex.
+    CSV_INDEX_STEP = 1024
+    # extensions of SQLite data files, whose records are selected by an SQL query.
+    SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+    # number of distinct data values whose XML encoding is kept for the following records.
+    ESCAPE_CACHE_SIZE = 4096
+    # number of distinct CSV values shared by the following records that repeat them.
+    SHARED_VALUES_SIZE = 4096
+    # number of processes generating files in parallel (not in merge mode), 0 to use all CPU cores.
+    JOBS = 1
+    # batches waiting for (or being processed by) each process, bounds memory use of parallel generation.
+    JOBS_QUEUE_SIZE = 4
+    # threads writing generated SLA files while the next ones are rendered, 0 writes them in turn.
+    WRITE_THREADS = 4
+    # SLA files waiting for (or being written by) the write threads, bounds the memory they hold.
+    WRITE_QUEUE_SIZE = 32
+    # Scribus executable, used to export PDF files in headless Scribus processes when not running within Scribus.
+    SCRIBUS_EXECUTABLE = 'scribus'
+    # script run by each headless Scribus process, and prefix of its replies.
+    PDF_EXPORT_SCRIPT = 'ScribusGeneratorPDFExport.py'
+    PDF_EXPORT_MARKER = 'ScribusGenerator-PDF-export: '
+    # seconds a headless Scribus process may take to export one PDF file, before it is killed (None for no limit).
+    PDF_EXPORT_TIMEOUT = 600
+    # directory of the cached analysis of templates, None for the cache directory of the user.
+    TEMPLATE_CACHE_DIR = None
+    # number of templates kept in cache, the least recently used are removed first.
+    TEMPLATE_CACHE_SIZE = 16
+    # file of the output directory recording the generated outputs, for incremental generation.
+    MANIFEST_FILE = '.ScribusGenerator-manifest.json'
+    # file of the output directory recording a completed shard of a template, for --check-shards.
+    SHARD_MANIFEST_FILE = '.ScribusGenerator-shard-%s-%s-of-%s.json'
+    # how documents are dealt out to the shards of a generation: 'contiguous' or 'round-robin'.
+    SHARD_MODE = 'contiguous'
+    # file of the output directory recording the outputs completed by a generation, for --resume.
+    CHECKPOINT_FILE = '.ScribusGenerator-checkpoint-%s.jsonl'
+    # SLA files exported to PDF at once when writing an archive, before being added to it & removed.
+    ARCHIVE_PDF_GROUP = 100
+    # gzip compression level of generated SLA files (.sla.gz), from 1 (fastest) to 9 (smallest). 0 writes plain SLA files.
+    COMPRESSION = 0
+    # compression level used when compression is asked for without a level.
+    GZIP_LEVEL = 6
+    # logger of the details of each batch of records (substitution, cleanup, output), disabled in logging.conf by default.
+    TRACE_LOGGER = 'ScribusGenerator.trace'
+    # when the trace logger is enabled, details are logged for 1 batch of records every LOG_TRACE_SAMPLE. 1 logs all batches, 0 none.
+    LOG_TRACE_SAMPLE = 100
+
+
+# Details of the generation of each batch, only logged for the batches sampled by
+# ScribusGenerator.is_traced() and when enabled in logging.conf.
+trace_log = logging.getLogger(CONST.TRACE_LOGGER)
+
 
 class ScribusGenerator:
     # Column headers (= keys of each data record)
     headers = []
 
+    # Characters of data values encoded into XML entities, at once by str.translate
+    # not all are needed as Scribus handles most UTF8 characters just fine.
+    XML_ENTITIES = str.maketrans({'&': '&amp;', '"': '&quot;', '<': '&lt;'})
+
     # The Generator Module has all the logic and will do all the work
     def __init__(self, dataObject):
         self.__dataObject = dataObject
-        
-        logging.config.fileConfig(os.path.join(os.path.abspath(
-            os.path.dirname(__file__)), 'logging.conf'
-        ))
+        # statistics of all generations run by this generator
+        self.stats = GenerationStats()
+        # whether details of the current batch of records are logged, see is_traced
+        self.trace = False
+        # data records given to run() instead of the data file, if any
+        self.__records = None
+        # output directories created by this run, see create_directory
+        self.__directories = set()
+        # documents to generate (numbered from 0) when not all of them, and (offset, count)
+        # of their records in the data range when contiguous, see prepare_data
+        self.__documents = None
+        self.__window = None
+        # key of the temporary files of a resumable run, see create_temp_file
+        self.__temp_key = None
+        # template whose variables are the only data fields read, see is_used_variable
+        self.__projection = None
+        # XML encoding of recent data values, see encode_scribus_xml
+        self.__encoded = {}
+        # files generated by the last run
+        self.outputs = []
+
+        if not _logging_configured:
+            configure_logging()
 
         # TODO: Check if logging works, if not warn user to configure log file path and disable.
         logging.info('ScribusGenerator initialized')
@@ -89,47 +207,357 @@ class ScribusGenerator:
         ))
 
 
-    def run(self):
+    def run(self, records=None, sink=None):
         # Read CSV/JSON data and replace the variables in the Scribus File with the corresponding data. Finally export to the specified format.
         # may throw exceptions if errors are met, use traceback to get all error details
+        # *records* is a list of data records (dicts) to use instead of the data file, if given.
+        # Generated files are written to the output *sink* instead of the output directory,
+        # if given (see write_outputs).
+        self.__records = records
+        self.outputs = []
+
+        # Load global configuration, output file name & Scribus source file (= SLA template file)
+        scribus_file = self.__dataObject.getScribusSourceFile()
+        analysis = self.prepare_template()
+
+        # Outputs generated previously (incremental generation only)
+        manifest = None
+
+        if self.__dataObject.getIncremental():
+            if sink is None:
+                manifest = self.load_manifest(scribus_file, analysis, self.get_shard())
+
+            else:
+                logging.warning('Incremental generation is not available when writing to an archive, generating all files.')
+
+        # Outputs completed by an interrupted run (resumed generation only)
+        checkpoint = None
+
+        if self.__dataObject.getResume():
+            if sink is not None or self.__dataObject.getSingleOutput():
+                logging.warning('Resuming is not available when writing to an archive or merging all records, generating all files.')
+
+            else:
+                checkpoint = self.load_checkpoint(scribus_file, analysis, manifest)
+
+        # Run core functions
+        # (1) Parse data file, its records are streamed during generation
+        (data, data_count) = self.prepare_data(analysis.records_in_document, checkpoint)
+
+        if sink is not None:
+            self.outputs = self.write_outputs(data, data_count, analysis, sink)
+            self.complete_shard(analysis, data_count, self.outputs)
+
+            return 1
+
+        try:
+            # (2) Generate SLA file(s) from template, using parsed data, after those of the interrupted run
+            output_filenames = [] if checkpoint is None else checkpoint.outputs()
+            resumed = len(output_filenames)
+            output_filenames += self.generate_templates(None, data, data_count, analysis, manifest, checkpoint=checkpoint)
+
+            # (3) Export them to PDF (if specified), but those exported by the interrupted run
+            if self.__dataObject.getOutputFormat() == CONST.FORMAT_PDF:
+                exported = [
+                    output_name for output_name in output_filenames
+                    if checkpoint is None or not checkpoint.is_exported(output_name, CONST.FILE_EXTENSION_PDF)
+                ]
+
+                # Build absolute paths for ..
+                # (1) .. SLA file & (2) .. PDF file
+                pdf_files = [(
+                    self.build_file_path(self.__dataObject.getOutputDirectory(), output_name, self.sla_extension()),
+                    self.build_file_path(self.__dataObject.getOutputDirectory(), output_name, CONST.FILE_EXTENSION_PDF)
+                ) for output_name in exported]
+
+                # Export templates to PDF
+                with self.stats.stage('pdf_export'):
+                    self.export_pdf_files(pdf_files, None if checkpoint is None else (
+                        lambda position: checkpoint.export(exported[position])
+                    ))
+
+            # (4) Remove them (if specified)
+            if (not self.__dataObject.getOutputFormat() == CONST.FORMAT_SLA) and (self.__dataObject.getKeepGeneratedScribusFiles() == CONST.FALSE):
+                for output_name in output_filenames:
+                    # Build absolute path for each SLA file
+                    sla_output_file = self.build_file_path(
+                        self.__dataObject.getOutputDirectory(), output_name, self.sla_extension()
+                    )
+
+                    # Delete temporary files, unless removed by the interrupted run
+                    if checkpoint is None or os.path.isfile(sla_output_file):
+                        os.remove(sla_output_file)
+
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+        # (5) Record generated outputs, and remove those of vanished data records (if specified)
+        if manifest is not None:
+            removed = manifest.remove_stale()
+            manifest.save()
+
+            logging.info('Incremental generation: %s file(s) generated, %s unchanged file(s) skipped, %s removed.' % (
+                len(output_filenames) - resumed, len(manifest.skipped), len(removed)
+            ))
+
+        self.outputs = [
+            self.build_file_path(self.__dataObject.getOutputDirectory(), output_name, extension)
+            for output_name in output_filenames for extension in self.output_extensions()
+        ]
+
+        # (6) Record the completion of this shard (if specified), with its unchanged outputs
+        self.complete_shard(analysis, data_count, [
+            output_name + CONST.SEP_EXT + extension
+            for output_name in output_filenames + (manifest.skipped if manifest is not None else [])
+            for extension in self.output_extensions()
+        ])
 
-        # Log options
+        # (7) Nothing left to resume
+        if checkpoint is not None:
+            checkpoint.remove()
+
+        return 1
+
+
+    def write_outputs(self, data, data_count, analysis, sink) -> list:
+        # Generate the files of run() to the output *sink*, returns their names in it.
+        # PDF files are exported from SLA files written to a temporary directory, by
+        # groups of CONST.ARCHIVE_PDF_GROUP, then written to the sink & removed: only
+        # a few of them are on disk at once.
+        extensions = self.output_extensions()
+
+        if self.__dataObject.getOutputFormat() != CONST.FORMAT_PDF:
+            return [
+                output_name + CONST.SEP_EXT + self.sla_extension()
+                for output_name in self.iterate_templates(None, data, data_count, analysis, sink=sink)
+            ]
+
+        directory = tempfile.mkdtemp(prefix='ScribusGenerator-')
+        names = []
+
+        try:
+            outputs = self.iterate_templates(None, data, data_count, analysis, sink=DirectorySink(directory))
+
+            for group in self.batch_records(outputs, CONST.ARCHIVE_PDF_GROUP):
+                with self.stats.stage('pdf_export'):
+                    self.export_pdf_files([(
+                        self.build_file_path(directory, output_name, self.sla_extension()),
+                        self.build_file_path(directory, output_name, CONST.FILE_EXTENSION_PDF)
+                    ) for output_name in group])
+
+                for output_name in group:
+                    for extension in extensions:
+                        with open(self.build_file_path(directory, output_name, extension), 'rb') as file:
+                            content = file.read()
+
+                        with self.stats.stage('file_write'):
+                            sink.write(output_name, content, extension)
+
+                        names.append(output_name + CONST.SEP_EXT + extension)
+
+                    for extension in (self.sla_extension(), CONST.FILE_EXTENSION_PDF):
+                        os.remove(self.build_file_path(directory, output_name, extension))
+
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        return names
+
+
+    def generate(self, records):
+        # Generate the SLA documents of the data *records* (dicts) without writing any
+        # file: yields (output_name, sla_bytes) pairs as they are rendered, named as
+        # by run(). Options of the data object apply, but the output directory and
+        # format: no PDF is exported. *records* are listed first, to be counted.
+        outputs = collections.deque()
+        sink = CallbackSink(lambda output_name, data, extension: outputs.append((output_name, data)))
+
+        for output_name in self.__generate(records, sink):
+            while outputs:
+                yield outputs.popleft()
+
+
+    def generate_to(self, records, sink) -> list:
+        # Same as generate(), each document being written to the output *sink* (see
+        # DirectorySink, ArchiveSink & CallbackSink), that is closed at the end.
+        # Returns the output names.
+        try:
+            return list(self.__generate(records, sink))
+
+        finally:
+            sink.close()
+
+
+    def __generate(self, records, sink):
+        self.__records = records if isinstance(records, list) else list(records)
+        analysis = self.prepare_template()
+        (data, data_count) = self.prepare_data(analysis.records_in_document)
+
+        return self.iterate_templates(None, data, data_count, analysis, sink=sink)
+
+
+    def prepare_template(self):
+        # TemplateAnalysis of the Scribus source file, along with the default output
+        # file name (merge-mode only).
         options_text = self.__dataObject.toString()
 
         logging.debug('Active options: %s%s' % (
             options_text[:1], options_text[172:]
         ))
 
-        # Load global configuration
         scribus_file = self.__dataObject.getScribusSourceFile()
+        self.__directories = set()
+        self.__documents = None
+        self.__window = None
+        self.__temp_key = None
+
+        if self.__dataObject.getSingleOutput() and self.get_shard() is not None:
+            logging.error('Sharding is not available when merging all records in a single output. Halting.')
+            raise ValueError('Shard of a merged output')
 
         # (1) Output file name
         if self.__dataObject.getSingleOutput() and self.__dataObject.getOutputFileName() is CONST.EMPTY:
             self.__dataObject.setOutputFileName(os.path.split(
-                os.path.splitext(scribus_file)[0])[1] + '__single'
+                strip_sla_extension(scribus_file))[1] + '__single'
             )
 
-        # (2) Scribus source file (= SLA template file)
+        # (2) Scribus source file (= SLA template file), analyzed or read from cache
+        with self.stats.stage('template_parse'):
+            analysis = self.load_template(scribus_file)
+
+        analysis.template.stats = self.stats
+        self.stats.count('templates')
+
+        # (3) Data fields used by neither the template nor the output file names are not read
+        self.__projection = analysis.template
+
+        return analysis
+
+
+    def prepare_data(self, records_in_document=1, checkpoint=None):
+        # Iterator over the data records, streamed during generation, and their number
+        # (None when not needed, see needs_data_count). The records of a shard, or left
+        # by an interrupted run (see load_checkpoint), are read from the first one of
+        # their documents, but the number is still the one of all records, for their numbering.
+        if not self.needs_data_count(checkpoint):
+            return (self.stats.iterate('data_parse', self.parse_data()), None)
+
+        with self.stats.stage('data_parse'):
+            data_count = self.count_data()
+
+        shard = self.get_shard()
+        documents = range(math.ceil(data_count / records_in_document))
+
+        if shard is not None:
+            documents = shard.batches(len(documents))
+
+        if checkpoint is not None:
+            completed = checkpoint.resume(documents)
+            documents = documents[completed:]
+
+        if shard is not None or checkpoint is not None:
+            self.__documents = documents
+
+            if documents.step == 1:
+                first = documents.start * records_in_document
+                self.__window = (first, max(min(documents.stop * records_in_document, data_count) - first, 0))
+
+        data = self.stats.iterate('data_parse', self.parse_data())
+
+        return (data, data_count)
+
+
+    def needs_data_count(self, checkpoint=None) -> bool:
+        # Whether the number of data records must be known before generating, which
+        # reads the data file once more: to number output file names, count the pages
+        # of a merged output, split the documents in shards or resume a generation.
+        output_file_name = self.__dataObject.getOutputFileName()
+
+        return (
+            self.__dataObject.getSingleOutput() or self.get_shard() is not None or checkpoint is not None
+            or output_file_name == CONST.EMPTY or '%VAR_' + CONST.OUTPUTCOUNT_VAR + '%' in output_file_name
+        )
+
+
+    def get_shard(self):
+        # Shard of the generation to run, None for all of it.
+        shard = self.__dataObject.getShard()
+
+        if not shard:
+            return None
+
+        try:
+            return Shard.parse(shard, self.__dataObject.getShardMode() or CONST.SHARD_MODE)
+
+        except ValueError as exception:
+            logging.error('Invalid shard %s: %s. Halting.' % (shard, exception))
+            raise
+
+
+    def complete_shard(self, analysis, data_count: int, outputs: list):
+        # Record the completion of the shard in the output directory, if sharded.
+        shard = self.get_shard()
+
+        if shard is None:
+            return
+
+        shard.write_manifest(
+            self.__dataObject.getOutputDirectory(), self.__dataObject.getScribusSourceFile(), analysis, data_count, outputs
+        )
+
+
+    def check_shards(self) -> list:
+        # Problems found in the shard manifests of the template in the output directory,
+        # none if all shards completed and generated each document once.
+        return Shard.check(self.__dataObject.getOutputDirectory(), self.__dataObject.getScribusSourceFile())
+
+
+    def load_template(self, scribus_file: str):
+        # TemplateAnalysis of the SLA template file, from the template cache when
+        # it has already been analyzed for the same options (and unless disabled).
+        # Settings are saved in the template file first if asked, which changes
+        # its content: the cached analysis is only used if it already holds them.
+        merge_mode = self.__dataObject.getSingleOutput()
+        serial = self.__dataObject.toString() if self.__dataObject.getSaveSettings() else None
+        cache = TemplateCache() if self.__dataObject.getTemplateCache() else None
+        keyed = cache is not None or self.__dataObject.getIncremental()
+
+        try:
+            key = (cache or TemplateCache()).key(scribus_file, merge_mode) if keyed else None
+
+        except IOError:
+            logging.error('Scribus SLA template file not found: %s' % scribus_file)
+
+            raise
+
+        analysis = cache.load(key) if cache is not None else None
+
+        if analysis is not None and (serial is None or analysis.settings == serial):
+            logging.info('Using cached analysis of Scribus SLA template file %s' % scribus_file)
+            logging.debug('Scribus SLA template file version is %s' % analysis.version)
+
+            return analysis
+
         logging.info('Parsing Scribus SLA template file %s' % scribus_file)
 
         try:
-            tree = ET.parse(scribus_file)
+            with open_sla(scribus_file) as file:
+                tree = ET.parse(file)
 
         except IOError as exception:
             logging.error('Scribus SLA template file not found: %s' % scribus_file)
 
             raise
 
-        # (3) SLA root element & template file version
+        # SLA root element & template file version
         root = tree.getroot()
         version = root.get('Version')
 
         logging.debug('Scribus SLA template file version is %s' % version)
 
-        # (4) Save settings
-        if self.__dataObject.getSaveSettings():
-            serial = self.__dataObject.toString()
-
+        # Save settings
+        if serial is not None:
             # TODO: as: %s' %serial)
             logging.debug('Saving current ScribusGenerator settings in your source file.')
 
@@ -150,52 +578,139 @@ class ScribusGenerator:
             storage_element.set('SCRIPT', serial)
 
             # TODO: bug race condition: check if scribus reloads (or overwrites :/ ) when doc is opened, opt use API to add a script if there's an open doc.
-            tree.write(scribus_file)
+            if is_gzip_file(scribus_file):
+                with gzip.open(scribus_file, 'wb') as file:
+                    tree.write(file)
 
-        # Run core functions
-        # (1) Parse data file & store its contents
-        data = self.parse_data()
+            else:
+                tree.write(scribus_file)
+
+            # keyed by the content of the file as written
+            if keyed:
+                key = (cache or TemplateCache()).key(scribus_file, merge_mode)
+
+        analysis = self.analyze_template(root)
+        analysis.key = key
+
+        if cache is not None:
+            cache.store(key, analysis)
+
+        return analysis
+
+
+    def analyze_template(self, root):
+        # TemplateAnalysis of the SLA *root* element, that is modified in the process.
+        # Only depends on the template & generation mode, not on the data.
+        merge_mode = self.__dataObject.getSingleOutput()
+
+        # Number of data records consumed by each instance of the template
+        root_string = ET.tostring(root, encoding=self.__dataObject.getCsvEncoding(), method='xml').decode()
+        records_in_document = 1 + root_string.count(CONST.NEXT_RECORD)
+        root_string = None
+
+        # Settings saved in the template, if any
+        storage_element = root.find('./DOCUMENT/JAVA[@NAME="' + CONST.STORAGE_NAME + '"]')
+        settings = storage_element.get('SCRIPT') if storage_element is not None else None
+
+        # Overwrite attributes from their /*/ItemAttribute[Parameter=SGAttribute] sibling, when applicable
+        template_element = self.overwrite_with_sg_attributes(root)
+
+        # Geometry of the pages & objects of each batch, computed from the template (merge-mode only)
+        geometry = MergeGeometry(template_element) if merge_mode else None
+
+        # Compile template once, each batch of records is then rendered from it
+        template = CompiledTemplate(
+            ET.tostring(template_element, method='xml').decode(), CONST.KEEP_TAB_LINEBREAK
+        )
+
+        return TemplateAnalysis(root.get('Version'), records_in_document, template, geometry, settings)
+
+
+    def load_manifest(self, scribus_file: str, analysis, shard=None):
+        # GenerationManifest of the outputs of *scribus_file* in the output directory.
+        directory = self.__dataObject.getOutputDirectory()
 
-        # (2) Generate SLA file(s) from template, using parsed data
-        output_filenames = self.generate_templates(root, data)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Files that must still be there for an output to be skipped
+        return GenerationManifest(
+            directory, scribus_file, analysis.key, self.output_options(), self.output_extensions(),
+            self.__dataObject.getSingleOutput(), shard
+        )
+
+
+    def load_checkpoint(self, scribus_file: str, analysis, manifest=None):
+        # GenerationCheckpoint of the generation of *scribus_file* in the output directory,
+        # with the outputs completed by a previous run of the same generation, if interrupted.
+        directory = self.__dataObject.getOutputDirectory()
+        shard = self.get_shard()
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        run_key = hashlib.sha256(json.dumps([
+            analysis.key, self.output_options(), self.data_digest(), None if shard is None else [shard.name, shard.mode]
+        ], sort_keys=True).encode('utf-8')).hexdigest()
+
+        checkpoint = GenerationCheckpoint(directory, scribus_file, run_key, self.sla_extension(), shard, manifest)
+        checkpoint.load()
+        self.__temp_key = checkpoint.temp_key
+
+        return checkpoint
+
+
+    def output_options(self) -> list:
+        # Options the outputs depend on, besides the template & data records.
+        return [
+            self.__dataObject.getOutputFileName(), self.__dataObject.getOutputFormat(),
+            self.__dataObject.getKeepGeneratedScribusFiles(), bool(self.__dataObject.getSingleOutput()),
+            self.__dataObject.getFirstRow(), self.__dataObject.getLastRow(),
+            self.__dataObject.getCsvSeparator(), self.__dataObject.getCsvEncoding(),
+            self.compression_level(), self.__dataObject.getDataQuery()
+        ]
+
+
+    def output_extensions(self) -> list:
+        # Extensions of the files kept for each output, as per the output format.
+        extensions = []
+
+        if self.__dataObject.getOutputFormat() == CONST.FORMAT_SLA or self.__dataObject.getKeepGeneratedScribusFiles() != CONST.FALSE:
+            extensions.append(self.sla_extension())
 
-        # (3) Export them to PDF (if specified)
         if self.__dataObject.getOutputFormat() == CONST.FORMAT_PDF:
-            for output_name in output_filenames:
-                # Build absolute paths for ..
-                # (1) .. SLA file
-                sla_output_file = self.build_file_path(
-                    self.__dataObject.getOutputDirectory(), output_name, CONST.FILE_EXTENSION_SCRIBUS
-                )
+            extensions.append(CONST.FILE_EXTENSION_PDF)
 
-                # (2) .. PDF file
-                pdf_output_file = self.build_file_path(
-                    self.__dataObject.getOutputDirectory(), output_name, CONST.FILE_EXTENSION_PDF
-                )
+        return extensions
 
-                # Export template to PDF
-                self.export_pdf(sla_output_file, pdf_output_file)
 
-                logging.info('PDF file created: %s' % pdf_output_file)
+    def sla_extension(self) -> str:
+        # Extension of the generated SLA files, compressed or not.
+        return CONST.FILE_EXTENSION_SCRIBUS_GZ if self.compression_level() else CONST.FILE_EXTENSION_SCRIBUS
 
-        # (4) Remove them (if specified)
-        if (not self.__dataObject.getOutputFormat() == CONST.FORMAT_SLA) and (self.__dataObject.getKeepGeneratedScribusFiles() == CONST.FALSE):
-            for output_name in output_filenames:
-                # Build absolute path for each SLA file
-                sla_output_file = self.build_file_path(
-                    self.__dataObject.getOutputDirectory(), output_name, CONST.FILE_EXTENSION_SCRIBUS
-                )
 
-                # Delete temporary files
-                os.remove(sla_output_file)
+    def compression_level(self) -> int:
+        # gzip compression level of the generated SLA files, 0 for none.
+        try:
+            level = int(self.__dataObject.getCompression() or CONST.COMPRESSION)
 
-        return 1
+        except (TypeError, ValueError):
+            logging.warning('Could not parse value of "compression" as an integer, writing uncompressed SLA files.')
+
+            return 0
+
+        return min(max(level, 0), 9)
 
 
     # Part I : PARSING DATA
 
     def parse_data(self):
-        # Parse data file
+        # Parse data file, returns an iterator over the data records of the
+        # selected range, read lazily from the data file.
+        # Records given to run() are used instead, if any.
+        if self.__records is not None:
+            return self.select_rows(self.project_rows(self.__records))
+
         data_file = self.__dataObject.getDataSourceFile()
 
         # (1) Check if data file exists
@@ -207,92 +722,275 @@ class ScribusGenerator:
         logging.debug('Parsing data file %s' % (data_file))
 
         # (2) Process data
-        data = []
+        data = iter([])
 
         # .. depending on file type
         extension = os.path.splitext(data_file)[1]
 
         if extension == '.json':
             # .. from JSON file
-            data = self.load_json(data_file)
+            data = self.select_rows(self.project_rows(self.load_json(data_file)))
+
+        if extension in ('.jsonl', '.ndjson'):
+            # .. from JSON Lines file
+            data = self.select_rows(self.project_rows(self.load_json_lines(data_file)))
 
         # (3) Load data
         if extension == '.csv':
-            # .. from CSV file
-            data = self.load_csv(data_file)
-            logging.debug(data)
-
-            if len(data) < 1:
-                logging.error(
-                    'Data file %s has only one line or is empty. ' +
-                    'At least a header line and a line of data is needed. Halting.' % (
-                        data_file
-                    )
-                )
+            # .. from CSV file, read from the first row of the range when it is indexed
+            index = self.load_csv_index(data_file)
 
-                return -1
+            if index is None:
+                data = self.select_rows(self.load_csv(data_file))
 
-            # Determine data range
-            # (1) First item
-            first_item = 1
-            first_row = self.__dataObject.getFirstRow()
+            else:
+                (first_item, last_item) = self.get_data_range()
+                data = self.load_csv(data_file, index, first_item)
 
-            if first_row != CONST.EMPTY:
-                try:
-                    new_first_item_value = int(first_row)
+                if last_item is not None:
+                    data = itertools.islice(data, last_item - first_item + 1)
 
-                    # Guard against 0 or negative numbers
-                    first_item = max(new_first_item_value, 1)
+        if extension in CONST.SQLITE_EXTENSIONS:
+            # .. from SQLite database, the data range is selected by the query itself
+            data = self.load_sqlite(data_file)
 
-                except:
-                    logging.warning(
-                        'Could not parse value of "first row" as an integer, ' +
-                        'using default value instead.'
-                    )
+        return data
 
-            # (2) Last item
-            last_item = len(data)
-            last_row = self.__dataObject.getLastRow()
 
-            if last_row != CONST.EMPTY:
-                try:
-                    new_last_item_value = int(last_row)
+    def is_used_variable(self, name: str) -> bool:
+        # Whether the data field *name* is substituted in the prepared template or in
+        # the output file names. All fields are used until a template is prepared.
+        if self.__projection is None:
+            return True
 
-                    # Guard against numbers higher than the length of data
-                    last_item = min(new_last_item_value, last_item)
+        return ('%VAR_' + name + '%') in self.__dataObject.getOutputFileName() or self.__projection.uses_variable(name)
 
-                except:
-                    logging.warning(
-                        'Could not parse value of "last row" as an integer, ' +
-                        'using default value instead.'
-                    )
 
-            # (3) Apply data range (if needed)
-            if first_item != 1 or last_item != len(data):
-                logging.debug(
-                    'Custom data range is: %s - %s' % (first_item, last_item)
+    def project_rows(self, rows):
+        # Generator of the DataRecords of the data *rows* (dicts), restricted to their
+        # used fields, decided once for each field name. Records with the same fields
+        # share their index.
+        used = {}
+        indexes = {}
+
+        for row in rows:
+            for name in row:
+                if name not in used:
+                    used[name] = self.is_used_variable(name)
+
+            names = tuple(name for name in row if used[name])
+            index = indexes.get(names)
+
+            if index is None:
+                index = indexes[names] = DataRecord.index(names)
+
+            yield DataRecord(index, tuple(row[name] for name in names))
+
+
+    def data_digest(self) -> str:
+        # Hash of all the data records, from the data file or given to run().
+        if self.__records is not None:
+            return hashlib.sha256(json.dumps(self.__records, sort_keys=True).encode('utf-8')).hexdigest()
+
+        return _file_digest(self.__dataObject.getDataSourceFile()).hexdigest()
+
+
+    def count_data(self) -> int:
+        # Number of data records in the selected range, streaming once through
+        # the data file without keeping its records, or counted by SQLite.
+        if self.__records is None and os.path.splitext(self.__dataObject.getDataSourceFile())[1] in CONST.SQLITE_EXTENSIONS:
+            return self.count_sqlite(self.__dataObject.getDataSourceFile())
+
+        # known from the index of a CSV file
+        index = self.load_csv_index(self.__dataObject.getDataSourceFile()) if self.__records is None else None
+
+        if index is not None:
+            (first_item, last_item) = self.get_data_range()
+
+            return max(min(index.count, last_item if last_item is not None else index.count) - first_item + 1, 0)
+
+        # rows of a CSV file are counted without building their records
+        data_file = self.__dataObject.getDataSourceFile()
+
+        if self.__records is None and os.path.splitext(data_file)[1] == '.csv' and os.path.isfile(data_file):
+            return self.count_csv(data_file)
+
+        count = 0
+
+        for item in self.parse_data():
+            count += 1
+
+        return count
+
+
+    def get_data_range(self):
+        # Determine data range, as (first, last) 1-based inclusive row numbers.
+        # last is None when all rows up to the end of the data are used.
+        # (1) First item
+        first_item = 1
+        first_row = self.__dataObject.getFirstRow()
+
+        if first_row != CONST.EMPTY:
+            try:
+                new_first_item_value = int(first_row)
+
+                # Guard against 0 or negative numbers
+                first_item = max(new_first_item_value, 1)
+
+            except:
+                logging.warning(
+                    'Could not parse value of "first row" as an integer, ' +
+                    'using default value instead.'
                 )
 
-                data = data[first_item - 1:last_item]
+        # (2) Last item
+        last_item = None
+        last_row = self.__dataObject.getLastRow()
 
-            else:
-                logging.debug('Full data range will be used.')
+        if last_row != CONST.EMPTY:
+            try:
+                # Guard against numbers lower than the first row
+                last_item = max(int(last_row), first_item - 1)
 
-        return data
+            except:
+                logging.warning(
+                    'Could not parse value of "last row" as an integer, ' +
+                    'using default value instead.'
+                )
 
+        # (3) Records of the documents to generate, once counted (see prepare_data)
+        if self.__window is not None:
+            (offset, count) = self.__window
+            first_item += offset
+            last_item = first_item + count - 1
 
-    def load_json(self, json_file: str) -> list:
-        try:
-            with open(json_file, 'r') as file:
-                return json.load(file)
+        return (first_item, last_item)
 
-        except json.decoder.JSONDecodeError:
-            raise
 
-        return []
+    def select_rows(self, rows):
+        # Apply data range (if needed) while streaming the *rows* iterator,
+        # reading stops as soon as the last row of the range is passed.
+        (first_item, last_item) = self.get_data_range()
+
+        if first_item != 1 or last_item is not None:
+            logging.debug(
+                'Custom data range is: %s - %s' % (first_item, last_item if last_item is not None else 'end')
+            )
+
+            return itertools.islice(rows, first_item - 1, last_item)
+
+        logging.debug('Full data range will be used.')
+
+        return rows
+
+
+    def load_json(self, json_file: str):
+        # Generator of the records of a JSON file holding an array of records,
+        # array elements are decoded one by one from a buffered read of the file.
+        # Malformed arrays raise the ValueError (JSONDecodeError) json.load() would.
+        decoder = json.JSONDecoder()
+        whitespace = re.compile(r'\s*')
+
+        with open(json_file, 'r', encoding=self.__dataObject.getCsvEncoding()) as file:
+            buffer = ''
+            eof = False
+
+            def read_more():
+                # read more & drop consumed content
+                nonlocal buffer, position, eof
+
+                chunk = file.read(CONST.JSON_CHUNK_SIZE)
+                eof = (chunk == '')
+                buffer = buffer[position:] + chunk
+                position = 0
+
+            # skip leading whitespace, up to the first JSON value
+            while not (buffer or eof):
+                chunk = file.read(CONST.JSON_CHUNK_SIZE)
+                eof = (chunk == '')
+                buffer = chunk.lstrip()
+
+            position = 0
+
+            # a single record, not wrapped in an array
+            if not buffer.startswith('['):
+                item = json.loads(buffer + file.read())
+
+                if item:
+                    yield item
+
+                return
+
+            position += 1
+            # elements are separated by exactly one ',', with none after the last one
+            expect_value = True
+            first = True
+
+            while True:
+                position = whitespace.match(buffer, position).end()
+
+                if position == len(buffer) and not eof:
+                    read_more()
+
+                    continue
+
+                if not expect_value or (first and buffer.startswith(']', position)):
+                    if buffer.startswith(']', position):
+                        # nothing but whitespace may follow the array
+                        rest = buffer[position + 1:] + file.read()
+
+                        if rest.strip():
+                            raise json.decoder.JSONDecodeError('Extra data', rest, len(rest) - len(rest.lstrip()))
+
+                        return
+
+                    if not buffer.startswith(',', position):
+                        raise json.decoder.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+
+                    position += 1
+                    expect_value = True
+
+                    continue
+
+                try:
+                    (item, end) = decoder.raw_decode(buffer, position)
+
+                    # a value at the very end of the buffer may be truncated (eg numbers)
+                    if end == len(buffer) and not eof:
+                        raise json.decoder.JSONDecodeError('Truncated value', buffer, end)
+
+                except json.decoder.JSONDecodeError:
+                    if eof:
+                        raise
+
+                    read_more()
+
+                    continue
 
+                position = end
+                expect_value = first = False
 
-    def load_csv(self, csv_file: str) -> list:
+                if item:
+                    yield item
+
+
+    def load_json_lines(self, json_file: str):
+        # Generator of the records of a JSON Lines file, one JSON record per line
+        with open(json_file, 'r', encoding=self.__dataObject.getCsvEncoding()) as file:
+            for line in file:
+                if line.strip():
+                    item = json.loads(line)
+
+                    if item:
+                        yield item
+
+
+    def load_csv(self, csv_file: str, index=None, first_item=1):
+        # Generator of the CSV file records, one DataRecord per line, holding only the
+        # columns used (see is_used_variable). Like csv.DictReader, missing values
+        # are None and the last of duplicate columns wins. Repeated values are
+        # shared by the records kept in memory, from SHARED_VALUES_SIZE values of this file.
+        # Records start at data row *first_item*, found from the CSVIndex *index*.
         # Determine CSV options
         encoding = self.__dataObject.getCsvEncoding()
         delimiter = self.__dataObject.getCsvSeparator()
@@ -300,602 +998,3654 @@ class ScribusGenerator:
         # Load file contents
         with open(csv_file, newline='', encoding=encoding) as file:
             # Parse CSV data
-            reader = csv.DictReader(file, delimiter=delimiter, skipinitialspace=True, doublequote=True)
+            reader = csv.reader(file, delimiter=delimiter, skipinitialspace=True, doublequote=True)
+            headers = next(reader, None)
+
+            if headers is None:
+                return
+
+            columns = {}
+
+            for (position, name) in enumerate(headers):
+                if self.is_used_variable(name):
+                    columns[name] = position
+
+            fields = DataRecord.index(columns)
+            positions = tuple(columns.values())
+            # not sys.intern: interned strings are kept until the process ends (Python 3.12+)
+            shared = {}
+
+            if index is not None:
+                reader = index.rows(first_item)
 
             # Filter empty lines
-            return [item for item in list(reader) if item]
+            for row in reader:
+                if row:
+                    size = len(row)
+                    values = []
 
+                    for position in positions:
+                        if position >= size:
+                            values.append(None)
+                            continue
 
-    # Part II : GENERATING TEMPLATE FILES
+                        value = row[position]
+                        value = shared.setdefault(value, value)
 
-    def generate_templates(self, root, data: list) -> list:
-        # Define variables (for later use)
-        merge_mode = self.__dataObject.getSingleOutput()
+                        if len(shared) > CONST.SHARED_VALUES_SIZE:
+                            shared.clear()
 
-        # Check number of data records being consumed by Scribus source file
-        # (1) Determine total of data records
-        data_count = len(data)
+                        values.append(value)
 
-        # (2) Store number of data records in template document
-        root_string = ET.tostring(root, encoding=self.__dataObject.getCsvEncoding(), method='xml').decode()
-        records_in_document = 1 + root_string.count(CONST.NEXT_RECORD)
+                    yield DataRecord(fields, tuple(values))
+
+
+    def count_csv(self, csv_file: str) -> int:
+        # Number of records load_csv() would yield in the selected range.
+        with open(csv_file, newline='', encoding=self.__dataObject.getCsvEncoding()) as file:
+            reader = csv.reader(file, delimiter=self.__dataObject.getCsvSeparator(), skipinitialspace=True, doublequote=True)
+
+            if next(reader, None) is None:
+                return 0
+
+            count = 0
+
+            for row in self.select_rows(row for row in reader if row):
+                count += 1
+
+            return count
+
+
+    def load_csv_index(self, csv_file: str):
+        # CSVIndex of *csv_file*, if enabled and useful: when the data range does not
+        # start at the first row. Built & stored the first time, or if the file changed.
+        if self.__dataObject.getCsvIndex() == CONST.FALSE or not os.path.isfile(csv_file):
+            return None
+
+        if self.get_data_range()[0] == 1:
+            return None
+
+        index = CSVIndex(csv_file, self.__dataObject.getCsvEncoding(), self.__dataObject.getCsvSeparator())
+
+        if index.load():
+            return index
+
+        if not index.build():
+            return None
+
+        index.store()
+
+        return index
+
+
+    def load_sqlite(self, db_file: str):
+        # Generator of the records selected from a SQLite database, streamed from a
+        # cursor: only the columns used (see is_used_variable) and the rows of the
+        # data range are read, by LIMIT & OFFSET. NULL values are empty.
+        connection = self.connect_sqlite(db_file)
+
+        try:
+            source = self.sqlite_source(connection, db_file)
+            description = connection.execute('SELECT * FROM (\n%s\n) LIMIT 0' % source).description
+            columns = dict.fromkeys(column[0] for column in description if self.is_used_variable(column[0]))
+
+            (limit, offset) = self.sqlite_range()
+            cursor = connection.execute('SELECT %s FROM (\n%s\n) LIMIT ? OFFSET ?' % (
+                ', '.join(self.quote_sql(name) for name in columns) or 'NULL', source
+            ), (limit, offset))
+
+            index = DataRecord.index(columns)
+            size = len(columns)
+
+            for row in cursor:
+                yield DataRecord(index, tuple('' if value is None else str(value) for value in row[:size]))
+
+        finally:
+            connection.close()
+
+
+    def count_sqlite(self, db_file: str) -> int:
+        # Number of records load_sqlite() would yield, counted by SQLite
+        connection = self.connect_sqlite(db_file)
+
+        try:
+            return connection.execute('SELECT COUNT(*) FROM (SELECT NULL FROM (\n%s\n) LIMIT ? OFFSET ?)' % (
+                self.sqlite_source(connection, db_file)
+            ), self.sqlite_range()).fetchone()[0]
+
+        finally:
+            connection.close()
+
+
+    def connect_sqlite(self, db_file: str):
+        # read-only connection to the SQLite database *db_file*
+        if sqlite3 is None:
+            logging.error('SQLite data files are not supported by this Python installation: %s' % db_file)
+            raise RuntimeError('No sqlite3 module to read %s' % db_file)
+
+        return sqlite3.connect(pathlib.Path(os.path.abspath(db_file)).as_uri() + '?mode=ro', uri=True)
+
+
+    def sqlite_source(self, connection, db_file: str) -> str:
+        # SQL query of the data records, used as a subquery on lines of its own (a
+        # trailing comment does not hide what follows): the data query option, or
+        # all the rows of the table (or view) it names, otherwise all the rows of
+        # the only table (or view) of the database.
+        query = (self.__dataObject.getDataQuery() or CONST.EMPTY).strip()
+        tables = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"
+        )]
+
+        if query in tables:
+            return 'SELECT * FROM ' + self.quote_sql(query)
+
+        if query:
+            return self.strip_sql_end(query)
+
+        if len(tables) != 1:
+            logging.error(
+                'SQLite database %s holds %s tables, ' % (db_file, len(tables)) +
+                'a query is needed to select the data records. Halting.'
+            )
+            raise ValueError('No query for SQLite database %s' % db_file)
+
+        return 'SELECT * FROM ' + self.quote_sql(tables[0])
+
+
+    def sqlite_range(self) -> tuple:
+        # (LIMIT, OFFSET) of the rows of the data range
+        (first_item, last_item) = self.get_data_range()
+
+        logging.debug(
+            'Data range is: %s - %s' % (first_item, last_item if last_item is not None else 'end')
+        )
+
+        return (last_item - first_item + 1 if last_item is not None else -1, first_item - 1)
+
+
+    def quote_sql(self, name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+
+    def strip_sql_end(self, query: str) -> str:
+        # *query* without the ';' ending it and the comments that may follow, which
+        # can not be in a subquery. Left as is if other statements follow.
+        for match in re.finditer(';', query):
+            end = match.start()
+
+            if sqlite3.complete_statement(query[:end + 1]):
+                return query[:end] if self.is_sql_comment(query[end + 1:]) else query
+
+        return query
+
+
+    def is_sql_comment(self, text: str) -> bool:
+        # Whether *text* only holds SQL comments, whitespace & empty statements.
+        text = text.strip()
+
+        while text:
+            if text.startswith(';'):
+                text = text[1:]
+
+            elif text.startswith('--'):
+                (comment, newline, text) = text.partition('\n')
+
+            elif text.startswith('/*') and '*/' in text:
+                text = text[text.index('*/') + 2:]
+
+            else:
+                return False
+
+            text = text.strip()
+
+        return True
+
+
+    # Part II : GENERATING TEMPLATE FILES
+
+    def generate_templates(self, root, data, data_count=None, analysis=None, manifest=None, sink=None, checkpoint=None) -> list:
+        # Names of the outputs generated by iterate_templates()
+        return list(self.iterate_templates(root, data, data_count, analysis, manifest, sink, checkpoint))
+
+
+    def iterate_templates(self, root, data, data_count=None, analysis=None, manifest=None, sink=None, checkpoint=None):
+        # *data* is any iterable of data records, consumed only once. Its length
+        # *data_count* is needed beforehand (see needs_data_count), it defaults
+        # to len(data) when not given and *data* has one. The template is the
+        # SLA *root* element, or its *analysis* when already available. Outputs
+        # that are current in the GenerationManifest *manifest* are skipped, and
+        # not returned, the generated ones are recorded in it. Outputs completed
+        # (generated or skipped) are recorded in the GenerationCheckpoint *checkpoint*.
+        # Yields the name of each output once generated: written as a SLA file
+        # in the output directory, or to the output *sink* if given.
+        # Define variables (for later use)
+        merge_mode = self.__dataObject.getSingleOutput()
+
+        if analysis is None:
+            analysis = self.analyze_template(root)
+
+        # Check number of data records being consumed by Scribus source file
+        # (1) Determine total of data records, unless not needed
+        if data_count is None and isinstance(data, collections.abc.Sized):
+            data_count = len(data)
+
+        # (2) Number of data records in template document
+        records_in_document = analysis.records_in_document
+
+        # (3) Inform about it
+        if data_count is None:
+            logging.info('Source document consumes %s data record(s).' % records_in_document)
+
+        else:
+            logging.info('Source document consumes %s data record(s) from %s.' % (
+                records_in_document, data_count
+            ))
+
+        # width of the numbers in output file names
+        fill_count = len(str(data_count)) if data_count is not None else 0
+
+        # Store keys of data items, from the first one
+        data = iter(data)
+        first_item = next(data, None)
+
+        # Nothing left to generate for this shard or resumed generation
+        if first_item is None and self.__documents is not None and not self.__documents:
+            return
+
+        if first_item is None:
+            logging.error(
+                'Data file %s has only one line or is empty. ' % self.__dataObject.getDataSourceFile() +
+                'At least a header line and a line of data is needed. Halting.'
+            )
+
+            return
+
+        self.headers = list(first_item.keys())
+
+        logging.info('Variables used from data file(s): %s' % self.headers)
+
+        # The merged output depends on all records, from the whole data file (merge-mode only)
+        if merge_mode and manifest is not None:
+            merged_digest = manifest.digest(0, [self.data_digest(), data_count])
+            output_file = manifest.find(merged_digest)
+
+            if output_file is not None:
+                manifest.skip(output_file, merged_digest)
+                self.stats.count('records', data_count)
+                self.stats.count('files_skipped')
+
+                return
+
+        # Initialize template & document properties
+        template = analysis.template
+        geometry = analysis.geometry
+        pages_count = 0
+
+        # Output file name, compiled once for all outputs like the template
+        output_file_name = self.__dataObject.getOutputFileName()
+        output_file_template = self.compile_output_file_name(output_file_name)
+
+        # Set index for current data record, the first one of a shard or a resumed
+        # generation keeps its position in all records
+        index_current = 0
+        index_first_of_batch = 1 + (self.__window[0] if self.__window is not None else 0)
+
+        # Generate files in parallel processes (if specified), only possible when each
+        # batch is written to its own file. Output names are still computed in order,
+        # and outputs written to the sink by this process in the same order.
+        pool = None
+        pending = collections.deque()
+        jobs = self.get_jobs()
+
+        # Merged output file is written as batches are rendered (merge-mode only)
+        merged_writer = None
+        merged_batches = 0
+        batch = 0
+
+        # SLA files are otherwise written by threads while the next batches are rendered
+        # (unless generated in parallel processes or written to a sink)
+        writer = None
+
+        if jobs > 1 and not merge_mode:
+            logging.info('Generating files in %s parallel processes' % jobs)
+
+            pool = concurrent.futures.ProcessPoolExecutor(
+                jobs, initializer=_init_generation_worker, initargs=(self, template, worker_logging())
+            )
+
+        elif sink is None and not merge_mode and CONST.WRITE_THREADS > 0:
+            writer = WriteBehind(self.create_directory, CONST.WRITE_THREADS, CONST.WRITE_QUEUE_SIZE,
+                bool(self.__dataObject.getResume()), self.__temp_key
+            )
+
+        try:
+            for buffer in self.batch_records(itertools.chain([first_item], data), records_in_document):
+            # each iteration substitutions 1 x the template, consuming required 
+            # data entries per active options.
+            #
+            # invariant: data has been substituted up to data[index_current-1], and
+            # SLA files have been generated up to index_current-1 entry as per generation
+            # options and number of records consumed by the source template.
+
+                index_current = index_first_of_batch + len(buffer) - 1
+                item = buffer[-1]
+                document = (index_first_of_batch - 1) // records_in_document
+
+                # Documents of other shards, or completed by an interrupted run
+                if self.__documents is not None and document not in self.__documents:
+                    index_first_of_batch = index_current + 1
+
+                    continue
+
+                self.stats.count('records', len(buffer))
+
+                self.trace = trace = self.is_traced(batch)
+                batch += 1
+
+                if trace:
+                    trace_log.debug(
+                        'Substituting buffer, with index_current being %s and index_first_of_batch %s', index_current, index_first_of_batch
+                    )
+
+                # Check if merge-mode is selected ..
+                if merge_mode:
+                    # Generate output, the first batch keeps the geometry of the template
+                    if index_first_of_batch == 1:
+                        (output, cleaned) = template.render_document(self.headers,
+                            self.encode_scribus_xml(buffer), index_first_of_batch, geometry.template_values, trace
+                        )
+
+                    # empty texts are removed after shifting, when the geometry of pages depends on data
+                    elif geometry.template_values is None:
+                        output = template.render(self.headers, self.encode_scribus_xml(buffer), index_first_of_batch, trace=trace)
+                        cleaned = False
+
+                    else:
+                        (output, cleaned) = template.render_document(self.headers,
+                            self.encode_scribus_xml(buffer), index_first_of_batch, geometry.values(index_current - 1), trace
+                        )
+
+                    # Update DOCUMENT properties on first substitution
+                    if index_first_of_batch == 1:
+                        logging.debug('Generating reference content from buffer at #%s', index_current)
+
+                        with self.stats.stage('xml_reparse'):
+                            scribus_element = ET.fromstring(output)
+                        document_element = scribus_element.find('DOCUMENT')
+
+                        geometry.start(scribus_element, records_in_document)
+                        pages_count = geometry.pages_count
+
+                        # Expected amount of pages, patched when closing the merged file if different
+                        document_element.set('ANZPAGES',
+                            str(pages_count * math.ceil(data_count / records_in_document))
+                        )
+
+                        document_element.set('DOCCONTRIB',
+                            document_element.get('DOCCONTRIB') + CONST.CONTRIB_TEXT
+                        )
+
+                        # Write it right away, following batches are appended to it
+                        merged_writer = MergedSLAWriter(self,
+                            self.__dataObject.getOutputDirectory() if sink is None else None, compression=self.compression_level()
+                        )
+                        merged_writer.write_document(scribus_element, cleaned)
+                        scribus_element = document_element = None
+
+                    # Append DOCUMENT content
+                    else:
+                        if trace:
+                            trace_log.debug('Merging content from buffer up to entry index_current #%s', index_current)
+
+                        with self.stats.stage('xml_reparse'):
+                            document_element = ET.fromstring(output).find('DOCUMENT')
+
+                        merged_writer.append(geometry.shift(document_element, index_current - 1), cleaned)
+                        document_element = None
+
+                    merged_batches += 1
+
+                # .. otherwise, write one of multiple SLA files
+                else:
+                    #logging.debug('writing one file with buffer %s' % item)
+                    output_file = self.create_output_file(
+                        index_current, output_file_name, item, fill_count, output_file_template
+                    )
+
+                    if trace:
+                        trace_log.debug('output file name is %s', output_file)
+
+                    # Skip outputs generated from the same records & template (incremental generation only)
+                    if manifest is not None:
+                        digest = manifest.digest(index_first_of_batch, buffer)
+
+                        if manifest.is_current(output_file, digest):
+                            manifest.skip(output_file, digest)
+                            self.stats.count('files_skipped')
+                            index_first_of_batch = index_current + 1
+
+                            if checkpoint is not None:
+                                checkpoint.complete(document, output_file)
+
+                            continue
+
+                        manifest.record(output_file, digest)
+
+                    if writer is not None:
+                        output = self.generate_file(template, buffer, index_first_of_batch, output_file, trace, True)
+                        self.write_behind(writer, output_file, output, None if checkpoint is None else (
+                            functools.partial(checkpoint.complete, document, output_file)
+                        ))
+
+                        output = None
+                        yield output_file
+
+                    elif pool is None:
+                        output = self.generate_file(template, buffer, index_first_of_batch, output_file, trace, sink is not None)
+
+                        if sink is not None:
+                            self.write_to_sink(sink, output_file, output)
+
+                        output = None
+
+                        if checkpoint is not None:
+                            checkpoint.complete(document, output_file)
+
+                        yield output_file
+
+                    else:
+                        pending.append((output_file, document, pool.submit(
+                            _generate_file, buffer, index_first_of_batch, output_file, trace, sink is not None
+                        )))
+
+                        # Wait for the oldest batches, to keep a bounded amount of them in memory
+                        while len(pending) >= jobs * CONST.JOBS_QUEUE_SIZE:
+                            yield self.__complete(pending.popleft(), sink, checkpoint)
+
+                index_first_of_batch = index_current + 1
+
+            # Wait for remaining batches, errors of worker processes are raised here
+            while pending:
+                yield self.__complete(pending.popleft(), sink, checkpoint)
+
+            # Wait for remaining files to be written, write errors are raised here
+            if writer is not None:
+                writer.close()
+
+            # Close single SLA file (merge-mode only)
+            if merge_mode:
+                var_names_dic = dict(list(zip(self.headers,self.headers)))
+                #logging.debug('writing merged file with dic %s' % var_names_dic)
+                output_file = self.create_output_file(
+                    index_current, output_file_name, var_names_dic, fill_count, output_file_template
+                )
+
+                if sink is None:
+                    sla_file = self.build_file_path(
+                        self.__dataObject.getOutputDirectory(), output_file, self.sla_extension()
+                    )
+
+                    merged_writer.close(sla_file, pages_count * merged_batches)
+                    logging.info('Scribus file created: %s', sla_file)
+
+                else:
+                    self.write_to_sink(sink, output_file, merged_writer.close(None, pages_count * merged_batches))
+
+                if manifest is not None:
+                    manifest.record(output_file, merged_digest)
+
+                yield output_file
+
+        finally:
+            self.trace = False
+
+            if pool is not None:
+                pool.shutdown()
+
+            if writer is not None:
+                writer.close(check=False)
+                self.stats.add_time('file_write', writer.take_elapsed())
+
+            # Leave no partial merged file behind
+            if merged_writer is not None and not merged_writer.closed:
+                merged_writer.abort()
+
+
+    def __complete(self, pending_output, sink, checkpoint=None) -> str:
+        # Name of an output generated by a worker process, once done. Its statistics
+        # are merged, its content written to *sink* if any, and its completion to *checkpoint*.
+        (output_file, document, future) = pending_output
+        (stats, output) = future.result()
+
+        self.stats.merge(stats)
+
+        if sink is not None:
+            self.write_to_sink(sink, output_file, output)
+
+        if checkpoint is not None:
+            checkpoint.complete(document, output_file)
+
+        return output_file
+
+
+    def write_behind(self, writer, output_file: str, output: bytes, written=None):
+        # Hand the SLA file *output_file* over to the WriteBehind *writer*, *written*
+        # is called once it is in place.
+        sla_file = self.build_file_path(
+            self.__dataObject.getOutputDirectory(), output_file, self.sla_extension()
+        )
+
+        writer.write(sla_file, output, written)
+
+        self.stats.count('files_generated')
+        self.stats.count('bytes_written', len(output))
+
+
+    def write_to_sink(self, sink, output_file: str, output: bytes, extension=None):
+        with self.stats.stage('file_write'):
+            sink.write(output_file, output, extension or self.sla_extension())
+
+        self.stats.count('files_generated')
+        self.stats.count('bytes_written', len(output))
+
+
+    def batch_records(self, data, records_in_document: int):
+        # Generator of the lists of data records consumed by each instance of the
+        # template, the last one may be incomplete.
+        buffer = []
+
+        for item in data:
+            buffer.append(item)
+
+            if len(buffer) == records_in_document:
+                yield buffer
+                buffer = []
+
+        if buffer:
+            yield buffer
+
+
+    def generate_file(self, template, buffer: list, index_first_of_batch: int, output_file: str, trace=False, in_memory=False):
+        # Substitute one batch of data records in the compiled template & write it
+        # as a SLA file, or return its content *in_memory*. Runs in worker processes
+        # for parallel generation.
+        self.trace = trace
+
+        (output, cleaned) = template.render_document(self.headers,
+            self.encode_scribus_xml(buffer), index_first_of_batch, trace=trace
+        )
+
+        with self.stats.stage('xml_reparse'):
+            sla_element = ET.fromstring(output)
+
+        output = None
+
+        if in_memory:
+            return self.serialize_sla(sla_element, clean=not cleaned)
+
+        return self.write_sla_file(sla_element, output_file, clean=not cleaned)
+
+
+    def is_traced(self, batch: int) -> bool:
+        # Whether details of the *batch*-th batch of records (from 0) are logged: 1 batch
+        # every CONST.LOG_TRACE_SAMPLE, when the trace logger is enabled at debug level.
+        return CONST.LOG_TRACE_SAMPLE > 0 and batch % CONST.LOG_TRACE_SAMPLE == 0 and trace_log.isEnabledFor(logging.DEBUG)
+
+
+    def get_jobs(self) -> int:
+        # Number of processes generating files, parallel generation is not available
+        # from within Scribus as it cannot start worker processes of its own.
+        try:
+            jobs = int(self.__dataObject.getJobs())
+
+        except (TypeError, ValueError):
+            logging.warning('Could not parse value of "jobs" as an integer, using 1 instead.')
+
+            return 1
+
+        if jobs < 1:
+            jobs = os.cpu_count() or 1
+
+        if jobs > 1 and 'scribus' in sys.modules:
+            logging.warning('Parallel generation is not available from within Scribus, using 1 process.')
+
+            return 1
+
+        return jobs
+
+
+    def overwrite_with_sg_attributes(self, root):
+        # modifies root such that
+        # attributes have been rewritten from their /*/ItemAttribute[Parameter=SGAttribute] sibling, when applicable.
+        #
+        # allows to use %VAR_<var-name>% in Item Attribute to overwrite internal attributes (eg FONT)
+
+        for page_object in root.findall('.//ItemAttribute[@Parameter="SGAttribute"]/../..'):
+            for sga in page_object.findall('.//ItemAttribute[@Parameter="SGAttribute"]'):
+                reference = sga.get('RelationshipTo')
+
+                # Cannot use 'default' on .get() as it is '' (empty string) by default in SLA file
+                if reference == '':
+                    # target is page_object by default. Cannot use ".|*" as not supported by ET
+                    reference = '.'
+
+                # ET cannot use absolute path on element
+                elif reference.startswith('/'):
+                    reference = '.' + reference
+
+                attribute = sga.get('Name')
+                value = sga.get('Value')
+                #logging.debug('parsing SGAttribute with Name %s and Value %s, while reference is "%s"' % (attribute, value, reference)
+
+                try:
+                    targets = page_object.findall(reference)
+
+                    if targets:
+                        for target in targets:
+                            logging.debug('Overwriting value of %s in %s with "%s"' % (
+                                attribute, target.tag, value
+                            ))
+
+                            target.set(attribute, value)
+                    else:
+                        # TODO: Message to user
+                        logging.error(
+                            'Target "%s" could be parsed but designated no node. ' +
+                            'Check it out as it is probably not what you expected to replace %s.' % (
+                                reference, attribute
+                            )
+                        )
+
+                except SyntaxError:
+                    # TODO: Message to user
+                    logging.error(
+                        'XPATH expression "%s" could not be parsed ' +
+                        'by ElementTree to overwrite %s. Skipping.' % (
+                            reference, attribute
+                        )
+                    )
+
+        return root
+
+
+    def multiple_replace(self, string: str, replacements: dict) -> str:
+        # multiple simultaneous string replacements, per http://stackoverflow.com/a/15448887/1694411)
+        # combine with dictionary = dict(zip(keys, values)) to use on arrays
+        pattern = re.compile("|".join([re.escape(k) for k in replacements.keys()]), re.M)
+
+        return pattern.sub(lambda x: replacements[x.group(0)], str(string))
+
+
+    def encode_scribus_xml(self, data: list) -> list:
+        # Encode some characters that can be found in CSV into XML entities, see XML_ENTITIES.
+        # Values repeated from one record to the next (names of companies, cities...) are
+        # encoded once, from a cache of ESCAPE_CACHE_SIZE values, and then shared.
+        entities = self.XML_ENTITIES
+        encoded = self.__encoded
+        result = []
+
+        for item in data:
+            values = []
+
+            for value in item.values():
+                if value.__class__ is not str:
+                    values.append(str(value).translate(entities))
+                    continue
+
+                text = encoded.get(value)
+
+                if text is None:
+                    if len(encoded) >= CONST.ESCAPE_CACHE_SIZE:
+                        encoded.clear()
+
+                    text = encoded[value] = value.translate(entities)
+
+                values.append(text)
+
+            result.append(values)
+
+        return result
+
+
+    def substitute_data(self, var_names: list, data: list, template: list, keep_tabs_lf=0, clean=CONST.CLEAN_UNUSED_EMPTY_VARS, index_first_of_batch=0):
+        # for each list of *data* array, substitute all %VAR_*var_names*% placeholders in 
+        # *template* array with the *data* value at the same index (in local data subset).
+        #  Return concatenated substituted template.
+        #
+        # one-shot use of CompiledTemplate, prefer compiling the template once
+        # when the same template is substituted repeatedly.
+        compiled = CompiledTemplate('\n'.join(template), keep_tabs_lf, clean)
+
+        return compiled.render(var_names, data, index_first_of_batch)
+
+
+    def compile_output_file_name(self, filename):
+        # CompiledTemplate of the output file name *filename*, None if not set.
+        if filename == CONST.EMPTY:
+            return None
+
+        return CompiledTemplate(filename)
+
+
+    def create_output_file(self, index, filename, dico, fill_count, compiled=None):
+        # If the User has not set an Output File Name, an internal unique file name
+        # will be generated which is the index of the loop. The file name is
+        # substituted with its *compiled* template when given (see compile_output_file_name).
+        result = str(index).zfill(max(fill_count, CONST.OUTPUTCOUNT_FILL))
+
+        # Following characters are not allowed for File-Names on WINDOWS: < > ? " : | \ / *
+        # Note / is still allowed in filename as it allows dynamic subdirectory in Linux (issue 102);
+        # TODO: Check & fix for Windows
+        if filename != CONST.EMPTY:
+            table = {
+                # ord(u'ä'): u'ae',
+                # ord(u'Ä'): u'Ae',
+                # ord(u'ö'): u'oe',
+                # ord(u'Ö'): u'Oe',
+                # ord(u'ü'): u'ue',
+                # ord(u'Ü'): u'Ue',
+                # ord(u'ß'): u'ss',
+                ord('<'): '_',
+                ord('>'): '_',
+                ord('?'): '_',
+                ord('"'): '_',
+                ord(':'): '_',
+                ord('|'): '_',
+                ord('\\'): '_',
+                # ord(u'/'): u'_',
+                ord('*'): '_'
+            }
+            
+            list_vars = list(dico.keys())
+            list_vars.append(CONST.OUTPUTCOUNT_VAR)
+            list_values = list(dico.values())
+            list_values.append(result)
+
+            if compiled is None:
+                compiled = self.compile_output_file_name(filename)
+
+            result = compiled.render(list_vars, [list_values], index)
+
+            # TODO: check for utf8 characters support in windows filesystem
+            result = result.translate(table)
+
+        return result
+
+
+    def write_sla_file(self, sla_element, output_file, clean=CONST.CLEAN_UNUSED_EMPTY_VARS, sla_indent=CONST.INDENT_SLA):
+        # write SLA to filepath computed from given elements, optionally cleaning empty ITEXT elements and their empty PAGEOBJECTS
+        sla_file = self.build_file_path(
+            self.__dataObject.getOutputDirectory(), output_file, self.sla_extension()
+        )
+        compression = self.compression_level()
+        # on disk once written, for resumed generation to rely on it after a reboot
+        sync = bool(self.__dataObject.getResume())
+        key = self.__temp_key
+
+        self.create_directory(os.path.dirname(sla_file))
+
+        output_tree = ET.ElementTree(sla_element)
+
+        if (clean):
+            with self.stats.stage('cleanup'):
+                self.remove_empty_texts(output_tree.getroot())
+
+        start = time.perf_counter()
+
+        if (sla_indent):
+            with written_atomically(sla_file, sync, key) as partial_file, open_sla_output(partial_file, compression, 'w') as file:
+                writer = TimedWriter(file)
+                serialization_start = time.perf_counter()
+
+                SLASerializer().write_document(writer.write, output_tree.getroot())
+
+                serialization = time.perf_counter() - serialization_start - writer.elapsed
+                writer.flush()
+
+        else:
+            # serialized & written at once by ElementTree
+            with written_atomically(sla_file, sync, key) as partial_file, open_sla_output(partial_file, compression, 'wb') as file:
+                output_tree.write(file, encoding='utf-8')
+
+            serialization = time.perf_counter() - start
+
+        self.stats.add_time('serialization', serialization)
+        self.stats.add_time('file_write', time.perf_counter() - start - serialization)
+        self.stats.count('files_generated')
+        self.stats.count('bytes_written', os.path.getsize(sla_file))
+
+        logging.info('Scribus file created: %s', sla_file)
+
+        return sla_file
+
+
+    def create_directory(self, directory: str):
+        # Create the output *directory* if needed, checked once per run: output names
+        # may be in subdirectories (see create_output_file). Safe from any thread.
+        if directory not in self.__directories:
+            os.makedirs(directory, exist_ok=True)
+            self.__directories.add(directory)
+
+
+    def serialize_sla(self, sla_element, clean=CONST.CLEAN_UNUSED_EMPTY_VARS, sla_indent=CONST.INDENT_SLA) -> bytes:
+        # Content of the SLA file write_sla_file() would write, compressed alike.
+        if (clean):
+            with self.stats.stage('cleanup'):
+                self.remove_empty_texts(sla_element)
+
+        with self.stats.stage('serialization'):
+            if (sla_indent):
+                parts = []
+                SLASerializer().write_document(parts.append, sla_element)
+                output = ''.join(parts).encode('utf-8')
+
+            else:
+                buffer = io.BytesIO()
+                ET.ElementTree(sla_element).write(buffer, encoding='utf-8')
+                output = buffer.getvalue()
+
+            compression = self.compression_level()
+
+            if compression:
+                output = gzip.compress(output, compression)
+
+            return output
+
+
+    def remove_empty_texts(self, root):
+        # *modifies* root `ElementTree` by removing empty text elements and their empty placeholders.
+        # returns number of ITEXT elements deleted.
+        #   1. clean text in which some variable-like text is not substituted (ie: known or unknown variable):
+        #      <ITEXT CH="empty %VAR_empty% variable should not show" FONT="Arial Regular" />
+        #   2. remove <ITEXT> with empty @CH and precedings <para/> if any
+        #   3. remove any <PAGEOBJECT> that has no <ITEXT> child left
+        empty_xpath = "ITEXT[@CH='']"
+        removal_count = 0
+
+        # little obscure because its parent is needed to remove an element, and `ElementTree` has no parent() method.
+        for page in root.findall('.//%s/../..' % empty_xpath):
+            # Collect empty_xpath and preceding <para> for removal
+            # Iteration is needed due to lack of sibling-previous navigation in `ElementTree`
+            for page_object in page.findall('.//%s/..' % empty_xpath):
+                # Initialize trash bin
+                trash = []
+
+                for position, item in enumerate(page_object):
+                    if (item.tag == 'ITEXT') and (item.get('CH') == ''):
+                        if self.trace:
+                            trace_log.debug('Cleaning 1 empty ITEXT and preceding linefeed (opt.)')
+
+                        if (CONST.REMOVE_CLEANED_ELEMENT_PREFIX and page_object[position-1].tag == 'para'):
+                            trash.append(position - 1)
+
+                        trash.append(position)
+
+                        removal_count += 1
+
+                trash.reverse()
+
+                # Remove trashed elements as stack (lifo order), to preserve positions validity
+                for removed_position in trash:
+                    page_object.remove(page_object[removed_position])
+
+                if len(page_object.findall('ITEXT')) == 0:
+                    if self.trace:
+                        trace_log.debug('Cleaning 1 empty PAGEOBJECT')
+
+                    page.remove(page_object)
+                    self.stats.count('empty_frames_removed')
+
+        if self.trace:
+            trace_log.debug('Removed %d empty texts items', removal_count)
+
+        self.stats.count('empty_texts_removed', removal_count)
+
+        return removal_count
+
+
+    # Part III : PDF EXPORT & CLEANUP
+
+    def export_pdf_files(self, pdf_files: list, exported=None):
+        # Export each (sla_file, pdf_file) of *pdf_files*, in this Scribus instance
+        # when running within Scribus, otherwise in a pool of headless Scribus processes.
+        # *exported* is called with the position of each file in *pdf_files* once exported.
+        if 'scribus' in sys.modules:
+            for (position, (sla_output_file, pdf_output_file)) in enumerate(pdf_files):
+                self.export_pdf(sla_output_file, pdf_output_file, self.__temp_key)
+                self.stats.count('pdf_files_exported')
+
+                if exported is not None:
+                    exported(position)
+
+                logging.info('PDF file created: %s' % pdf_output_file)
+
+            return
+
+        pool = PDFExportPool(self.get_jobs(), self.__dataObject.getScribusExecutable(), self.__temp_key)
+        failed = 0
+
+        for (sla_output_file, pdf_output_file, error) in pool.export(pdf_files, exported):
+            if error is None:
+                logging.info('PDF file created: %s' % pdf_output_file)
+                self.stats.count('pdf_files_exported')
+
+            else:
+                logging.error('Could not export %s to PDF: %s' % (sla_output_file, error))
+                failed += 1
+
+        if failed:
+            raise RuntimeError('%d of %d PDF export(s) failed, generated SLA files are kept.' % (failed, len(pdf_files)))
+
+
+    def export_pdf(self, sla_file: str, pdf_file: str, key=None):
+        # Export *sla_file* to *pdf_file*, through a temporary file of *key* (see create_temp_file)
+        import scribus
+
+        # Create filepath (if needed)
+        directory = os.path.dirname(pdf_file)
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Export PDF using Scribus API
+        # (1) Open template file
+        scribus.openDoc(sla_file)
+
+        # (2) Determine pages
+        i = 0
+        pages_count = []
+
+        while (i < scribus.pageCount()):
+            i += 1
+            pages_count.append(i)
+
+        # (3) Setup PDF exporter
+        pdf_exporter = scribus.PDFfile()
+        pdf_exporter.info = CONST.APP_NAME
+        pdf_exporter.pages = pages_count
+
+        # (4) Save PDF file, under its name once complete
+        with written_atomically(pdf_file, True, key) as partial_file:
+            pdf_exporter.file = str(partial_file)
+            pdf_exporter.save()
+
+        # (5) Close document
+        scribus.closeDoc()
+
+
+    # UTILITIES
+
+    def build_file_path(self, directory: str, filename: str, extension: str):
+        # Build an absolute path
+        # Examples:
+        # "C:/tmp/template.sla" on Windows
+        # "/tmp/template.sla" on macOS & Unix-like OS
+        return directory + CONST.SEP_PATH + filename + CONST.SEP_EXT + extension
+
+
+    def get_log(self):
+        return logging
+
+
+    def get_saved_settings(self):
+        logging.debug('Parsing Scribus source file %s for user settings' % (
+            self.__dataObject.getScribusSourceFile()
+        ))
+
+        try:
+            with open_sla(self.__dataObject.getScribusSourceFile()) as file:
+                tree = ET.parse(file)
+
+            root = tree.getroot()
+
+            doc = root.find('DOCUMENT')
+            storage = doc.find('./JAVA[@NAME="' + CONST.STORAGE_NAME + '"]')
+
+            return storage.get('SCRIPT')
+
+        except SyntaxError as exception:
+            logging.error(
+                'Loading settings is only possible with Python 2.7 and later, ' +
+                'please update your system: %s' % exception
+            )
+
+            return None
+
+        except Exception as exception:
+            logging.debug('Could not load the user settings: %s' % exception)
+
+            return None
+
+
+# Thread writing the log records of the file handlers of logging.conf, see configure_logging
+_log_listener = None
+_logging_configured = False
+# Queue of the log records of worker processes, & thread handling them, see worker_logging
+_worker_log_queue = None
+_worker_log_listener = None
+
+
+def configure_logging():
+    # Configure logging from logging.conf, with its file handlers moved behind a queue:
+    # their records are written (and their files rotated) by a thread of their own,
+    # so that disk writes never block the generation. Run by the first generator of
+    # each process.
+    global _log_listener, _logging_configured
+
+    _stop_logging()
+    _logging_configured = True
+
+    logging.config.fileConfig(os.path.join(os.path.abspath(
+        os.path.dirname(__file__)), 'logging.conf'
+    ))
+
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if isinstance(handler, logging.FileHandler)]
+
+    if not handlers:
+        return
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    # records no file handler would write are not queued at all
+    queue_handler.setLevel(min(handler.level for handler in handlers))
+
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    root.addHandler(queue_handler)
+
+    _log_listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _log_listener.start()
+
+
+def _stop_logging():
+    # write the queued log records, before exiting or configuring logging again
+    # (those of worker processes first, as they go to the file handlers as well)
+    global _log_listener, _worker_log_queue, _worker_log_listener
+
+    if _worker_log_listener is not None:
+        _worker_log_listener.stop()
+        _worker_log_listener = None
+        _worker_log_queue = None
+
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+class _WorkerRecordHandler(logging.Handler):
+    # Log records of worker processes, handled by the logger that created them
+    # in this process: written by its handlers, one log file for all.
+
+    def emit(self, record):
+        logger = logging.getLogger(record.name)
+
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+
+def worker_logging() -> tuple:
+    # Arguments of configure_worker_logging() for worker processes: a queue of
+    # their log records, handled by a thread of this process (started the first
+    # time), and the levels of the loggers.
+    global _worker_log_queue, _worker_log_listener
+
+    if _worker_log_listener is None:
+        # usable by forked worker processes and by those started anew alike
+        _worker_log_queue = multiprocessing.get_context('spawn').Queue()
+        _worker_log_listener = logging.handlers.QueueListener(_worker_log_queue, _WorkerRecordHandler())
+        _worker_log_listener.start()
+
+    return (_worker_log_queue, logging.getLogger().level, trace_log.level)
+
+
+def configure_worker_logging(records, level=logging.DEBUG, trace_level=logging.INFO):
+    # Worker processes of a pool send their log records to the process that started
+    # them, through the queue *records* of worker_logging(), rather than writing
+    # them (and rotating the log file) concurrently: logging.conf is not read again.
+    global _log_listener, _logging_configured, _worker_log_listener
+
+    # threads of the parent process, not running in a forked worker
+    _log_listener = None
+    _worker_log_listener = None
+    _logging_configured = True
+
+    root = logging.getLogger()
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(level)
+    trace_log.setLevel(trace_level)
+
+
+atexit.register(_stop_logging)
+
+
+# Parallel generation: state & entry point of the worker processes, at module
+# level so that they can be used by a process pool.
+_worker_generator = None
+_worker_template = None
+
+
+def _init_generation_worker(generator, template, logging_args):
+    global _worker_generator, _worker_template
+
+    _worker_generator = generator
+    _worker_template = template
+
+    # statistics of the main process until now are reported by itself
+    generator.stats.reset()
+
+    # log records are written by the main process, see worker_logging
+    configure_worker_logging(*logging_args)
+
+
+def _generate_file(buffer, index_first_of_batch, output_file, trace=False, in_memory=False):
+    # returns the statistics of the batch, merged by the main process, and the
+    # content of its SLA file when generated *in_memory* for an output sink.
+    output = _worker_generator.generate_file(_worker_template, buffer, index_first_of_batch, output_file, trace, in_memory)
+
+    return (_worker_generator.stats.take(), output if in_memory else None)
+
+
+class DataRecord(collections.abc.Mapping):
+    # Read-only data record: a tuple of values, and the index (field name -> position)
+    # shared by all the records with the same fields, instead of a dict each. values()
+    # are in the order of the fields, for CompiledTemplate.render.
+    __slots__ = ('fields', 'record_values')
+
+    def __init__(self, fields: dict, values: tuple):
+        self.fields = fields
+        self.record_values = values
+
+
+    @staticmethod
+    def index(names) -> dict:
+        # Index of the field *names*, or of the keys of a dict of names to any value.
+        return dict((name, position) for (position, name) in enumerate(names))
+
+
+    def __getitem__(self, name):
+        return self.record_values[self.fields[name]]
+
+
+    def __iter__(self):
+        return iter(self.fields)
+
+
+    def __len__(self):
+        return len(self.fields)
+
+
+    def __contains__(self, name):
+        return name in self.fields
+
+
+    def keys(self):
+        return self.fields.keys()
+
+
+    def values(self):
+        return self.record_values
+
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CompiledTemplate:
+    # SLA template serialized & split only once into static chunks and variable
+    # slots, so that each batch of records is rendered by joining strings instead
+    # of running regular expressions over the whole document. Elements emptied by
+    # the substitution are left out while rendering, see render_document.
+    #
+    # done in string instead of XML for lack of efficient
+    # attribute-value-based substring-search in ElementTree
+    # but that makes NEXT-RECORD token position in XML critical.
+
+    # Lines that need substitution, and COLOR declarations that must be kept intact
+    VARIABLE_LINE = re.compile('%VAR_|' + re.escape(CONST.NEXT_RECORD))
+    COLOR_LINE = re.compile(r'\s*<COLOR\s+')
+
+    # Placeholders of values computed for each batch (merge-mode), see MergeGeometry
+    GEOMETRY_PLACEHOLDER = '%SG_GEOMETRY-'
+    GEOMETRY_SLOT = re.escape(GEOMETRY_PLACEHOLDER) + r'\d+%'
+
+    # Remove (& trim) any (unused) %VAR_\w*% like string, optionally with its prefix
+    CLEAN_PREFIXED_VAR = re.compile(r'\s*[,;-]*\s*%VAR_\w*%\s*')
+    CLEAN_VAR = re.compile(r'\s*%VAR_\w*%\s*')
+    CLEAN_NEXT_RECORD = re.compile(r'\s*%s\w*\s*' % re.escape(CONST.NEXT_RECORD))
+
+    # ITEXT context to convert \\t and \\n into scribus <tab/> and <linebreak/>
+    ITEXT_CONTEXT = re.compile('(<ITEXT.* CH=")([^"]+)(".*/>)', re.MULTILINE | re.DOTALL)
+    TAB_LINEBREAK = re.compile('([\\t\\n]+)', re.MULTILINE)
+
+    def __init__(self, template: str, keep_tabs_lf=0, clean=CONST.CLEAN_UNUSED_EMPTY_VARS):
+        self.keep_tabs_lf = keep_tabs_lf
+        self.clean = clean
+
+        lines = template.split('\n')
+        variables = [self.is_variable(line) for line in lines]
+
+        # Texts that may be emptied by substitution, with the lines of the elements
+        # to remove when they are (see render_document). Lines where such elements
+        # start or end are not joined with other lines.
+        text_groups = self.__find_text_groups(template, lines, variables) if clean else []
+        self.tree_cleanup = text_groups is None
+        boundaries = set()
+
+        for group in text_groups or []:
+            for (first_line, last_line) in group[2] + [group[3]]:
+                boundaries.update((first_line, first_line + 1, last_line))
+
+        # Render plan, independent from variable names: consecutive static lines
+        # are joined in a single chunk, variable lines are stored along with the
+        # offset of the data record they consume in the current batch, and whether
+        # they have to be cleaned (lines with only geometry placeholders don't).
+        self.__lines = []
+        line_entries = []
+        static = []
+        offset = 0
+
+        for number, line in enumerate(lines):
+            if static and number in boundaries:
+                self.__lines.append(''.join(static))
+                static = []
+
+            line_entries.append(len(self.__lines))
+
+            if not variables[number] and self.GEOMETRY_PLACEHOLDER not in line:
+                static.append(line)
+                continue
+
+            if static:
+                self.__lines.append(''.join(static))
+                static = []
+                line_entries[-1] += 1
+
+            self.__lines.append((offset, line, variables[number]))
+
+            # Look for 'NEXT_RECORD' entry, that line is still substituted with current record
+            if CONST.NEXT_RECORD in line:
+                offset += 1
+
+        if static:
+            self.__lines.append(''.join(static))
+
+        line_entries.append(len(self.__lines))
+
+        # Same groups, with plan entries instead of lines. Removing an element (with
+        # its tail) keeps the indentation of its first line, drops the following
+        # lines and the indentation of the line where the next element starts.
+        def span(first_line, last_line):
+            return (
+                line_entries[first_line], line_entries[last_line],
+                self.indentation(lines[first_line]), len(self.indentation(lines[last_line]))
+            )
+
+        self.__text_groups = [(
+                tags,
+                [(position, line_entries[line]) for (position, line) in candidates],
+                [span(*child_span) for child_span in spans],
+                span(*parent_span)
+            ) for (tags, candidates, spans, parent_span) in text_groups or []
+        ]
+
+        self.__plans = {}
+        self.__substitutions = {}
+
+        # replaced by the statistics of the generator using it
+        self.stats = GenerationStats()
+
+        # whether details of the batch being rendered are logged
+        self.trace = False
+
+
+    def is_variable(self, line: str) -> bool:
+        return self.VARIABLE_LINE.search(line) is not None and self.COLOR_LINE.search(line) is None
+
+
+    def uses_variable(self, name: str) -> bool:
+        # Whether the %VAR_*name*% placeholder is in a line to substitute.
+        placeholder = '%VAR_' + name + '%'
+
+        return any(placeholder in entry[1] for entry in self.__lines if not isinstance(entry, str))
+
+
+    def indentation(self, line: str) -> str:
+        return line[:len(line) - len(line.lstrip())]
+
+
+    def __find_text_groups(self, template: str, lines: list, variables: list):
+        # Parents of the ITEXT elements that may be emptied by substitution (variable
+        # or empty CH), as in remove_empty_texts. Each group is a tuple of:
+        # - the tags of the children of the parent
+        # - the (position among children, line) of these ITEXT elements
+        # - the (first line, line of the next node) of each child, and of the parent.
+        # None when empty texts can't be removed this way, and must be removed from
+        # the parsed document: elements not starting on their own line, nested groups.
+        if '<ITEXT' not in template:
+            return []
+
+        elements = []
+        stack = []
+        parser = expat.ParserCreate()
+
+        # element: [tag, start, start of next node, parent, children, CH]
+        def start_element(tag, attributes):
+            element = [tag, parser.CurrentByteIndex, None, stack[-1] if stack else None, [], attributes.get('CH')]
+
+            if stack:
+                siblings = stack[-1][4]
+
+                if siblings:
+                    siblings[-1][2] = element[1]
+
+                siblings.append(element)
+
+            elements.append(element)
+            stack.append(element)
+
+        def end_element(tag):
+            element = stack.pop()
+
+            if element[4]:
+                element[4][-1][2] = parser.CurrentByteIndex
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+
+        try:
+            parser.Parse(template, True)
+
+        except expat.ExpatError:
+            return None
+
+        # positions of expat are in the template encoded in UTF-8 (as it parses str)
+        encoded = template.encode('utf-8')
+        line_starts = [0]
+        position = encoded.find(b'\n')
+
+        while position >= 0:
+            line_starts.append(position + 1)
+            position = encoded.find(b'\n', position + 1)
+
+        def line_span(element):
+            # (first line, line of next node) of *element*, when both start their line
+            span = []
+
+            for position in (element[1], element[2]):
+                if position is None:
+                    return None
+
+                number = bisect.bisect_right(line_starts, position) - 1
+
+                if encoded[line_starts[number]:position].strip():
+                    return None
+
+                span.append(number)
+
+            return tuple(span)
+
+        # Parents of candidate ITEXT elements, in document order
+        parents = {}
+
+        for element in elements:
+            if element[0] != 'ITEXT' or element[3] is None:
+                continue
+
+            line = bisect.bisect_right(line_starts, element[1]) - 1
+
+            if element[5] == '' or variables[line]:
+                parents.setdefault(id(element[3]), element[3])
+
+        grandparents = set(id(parent[3]) for parent in parents.values() if parent[3] is not None)
+        groups = []
+
+        for parent in parents.values():
+            # elements are removed from the grandparent of empty texts
+            if parent[3] is None or id(parent) in grandparents:
+                return None
+
+            # no group within another one
+            ancestor = parent[3]
+
+            while ancestor is not None:
+                if id(ancestor) in parents or (ancestor is not parent[3] and id(ancestor) in grandparents):
+                    return None
+
+                ancestor = ancestor[3]
+
+            spans = [line_span(child) for child in parent[4]]
+            parent_span = line_span(parent)
+
+            if parent_span is None or None in spans:
+                return None
+
+            tags = [child[0] for child in parent[4]]
+            candidates = [
+                (position, spans[position][0]) for position, child in enumerate(parent[4])
+                if child[0] == 'ITEXT' and (child[5] == '' or variables[spans[position][0]])
+            ]
+
+            groups.append((tags, candidates, spans, parent_span))
+
+        return groups
+
+
+    def bind(self, var_names: list) -> list:
+        # Split variable lines into static chunks and slots for the given data
+        # headers, computed once per distinct list of headers.
+        key = tuple(var_names)
+        plan = self.__plans.get(key)
+
+        if plan is None:
+            plan = self.__plans[key] = self.__compile(var_names)
+            self.__substitutions[key] = sum(
+                len([slot for (position, slot) in entry[2] if slot >= -1]) for entry in plan if not isinstance(entry, str)
+            )
+
+        return plan
+
+
+    def __compile(self, var_names: list) -> list:
+        # Slot index of each placeholder, last header wins on duplicates & COUNT
+        # is always the position of the data record in the whole generation.
+        # Geometry placeholder n gets slot -2 - n.
+        slots = {}
+
+        for position, name in enumerate(var_names):
+            slots['%VAR_' + name + '%'] = position
+
+        slots['%VAR_' + CONST.OUTPUTCOUNT_VAR + '%'] = -1
+
+        pattern = re.compile('(' + '|'.join(
+            [re.escape(k) for k in slots.keys()] + [self.GEOMETRY_SLOT]
+        ) + ')', re.M)
+        plan = []
+
+        for entry in self.__lines:
+            if isinstance(entry, str):
+                plan.append(entry)
+                continue
+
+            offset, line, variable = entry
+            chunks = pattern.split(line)
+            line_slots = [(i, self.__slot(slots, chunks[i])) for i in range(1, len(chunks), 2)]
+
+            plan.append((offset, chunks, line_slots, variable))
+
+        return plan
+
+
+    def __slot(self, slots: dict, placeholder: str) -> int:
+        if placeholder in slots:
+            return slots[placeholder]
+
+        return -2 - int(placeholder[len(self.GEOMETRY_PLACEHOLDER):-1])
+
+
+    def render(self, var_names: list, data: list, index_first_of_batch=0, geometry=None, trace=False) -> str:
+        # substitute all %VAR_*var_names*% placeholders with the values of the
+        # *data* records (lists of encoded values, in var_names order), and the
+        # geometry placeholders with the *geometry* values of this batch.
+        # Details are logged to the trace logger when *trace* is set.
+        self.trace = trace
+
+        with self.stats.stage('substitution'):
+            return ''.join(self.__render(var_names, data, index_first_of_batch, geometry))
+
+
+    def render_document(self, var_names: list, data: list, index_first_of_batch=0, geometry=None, trace=False):
+        # render() a SLA document, without the elements remove_empty_texts() would
+        # remove from it. Returns the document and whether it is clean, otherwise
+        # (see __find_text_groups, or tabs & linebreaks converted in ITEXT elements)
+        # empty texts must still be removed from the parsed document.
+        self.trace = trace
+
+        with self.stats.stage('substitution'):
+            result = self.__render(var_names, data, index_first_of_batch, geometry)
+
+        with self.stats.stage('cleanup'):
+            cleaned = not self.tree_cleanup and self.__remove_empty_texts(result)
+
+        with self.stats.stage('substitution'):
+            text = ''.join(result)
+
+        return text, cleaned
+
+
+    def __remove_empty_texts(self, result: list) -> bool:
+        # Same removals as remove_empty_texts(), on the entries of the rendered plan.
+        # Decided for all groups before any entry is modified.
+        cut = {}
+        strip = {}
+        drop = set()
+        removed_texts = 0
+        removed_frames = 0
+
+        def remove(span):
+            (first, last, indentation, last_indentation) = span
+            cut[first] = indentation
+            strip[last] = last_indentation
+            drop.update(range(first + 1, last))
+
+        for (tags, candidates, spans, parent_span) in self.__text_groups:
+            empty = []
+
+            for (position, entry) in candidates:
+                line = result[entry]
+
+                # converted tabs & linebreaks: multiple texts
+                if line.count('<') != 1:
+                    return False
+
+                if ' CH=""' in line:
+                    empty.append(position)
+
+            if not empty:
+                continue
+
+            # remove empty ITEXT and preceding <para> if any, as a stack
+            trash = []
+
+            removed_texts += len(empty)
+
+            if self.trace:
+                trace_log.debug('Cleaning %s empty ITEXT and preceding linefeed (opt.)', len(empty))
+
+            for position in empty:
+                if CONST.REMOVE_CLEANED_ELEMENT_PREFIX and tags[position - 1] == 'para':
+                    trash.append(position - 1)
+
+                trash.append(position)
+
+            kept = list(range(len(tags)))
+
+            try:
+                for removed_position in reversed(trash):
+                    del kept[removed_position]
+
+            except IndexError:
+                return False
+
+            if 'ITEXT' not in [tags[position] for position in kept]:
+                if self.trace:
+                    trace_log.debug('Cleaning 1 empty PAGEOBJECT')
+
+                remove(parent_span)
+                removed_frames += 1
+
+            else:
+                for position in set(range(len(tags))).difference(kept):
+                    remove(spans[position])
+
+        for entry in drop:
+            result[entry] = ''
+
+        for (entry, indentation) in cut.items():
+            result[entry] = '' if entry in strip else indentation
+
+        for (entry, length) in strip.items():
+            if entry not in cut:
+                result[entry] = result[entry][length:]
+
+        self.stats.count('empty_texts_removed', removed_texts)
+        self.stats.count('empty_frames_removed', removed_frames)
+
+        return True
+
+
+    def __render(self, var_names: list, data: list, index_first_of_batch=0, geometry=None) -> list:
+        # rendered entries of the plan
+        plan = self.bind(var_names)
+        self.stats.count('variables_substituted', self.__substitutions[tuple(var_names)])
+        size = len(var_names)
+        keys = ['%VAR_' + n + '%' for n in var_names]
+        records = []
+
+        for values in data:
+            # placeholders of missing values are left for cleanup, as they have no replacement
+            if len(values) < size:
+                values = list(values) + keys[len(values):]
+
+            records.append(values)
+
+        empty = [''] * size
+        result = []
+
+        for entry in plan:
+            if isinstance(entry, str):
+                result.append(entry)
+                continue
+
+            offset, chunks, line_slots, variable = entry
+
+            # empty remplacements after available data is consumed.
+            values = records[offset] if offset < len(records) else empty
+            count = str(offset + index_first_of_batch)
+
+            parts = list(chunks)
+
+            for position, slot in line_slots:
+                if slot >= 0:
+                    parts[position] = values[slot]
+
+                elif slot == -1:
+                    parts[position] = count
+
+                else:
+                    parts[position] = geometry[-2 - slot]
+
+            line = ''.join(parts)
+            result.append(self.finish_line(line) if variable else line)
+
+        return result
+
+
+    def finish_line(self, line: str) -> str:
+        # Clean unused variables & convert tabs and linebreaks of a substituted line,
+        # regular expressions are only run when the line may actually be changed.
+        if self.clean and ('%VAR_' in line or CONST.NEXT_RECORD in line):
+            # TODO: is there a way to input warning
+            # "data not found for variable named XX"
+            # instead of the number
+            if CONST.REMOVE_CLEANED_ELEMENT_PREFIX:
+                (line, count) = self.CLEAN_PREFIXED_VAR.subn('', line)
+
+            else:
+                (line, count) = self.CLEAN_VAR.subn('', line)
+
+            if (count > 0):
+                if self.trace:
+                    trace_log.debug('cleaned %d empty variable(s)', count)
+
+                self.stats.count('variables_cleaned', count)
+
+            line = self.CLEAN_NEXT_RECORD.sub('', line)
+
+        # convert \t and \n into scribus <tab/> and <linebreak/>
+        if self.keep_tabs_lf == 1 and ('\t' in line or '\n' in line):
+            matches = self.ITEXT_CONTEXT.search(line)
+
+            if matches:
+                matches_start = matches.group(1)
+                matches_stop = matches.group(3)
+
+                line = self.TAB_LINEBREAK.sub(
+                    lambda x: matches_stop + x.group(1) + matches_start, line
+                )
+
+                # Replace \t and \n
+                line = line.replace('\t', '<tab />').replace('\n', '<breakline />')
+
+                if self.trace:
+                    trace_log.debug('Converted tabs and linebreaks in line: %s', line)
+
+            else:
+                logging.warning(
+                    'Could not convert tabs and linebreaks in this line, ' +
+                    'kindly report this to the developers: %s', line
+                )
+
+        return line
+
+
+class MergeGeometry:
+    # Geometry & links of the pages and objects of the template document, read
+    # once for merge-mode into a table of fields. The shifted values of each batch
+    # are computed from it and rendered by the CompiledTemplate in place of the
+    # placeholders that replace the original values, instead of parsing & shifting
+    # the attributes of every rendered batch. When one of these values depends on
+    # the data (eg. overwritten by a SGAttribute) it can't be computed beforehand,
+    # the attributes of each rendered batch are then shifted by shift().
+    #
+    # Objects get new ItemIDs in each batch, with the links to them, from an
+    # ItemIDAllocator that ensures they are unique in the merged document (issue #101).
+
+    # (attribute, kind) of the fields of pages, objects & objects within groups. Kinds:
+    # y: vertical position, page: page number, index: link by object position (1.4)
+    # id: ItemID & links by ItemID (1.5+).
+    PAGE_FIELDS = (('PAGEYPOS', 'y'), ('NUM', 'page'))
+    OBJECT_FIELDS_14 = (('YPOS', 'y'), ('OwnPage', 'page'), ('NEXTITEM', 'index'), ('BACKITEM', 'index'))
+    OBJECT_FIELDS = (('YPOS', 'y'), ('OwnPage', 'page'), ('ItemID', 'id'), ('NEXTITEM', 'id'), ('BACKITEM', 'id'))
+    GROUPED_OBJECT_FIELDS = (('ItemID', 'id'), ('NEXTITEM', 'id'), ('BACKITEM', 'id'))
+
+    def __init__(self, root):
+        # Read fields from *root* template, and replace their values with
+        # placeholders when they can all be computed beforehand.
+        self.version = str(root.get('Version'))
+        self.objects_count = len(root.findall('.//PAGEOBJECT'))
+        self.fields = []
+        self.template_values = None
+
+        static = True
+
+        for number, (element, fields) in enumerate(self.walk(root.find('DOCUMENT'))):
+            for attribute, kind in fields:
+                value = element.get(attribute)
+
+                if value is None:
+                    continue
+
+                try:
+                    base = self.parse(kind, value)
+
+                except ValueError:
+                    base = None
+                    static = False
+
+                self.fields.append((number, element, attribute, kind, base, value))
+
+        if static:
+            self.template_values = [field[5] for field in self.fields]
+
+            for position, (number, element, attribute, kind, base, value) in enumerate(self.fields):
+                element.set(attribute, CompiledTemplate.GEOMETRY_PLACEHOLDER + str(position) + '%')
+
+        else:
+            logging.debug('Geometry of merged pages depends on data, shifting each batch')
+
+        # template elements are not needed anymore
+        self.fields = [(number, attribute, kind, base) for (number, element, attribute, kind, base, value) in self.fields]
+
+        self.pages_count = 0
+        self.allocator = None
+
+
+    def walk(self, document_element) -> list:
+        # (element, fields) of the pages & objects of a document, in a fixed order:
+        # pages and objects moved to the merged document first, then grouped objects.
+        by_item_id = not self.version.startswith('1.4')
+
+        pages = document_element.findall('PAGE')
+        objects = document_element.findall('PAGEOBJECT')
+
+        elements = [(page, self.PAGE_FIELDS) for page in pages]
+        elements += [(page_object, self.OBJECT_FIELDS if by_item_id else self.OBJECT_FIELDS_14) for page_object in objects]
+
+        if by_item_id:
+            for page_object in objects:
+                elements += [
+                    (grouped, self.GROUPED_OBJECT_FIELDS) for grouped in page_object.iter('PAGEOBJECT') if grouped is not page_object
+                ]
+
+        return elements
+
+
+    def parse(self, kind: str, value: str):
+        if kind == 'y':
+            return float(value) if value != '' else 0
+
+        return int(value)
+
+
+    def start(self, scribus_element, records_in_document: int):
+        # Read the properties of the document rendered from the first batch,
+        # which is written as is. Its ItemIDs are left to its objects.
+        document_element = scribus_element.find('DOCUMENT')
+
+        self.pages_count = int(document_element.get('ANZPAGES'))
+        self.page_height = float(document_element.get('PAGEHEIGHT'))
+        self.vertical_gap = float(document_element.get('GapVertical'))
+        self.book = document_element.get('BOOK') == '1'
+        self.records_in_document = records_in_document
+
+        self.allocator = ItemIDAllocator(
+            int(page_object.get('ItemID')) for page_object in scribus_element.iter('PAGEOBJECT')
+            if page_object.get('ItemID') is not None
+        )
+
+        logging.debug('Current template has #%s page objects' % self.objects_count)
+
+
+    def values(self, index: int) -> list:
+        # Values of the fields for the batch ending with data record *index* (0-based),
+        # None when they can't be computed beforehand.
+        if self.template_values is None:
+            return None
+
+        vertical_offset = self.vertical_offset(index)
+        item_ids = {}
+
+        return [
+            self.shifted_value(kind, base, index, vertical_offset, item_ids) for (number, attribute, kind, base) in self.fields
+        ]
+
+
+    def shift(self, document_element, index: int) -> list:
+        # Pages & objects of the document rendered for the batch ending with data
+        # record *index*, to move to the merged document. Their attributes are
+        # shifted here when their values could not be rendered.
+        elements = self.walk(document_element)
+
+        if self.template_values is None:
+            vertical_offset = self.vertical_offset(index)
+            item_ids = {}
+
+            for (number, attribute, kind, base) in self.fields:
+                element = elements[number][0]
+                base = self.parse(kind, element.get(attribute))
+
+                element.set(attribute, self.shifted_value(kind, base, index, vertical_offset, item_ids))
+
+        return document_element.findall('PAGE') + document_element.findall('PAGEOBJECT')
+
+
+    def vertical_offset(self, index: int) -> float:
+        return (
+            (self.page_height + self.vertical_gap)
+            * (index // self.records_in_document)
+            * (self.pages_count // 2 if self.book else self.pages_count)
+        )
+
+
+    def shifted_value(self, kind: str, base, index: int, vertical_offset: float, item_ids: dict) -> str:
+        if kind == 'y':
+            return str(float(base) + vertical_offset)
+
+        if kind == 'page':
+            return str(base + self.pages_count)
+
+        # -1 is no link
+        if base == -1:
+            return str(base)
+
+        # next or previous linked frame by position
+        if kind == 'index':
+            return str(base + self.objects_count * index)
+
+        # same new ItemID for an object and the links to it in a batch
+        if base not in item_ids:
+            item_ids[base] = self.allocator.allocate()
+
+        return str(item_ids[base])
+
+
+class ItemIDAllocator:
+    # ItemIDs not used yet in a document, allocated in increasing order.
+    # Scribus reads them as 32 bits signed integers.
+    MAX_ITEM_ID = 2 ** 31 - 1
+
+    def __init__(self, reserved=()):
+        self.reserved = set(reserved)
+        self.next_id = 1
+
+
+    def allocate(self) -> int:
+        while self.next_id in self.reserved:
+            self.next_id += 1
+
+        if self.next_id > self.MAX_ITEM_ID:
+            raise ValueError('No ItemID left for objects of the merged document')
+
+        item_id = self.next_id
+        self.next_id += 1
+
+        return item_id
+
+
+class SLASerializer:
+    # Indented XML output of ElementTree elements, written in one pass to any
+    # *write* function (eg. of an open file). Output is identical to minidom's
+    # toprettyxml(indent='   ') of the ET.tostring() of the elements, whitespace
+    # text nodes included, without building a DOM and two more copies of the document.
+
+    DECLARATION = '<?xml version="1.0" ?>'
+
+    def __init__(self, indent='   ', newline='\n'):
+        self.indent = indent
+        self.newline = newline
+
+
+    def write_document(self, write, element):
+        write(self.DECLARATION + self.newline)
+        self.write_element(write, element)
+
+
+    def write_element(self, write, element, indent=''):
+        # *element* & its children, the tail of *element* is not written.
+        tag = element.tag
+        parts = [indent, '<', tag]
+
+        for name, value in element.items():
+            parts += [' ', name, '="', self.escape(value), '"']
+
+        text = element.text
+
+        # no child element: single text node inline, or empty element
+        if len(element) == 0:
+            if text:
+                parts += ['>', self.escape(self.normalize(text)), '</', tag, '>', self.newline]
+
+            else:
+                parts += ['/>', self.newline]
+
+            write(''.join(parts))
+
+            return
+
+        parts += ['>', self.newline]
+        child_indent = indent + self.indent
+
+        if text:
+            parts += [child_indent, self.escape(self.normalize(text)), self.newline]
+
+        write(''.join(parts))
+
+        for child in element:
+            self.write_element(write, child, child_indent)
+
+            if child.tail:
+                self.write_text(write, child.tail, child_indent)
+
+        write(indent + '</' + tag + '>' + self.newline)
+
+
+    def write_text(self, write, text: str, indent=''):
+        write(indent + self.escape(self.normalize(text)) + self.newline)
+
+
+    def escape(self, text: str) -> str:
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+
+
+    def normalize(self, text: str) -> str:
+        # line ends of text nodes, as normalized by the XML parser
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+        return text
+
+
+class MergedSLAWriter:
+    # Merge-mode output, written to disk as batches are rendered: the document of
+    # the first batch is written once, the shifted pages and objects of each
+    # following batch are appended as soon as they are available, and the closing
+    # tags are written by close(), that patches ANZPAGES if needed. Peak memory is
+    # thus bounded by one batch. The file is written under a temporary name, and
+    # moved to its final name (that depends on the last record) when closed.
+    # Without *directory*, the document is written in memory for an output sink.
+    # With a *compression* level, the document is gzip compressed as it is written.
+
+    def __init__(self, generator, directory, clean=CONST.CLEAN_UNUSED_EMPTY_VARS, sla_indent=CONST.INDENT_SLA, compression=CONST.COMPRESSION):
+        self.generator = generator
+        self.clean = clean
+        self.sla_indent = sla_indent
+        self.compression = compression
+        self.serializer = SLASerializer()
+        self.closed = False
+        self.temp_file = None
+
+        if directory is None:
+            self.file = io.BytesIO()
+            return
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        (handle, self.temp_file) = create_temp_file(directory, '.sla.part')
+        os.close(handle)
+        self.file = open_sla_output(self.temp_file, compression, 'wb')
+
+
+    def write_document(self, scribus_element, cleaned=False):
+        # Write the whole document of the first batch, but its closing tags.
+        # Empty texts are removed unless *cleaned* already.
+        stats = self.generator.stats
+
+        if self.clean and not cleaned:
+            with stats.stage('cleanup'):
+                self.generator.remove_empty_texts(scribus_element)
+
+        with stats.stage('serialization'):
+            if self.sla_indent:
+                parts = []
+                self.serializer.write_document(parts.append, scribus_element)
+                text = ''.join(parts)
+
+            else:
+                text = ET.tostring(scribus_element, encoding='unicode')
+
+        # Split before the closing DOCUMENT tag (and its indentation), where following batches are appended
+        position = text.rindex('</DOCUMENT>')
+
+        if self.sla_indent:
+            position = text.rindex('\n', 0, position) + 1
+
+        header = text[:position].encode('utf-8')
+        self.footer = text[position:].encode('utf-8')
+
+        # Location of the ANZPAGES value, to be patched when closing
+        self.pages_offset = header.index(b' ANZPAGES="') + len(b' ANZPAGES="')
+        self.pages_value = header[self.pages_offset:header.index(b'"', self.pages_offset)]
+
+        with stats.stage('file_write'):
+            self.file.write(header)
+
+
+    def append(self, elements: list, cleaned=False):
+        # Append shifted PAGE and PAGEOBJECT *elements* of one batch to the DOCUMENT.
+        # A temporary DOCUMENT holds them for cleanup (unless *cleaned* already), as
+        # empty texts are removed from their grandparent.
+        stats = self.generator.stats
+
+        if not self.clean or cleaned:
+            for element in elements:
+                self.__write(self.__serialize(element))
+
+            return
+
+        root = ET.Element('SCRIBUSUTF8NEW')
+        document = ET.SubElement(root, 'DOCUMENT')
+        document.extend(elements)
+
+        with stats.stage('cleanup'):
+            self.generator.remove_empty_texts(root)
+
+        for element in document:
+            self.__write(self.__serialize(element))
+
+
+    def close(self, sla_file, pages_count: int):
+        # Write closing tags, patch ANZPAGES with the actual *pages_count* & move to *sla_file*.
+        # Returns the content of the document instead when written in memory.
+        stats = self.generator.stats
+
+        with stats.stage('file_write'):
+            self.file.write(self.footer)
+
+        pages_value = str(pages_count).encode('utf-8')
+
+        if self.temp_file is None:
+            content = self.file.getvalue()
+            self.file.close()
+            self.closed = True
+
+            if pages_value != self.pages_value:
+                logging.debug('Patching merged document ANZPAGES to %s' % pages_count)
+                content = content[:self.pages_offset] + pages_value + content[self.pages_offset + len(self.pages_value):]
+
+            if self.compression:
+                content = gzip.compress(content, self.compression)
+
+            return content
+
+        self.file.close()
+
+        if pages_value != self.pages_value:
+            logging.debug('Patching merged document ANZPAGES to %s' % pages_count)
+            self.__patch_pages(pages_value)
+
+        directory = os.path.dirname(sla_file)
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        os.replace(self.temp_file, sla_file)
+        self.closed = True
+
+        stats.count('files_generated')
+        stats.count('bytes_written', os.path.getsize(sla_file))
+
+
+    def abort(self):
+        # Remove the partially written file.
+        self.file.close()
+
+        if self.temp_file is not None:
+            os.remove(self.temp_file)
+
+        self.closed = True
+
+
+    def __patch_pages(self, pages_value: bytes):
+        # in place when the new value fits, padded with whitespace between attributes.
+        if len(pages_value) <= len(self.pages_value) and not self.compression:
+            with open(self.temp_file, 'r+b') as file:
+                file.seek(self.pages_offset)
+                file.write(pages_value + b'"' + b' ' * (len(self.pages_value) - len(pages_value)))
+
+            return
+
+        # otherwise (or if compressed) by copying the file with the new value.
+        (handle, patched_file) = create_temp_file(os.path.dirname(self.temp_file), '.sla.part')
+
+        os.close(handle)
+
+        with open_sla(self.temp_file) as source, open_sla_output(patched_file, self.compression, 'wb') as target:
+            target.write(source.read(self.pages_offset))
+            target.write(pages_value)
+            source.seek(len(self.pages_value), os.SEEK_CUR)
+            shutil.copyfileobj(source, target)
+
+        os.replace(patched_file, self.temp_file)
+
+
+    def __write(self, text: str):
+        with self.generator.stats.stage('file_write'):
+            self.file.write(text.encode('utf-8'))
+
+
+    def __serialize(self, element) -> str:
+        # One DOCUMENT child & its trailing whitespace, formatted as in the whole document.
+        with self.generator.stats.stage('serialization'):
+            if not self.sla_indent:
+                return ET.tostring(element, encoding='unicode')
+
+            parts = []
+            indent = self.serializer.indent * 2
+
+            self.serializer.write_element(parts.append, element, indent)
+
+            if element.tail:
+                self.serializer.write_text(parts.append, element.tail, indent)
+
+            return ''.join(parts)
+
+
+class DirectorySink:
+    # Output sink writing each generated file to *directory*, named after its output
+    # like the files written by ScribusGenerator.run().
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+
+    def write(self, output_name: str, data: bytes, extension=CONST.FILE_EXTENSION_SCRIBUS):
+        path = os.path.join(self.directory, output_name + CONST.SEP_EXT + extension)
+        directory = os.path.dirname(path)
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with written_atomically(path) as partial_file, open(partial_file, 'wb') as file:
+            file.write(data)
+
+        logging.info('Scribus file created: %s', path)
+
+
+    def close(self):
+        pass
+
+
+class ArchiveSink:
+    # Output sink storing each generated file in a zip or tar archive, streamed to
+    # *file* as outputs are generated: a path, or a binary file object that needs not
+    # be seekable (eg standard output). Only the file being added is held in memory.
+    # *archive_format* is one of FORMATS, guessed from the name of *file* if not given.
+
+    FORMATS = ['zip', 'tar', 'tar.gz', 'tgz']
+
+    def __init__(self, file, archive_format=None, compression=zipfile.ZIP_DEFLATED):
+        if archive_format is None:
+            archive_format = self.guess_format(file)
+
+        if archive_format not in self.FORMATS:
+            raise ValueError('Unknown archive format: %s' % archive_format)
+
+        self.zip = archive_format == 'zip'
+
+        if self.zip:
+            self.archive = zipfile.ZipFile(file, 'w', compression)
+
+        else:
+            # stream mode, the tar file is never read back nor seeked
+            mode = 'w|' if archive_format == 'tar' else 'w|gz'
+
+            if isinstance(file, str):
+                self.archive = tarfile.open(file, mode)
+
+            else:
+                self.archive = tarfile.open(fileobj=file, mode=mode)
+
+
+    def guess_format(self, file) -> str:
+        name = file if isinstance(file, str) else getattr(file, 'name', '')
+
+        for archive_format in sorted(self.FORMATS, key=len, reverse=True):
+            if str(name).lower().endswith('.' + archive_format):
+                return archive_format
+
+        return 'tar'
+
+
+    def write(self, output_name: str, data: bytes, extension=CONST.FILE_EXTENSION_SCRIBUS):
+        name = output_name + CONST.SEP_EXT + extension
+
+        if self.zip:
+            self.archive.writestr(name, data)
+            return
+
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+
+        self.archive.addfile(info, io.BytesIO(data))
+
+
+    def close(self):
+        self.archive.close()
+
+
+class CallbackSink:
+    # Output sink passing each generated file to *callback*(output_name, data, extension),
+    # to store or send it as the application needs.
+
+    def __init__(self, callback):
+        self.callback = callback
+
+
+    def write(self, output_name: str, data: bytes, extension=CONST.FILE_EXTENSION_SCRIBUS):
+        self.callback(output_name, data, extension)
+
+
+    def close(self):
+        pass
+
+
+def is_gzip_file(path: str) -> bool:
+    # True if file *path* is gzip compressed, as Scribus may save documents (.sla.gz).
+    with open(path, 'rb') as file:
+        return file.read(2) == b'\x1f\x8b'
+
+
+def open_sla(path: str):
+    # Binary file object reading the SLA document *path*, decompressed on the fly if needed.
+    if is_gzip_file(path):
+        return gzip.open(path, 'rb')
+
+    return open(path, 'rb')
+
+
+def open_sla_output(path: str, compression: int, mode: str):
+    # File object writing the SLA document *path* in text ('w') or binary ('wb') *mode*,
+    # gzip compressed as it is written with a *compression* level from 1 to 9.
+    if compression:
+        return gzip.open(path, mode + 't' if mode == 'w' else mode, compression, encoding='utf-8' if mode == 'w' else None)
+
+    return open(path, mode, encoding='utf-8' if mode == 'w' else None)
+
+
+def create_temp_file(directory: str, suffix='.part', prefix='tmp', key=None):
+    # New file of a unique name in *directory*, like tempfile.mkstemp(), but with the
+    # permissions open() would give it as per the umask (applied when creating it):
+    # mkstemp() makes it readable by its owner only, that it would remain once renamed
+    # to its final name. Returns its (writable file descriptor, path). The name ends
+    # with the process id, host name, *key* of the run writing it if any (see
+    # remove_stale_temp_files) & *suffix*.
+    tag = '.%s.%s' % (os.getpid(), _host_name())
+
+    if key:
+        tag += CONST.SEP_EXT + key
+
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+
+    for attempt in range(tempfile.TMP_MAX):
+        temp_file = os.path.join(directory, prefix + os.urandom(6).hex() + tag + suffix)
+
+        try:
+            return (os.open(temp_file, flags, 0o666), temp_file)
+
+        except FileExistsError:
+            continue
+
+    raise FileExistsError('No unique temporary file name found in %s' % directory)
+
+
+def _host_name() -> str:
+    # name of this host, as found in the names of temporary files
+    return re.sub(r'[^A-Za-z0-9_-]', '_', socket.gethostname()) or 'localhost'
+
+
+@contextlib.contextmanager
+def written_atomically(path: str, sync=False, key=None):
+    # Temporary path to write the file *path* to, renamed to *path* once written
+    # & removed on error: a crash never leaves a partially written *path* behind.
+    # The temporary file is unique, for concurrent writes of the same *path*, and
+    # tagged with the *key* of the run (see create_temp_file).
+    # With *sync*, the file is on disk before being renamed, and the rename once
+    # done: *path* is complete after a reboot as well.
+    directory = os.path.dirname(path) or os.curdir
+    (handle, partial_file) = create_temp_file(
+        directory, '.part', CONST.SEP_EXT + os.path.basename(path) + CONST.SEP_EXT, key
+    )
+    os.close(handle)
+
+    try:
+        yield partial_file
+
+        if sync:
+            with open(partial_file, 'ab') as file:
+                os.fsync(file.fileno())
+
+    except BaseException:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+
+        raise
+
+    os.replace(partial_file, path)
+
+    if sync:
+        sync_directory(directory)
+
+
+def sync_directory(directory: str):
+    # Make the files renamed in *directory* durable (where directories can be opened).
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+
+    handle = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+
+    try:
+        os.fsync(handle)
+
+    finally:
+        os.close(handle)
+
+
+def remove_stale_temp_files(directory: str, key: str) -> int:
+    # Remove the temporary files (see create_temp_file) left in *directory* & its
+    # subdirectories by runs of *key* on this host whose process does not run
+    # anymore, eg killed. Those of other runs, shards or hosts sharing the directory
+    # are left alone. Returns their number.
+    if os.name != 'posix':
+        return 0
+
+    pattern = re.compile(r'\.(\d+)\.%s\.%s\.part$' % (re.escape(_host_name()), re.escape(key)))
+    removed = 0
+
+    for (path, directories, files) in os.walk(directory):
+        for name in files:
+            match = pattern.search(name)
+
+            if match is not None and not _is_running(int(match.group(1))):
+                os.remove(os.path.join(path, name))
+                removed += 1
+
+    return removed
+
+
+def _is_running(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+
+    try:
+        os.kill(pid, 0)
+
+    except ProcessLookupError:
+        return False
+
+    except PermissionError:
+        pass
+
+    return True
+
+
+def strip_sla_extension(path: str) -> str:
+    # *path* without its .sla or .sla.gz extension
+    if path.lower().endswith(CONST.SEP_EXT + CONST.FILE_EXTENSION_SCRIBUS_GZ):
+        path = path[:-len(CONST.SEP_EXT + 'gz')]
+
+    return os.path.splitext(path)[0]
+
+
+def _file_digest(path: str):
+    # sha256 of the content of file *path*, read by blocks.
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+
+    return digest
+
+
+class TemplateAnalysis:
+    # Everything derived from the SLA template before rendering its first batch:
+    # file version, records consumed by each document, CompiledTemplate, MergeGeometry
+    # (merge-mode only) and settings saved in the template. Stored in TemplateCache,
+    # under its *key*.
+
+    def __init__(self, version, records_in_document: int, template, geometry=None, settings=None, key=None):
+        self.key = key
+        self.version = version
+        self.records_in_document = records_in_document
+        self.template = template
+        self.geometry = geometry
+        self.settings = settings
+
+
+class TemplateCache:
+    # Directory of pickled TemplateAnalysis, so that templates used again are not
+    # parsed, serialized & compiled on each run. Entries are keyed by the content
+    # of the template file, the version of ScribusGenerator (and of this module,
+    # whose classes are pickled) and the options that change the analysis. Any
+    # entry that can't be read is analyzed again, the cache is only an optimization.
+    #
+    # The cache directory is private to the user, as loading a pickle may run code.
+
+    EXTENSION = '.pickle'
+
+    __source_hash = None
+
+    # Analyses also kept in memory by long-running processes (see ScribusGeneratorServer),
+    # an OrderedDict of the most recently used ones last. None to read them from disk only.
+    memory = None
+
+    def __init__(self, directory=CONST.TEMPLATE_CACHE_DIR, size=CONST.TEMPLATE_CACHE_SIZE):
+        self.directory = directory or self.default_directory()
+        self.size = size
+
+
+    def default_directory(self) -> str:
+        if os.name == 'nt':
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+
+        elif platform.system() == 'Darwin':
+            base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+        return os.path.join(base, 'ScribusGenerator')
+
+
+    def key(self, scribus_file: str, merge_mode) -> str:
+        # Hash of the template file content & of all the analysis depends on.
+        digest = _file_digest(scribus_file)
+        digest.update(repr((
+            CONST.SG_VERSION, self.source_hash(), bool(merge_mode), CONST.KEEP_TAB_LINEBREAK,
+            CONST.CLEAN_UNUSED_EMPTY_VARS, CONST.NEXT_RECORD
+        )).encode('utf-8'))
+
+        return digest.hexdigest()
+
+
+    def source_hash(self) -> str:
+        # Hash of this module, pickled entries depend on its classes.
+        if TemplateCache.__source_hash is None:
+            with open(os.path.abspath(__file__), 'rb') as file:
+                TemplateCache.__source_hash = hashlib.sha256(file.read()).hexdigest()
+
+        return TemplateCache.__source_hash
+
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.EXTENSION)
+
+
+    def load(self, key: str):
+        # Cached TemplateAnalysis for *key*, None if there is none.
+        if TemplateCache.memory is not None and key in TemplateCache.memory:
+            TemplateCache.memory.move_to_end(key)
+
+            return TemplateCache.memory[key]
+
+        path = self.path(key)
+
+        try:
+            with open(path, 'rb') as file:
+                analysis = pickle.load(file)
+
+        except FileNotFoundError:
+            logging.debug('Template analysis not found in cache: %s' % key)
+
+            return None
+
+        except Exception as exception:
+            logging.debug('Could not read template analysis from cache, ignoring it: %s' % exception)
+
+            return None
+
+        if not isinstance(analysis, TemplateAnalysis):
+            return None
+
+        # most recently used entries are evicted last
+        try:
+            os.utime(path)
+
+        except OSError:
+            pass
+
+        self.remember(key, analysis)
+
+        return analysis
+
+
+    def remember(self, key: str, analysis):
+        # keep *analysis* in memory (if enabled), along with the most recently used ones
+        if TemplateCache.memory is None:
+            return
+
+        TemplateCache.memory[key] = analysis
+        TemplateCache.memory.move_to_end(key)
+
+        while len(TemplateCache.memory) > self.size:
+            TemplateCache.memory.popitem(last=False)
+
+
+    def store(self, key: str, analysis):
+        # Write *analysis* under a temporary name then rename it, so that concurrent
+        # runs never read a partial entry, and evict the least recently used ones.
+        self.remember(key, analysis)
+        temp_file = None
+
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            (handle, temp_file) = tempfile.mkstemp(suffix='.part', dir=self.directory)
+
+            with os.fdopen(handle, 'wb') as file:
+                pickle.dump(analysis, file, pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_file, self.path(key))
+            temp_file = None
+
+            logging.debug('Template analysis stored in cache: %s' % key)
+
+            self.evict()
+
+        except (OSError, pickle.PicklingError) as exception:
+            logging.warning('Could not store template analysis in cache %s: %s' % (self.directory, exception))
+
+        finally:
+            if temp_file is not None and os.path.exists(temp_file):
+                os.remove(temp_file)
+
+
+    def evict(self):
+        entries = []
+
+        for name in os.listdir(self.directory):
+            if name.endswith(self.EXTENSION):
+                path = os.path.join(self.directory, name)
+
+                try:
+                    entries.append((os.path.getmtime(path), path))
+
+                except OSError:
+                    pass
+
+        entries.sort(reverse=True)
+
+        for (mtime, path) in entries[self.size:]:
+            try:
+                os.remove(path)
+                logging.debug('Template analysis removed from cache: %s' % path)
+
+            except OSError:
+                pass
+
+
+class CSVIndex:
+    # Byte offsets of every CSV_INDEX_STEP-th data row of a CSV file, so that a
+    # range of rows far from its start is read from a memory map of the file
+    # instead of parsing all the rows before it. Rows are found by the CSV reader
+    # itself, multi-line quoted fields included. The index is stored along with
+    # the CSV file (*file*.sgindex), and valid as long as the size and
+    # modification time of the file, and the reading options are unchanged.
+    #
+    # Only encodings where a newline is the single byte of ASCII are supported.
+
+    EXTENSION = '.sgindex'
+    MAGIC = b'ScribusGenerator CSV index 1\n'
+
+    def __init__(self, csv_file: str, encoding: str, delimiter: str, step=CONST.CSV_INDEX_STEP):
+        self.csv_file = csv_file
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.step = step
+        self.path = csv_file + self.EXTENSION
+        # number of data rows, and offsets of rows 1, step + 1, 2 * step + 1...
+        self.count = 0
+        self.offsets = array.array('Q')
+        # properties() of the CSV file when it was indexed
+        self.indexed_properties = None
+
+
+    def properties(self) -> dict:
+        # what the index depends on
+        status = os.stat(self.csv_file)
+
+        return {
+            'size': status.st_size, 'mtime': status.st_mtime_ns,
+            'encoding': self.encoding, 'delimiter': self.delimiter, 'step': self.step
+        }
+
+
+    def load(self) -> bool:
+        # Read the stored index, False if there is none or it is outdated.
+        try:
+            with open(self.path, 'rb') as file:
+                if file.readline() != self.MAGIC:
+                    return False
+
+                header = json.loads(file.readline().decode('utf-8'))
+
+                if header.get('properties') != self.properties():
+                    logging.debug('CSV index is outdated: %s' % self.path)
+
+                    return False
+
+                offsets = array.array('Q')
+                offsets.frombytes(file.read())
+
+        except (OSError, ValueError) as exception:
+            logging.debug('Could not read CSV index %s: %s' % (self.path, exception))
+
+            return False
+
+        if header.get('byteorder') != sys.byteorder:
+            offsets.byteswap()
+
+        self.count = header['count']
+        self.offsets = offsets
+        logging.debug('Using CSV index %s' % self.path)
+
+        return True
+
+
+    def build(self) -> bool:
+        # Index all the rows of the CSV file, False if it can't be.
+        if '\n'.encode(self.encoding) != b'\n':
+            logging.warning('CSV files encoded in %s can not be indexed, reading all rows.' % self.encoding)
+
+            return False
+
+        properties = self.properties()
+        offsets = array.array('Q')
+        count = 0
+
+        logging.info('Indexing CSV file %s' % self.csv_file)
+
+        try:
+            with self.open() as mapped:
+                position = [0]
+                reader = csv.reader(self.lines(mapped, position), delimiter=self.delimiter, skipinitialspace=True, doublequote=True)
+
+                # header row
+                next(reader, None)
+                start = position[0]
+
+                for row in reader:
+                    if row:
+                        if count % self.step == 0:
+                            offsets.append(start)
+
+                        count += 1
+
+                    start = position[0]
+
+        except (csv.Error, UnicodeDecodeError, ValueError) as exception:
+            logging.warning('Could not index CSV file %s, reading all rows: %s' % (self.csv_file, exception))
+
+            return False
+
+        if self.properties() != properties:
+            logging.warning('CSV file %s changed while being indexed, reading all rows.' % self.csv_file)
+
+            return False
+
+        self.count = count
+        self.offsets = offsets
+        self.indexed_properties = properties
+
+        return True
+
+
+    def store(self):
+        # Written under a temporary name then renamed. The index is only an optimization,
+        # it is used for the current run only if it can't be written.
+        temp_file = None
+
+        try:
+            (handle, temp_file) = create_temp_file(os.path.dirname(os.path.abspath(self.path)))
+
+            with os.fdopen(handle, 'wb') as file:
+                file.write(self.MAGIC)
+                file.write(json.dumps({
+                    'properties': self.indexed_properties, 'count': self.count, 'byteorder': sys.byteorder
+                }).encode('utf-8') + b'\n')
+                file.write(self.offsets.tobytes())
+
+            os.replace(temp_file, self.path)
+            temp_file = None
+
+            logging.debug('CSV index stored: %s' % self.path)
+
+        except OSError as exception:
+            logging.warning('Could not store CSV index %s: %s' % (self.path, exception))
+
+        finally:
+            if temp_file is not None and os.path.exists(temp_file):
+                os.remove(temp_file)
+
+
+    def rows(self, first_item: int):
+        # Generator of the rows of the CSV file (as csv.reader), from data row *first_item*,
+        # read from the closest indexed row.
+        if first_item > self.count:
+            return
+
+        (block, skip) = divmod(first_item - 1, self.step)
+
+        with self.open() as mapped:
+            mapped.seek(self.offsets[block])
+            reader = csv.reader(self.lines(mapped), delimiter=self.delimiter, skipinitialspace=True, doublequote=True)
+
+            for row in reader:
+                if skip == 0:
+                    yield row
+
+                elif row:
+                    skip -= 1
+
+
+    @contextlib.contextmanager
+    def open(self):
+        # read-only memory map of the CSV file
+        with open(self.csv_file, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield io.BytesIO()
+
+                return
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+
+    def lines(self, mapped, position=None):
+        # decoded lines of *mapped* from its current position, whose end is kept in *position*
+        for line in iter(mapped.readline, b''):
+            if position is not None:
+                position[0] += len(line)
+
+            yield line.decode(self.encoding)
+
+
+class GenerationManifest:
+    # Outputs generated in a directory from each template, with the digest of all
+    # they depend on: template (see TemplateCache.key), generation options, data
+    # records of the batch & its position. Stored as JSON in CONST.MANIFEST_FILE
+    # of the output directory, so that incremental generation skips the outputs
+    # that would be generated again identically, and removes those that would
+    # not be generated anymore. Merged & separate outputs are recorded apart, as
+    # well as the outputs of each shard.
+
+    VERSION = 1
+
+    def __init__(self, directory: str, scribus_file: str, template_key: str, options, extensions: list, merge_mode=False, shard=None):
+        self.path = os.path.join(directory, CONST.MANIFEST_FILE)
+        self.directory = directory
+        self.template = os.path.abspath(scribus_file)
+        self.section = 'merged' if merge_mode else 'files' if shard is None else 'files-' + shard.name
+        self.extensions = extensions
+        self.base = hashlib.sha256(json.dumps([template_key, options], sort_keys=True).encode('utf-8')).hexdigest()
+
+        self.previous = self.read().get(self.template, {}).get(self.section, {})
+        self.current = {}
+        self.skipped = []
+
+
+    def read(self) -> dict:
+        # Outputs of all templates, by template path, section then output name.
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+
+        except FileNotFoundError:
+            return {}
+
+        except (OSError, ValueError) as exception:
+            logging.warning('Could not read generation manifest %s, generating all files: %s' % (self.path, exception))
+
+            return {}
+
+        if not isinstance(manifest, dict) or manifest.get('version') != self.VERSION:
+            return {}
+
+        return manifest.get('templates', {})
+
+
+    def digest(self, index_first_of_batch: int, records: list) -> str:
+        # Digest of the output of the batch of *records* starting at *index_first_of_batch*.
+        return hashlib.sha256(json.dumps(
+            [self.base, index_first_of_batch, [dict(record) for record in records]], sort_keys=True, default=str
+        ).encode('utf-8')).hexdigest()
+
+
+    def is_current(self, output_name: str, digest: str) -> bool:
+        # Whether *output_name* was generated with *digest*, and its files are still there.
+        return self.previous.get(output_name) == digest and all(
+            os.path.isfile(self.file_path(output_name, extension)) for extension in self.extensions
+        )
+
+
+    def find(self, digest: str):
+        # Name of a current output generated with *digest*, None if there is none.
+        for (output_name, output_digest) in self.previous.items():
+            if output_digest == digest and self.is_current(output_name, digest):
+                return output_name
+
+        return None
+
+
+    def record(self, output_name: str, digest: str):
+        self.current[output_name] = digest
+
+
+    def skip(self, output_name: str, digest: str):
+        trace_log.debug('Output %s is unchanged, skipped', output_name)
+
+        self.skipped.append(output_name)
+        self.record(output_name, digest)
+
+
+    def file_path(self, output_name: str, extension: str) -> str:
+        return self.directory + CONST.SEP_PATH + output_name + CONST.SEP_EXT + extension
+
+
+    def remove_stale(self) -> list:
+        # Remove the files of outputs generated previously but not anymore.
+        stale = [output_name for output_name in self.previous if output_name not in self.current]
+
+        for output_name in stale:
+            for extension in (CONST.FILE_EXTENSION_SCRIBUS, CONST.FILE_EXTENSION_SCRIBUS_GZ, CONST.FILE_EXTENSION_PDF):
+                path = self.file_path(output_name, extension)
+
+                if os.path.isfile(path):
+                    os.remove(path)
+                    logging.info('Removed output of a data record that disappeared: %s' % path)
+
+        return stale
+
+
+    def save(self):
+        # Written under a temporary name then renamed, the outputs of other
+        # templates are read again just before, in case they were updated.
+        manifest = self.read()
+        manifest.setdefault(self.template, {})[self.section] = self.current
+
+        (handle, temp_file) = create_temp_file(self.directory)
+
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as file:
+                json.dump({'version': self.VERSION, 'templates': manifest}, file, sort_keys=True, indent=1)
+
+            os.replace(temp_file, self.path)
+
+        except BaseException:
+            os.remove(temp_file)
+
+            raise
+
+
+class GenerationCheckpoint:
+    # Journal of the outputs completed by a generation run with --resume, in
+    # CONST.CHECKPOINT_FILE of the output directory: a header identifying the run
+    # (template, options, data & shard), then one JSON line per document completed
+    # (in any order) and per PDF file exported, each written to disk once its file
+    # is (see written_atomically).
+    # The next run of the same generation resumes after the documents completed
+    # (and still there), and only exports the PDF files not exported yet. The
+    # journal is removed once the run completes.
+
+    VERSION = 1
+
+    def __init__(self, directory: str, scribus_file: str, run_key: str, sla_extension: str, shard=None, manifest=None):
+        self.path = os.path.join(directory, CONST.CHECKPOINT_FILE % (
+            os.path.basename(strip_sla_extension(scribus_file)) + ('' if shard is None else '-' + shard.name)
+        ))
+        self.directory = directory
+        self.run_key = run_key
+        # tags the temporary files of the run, see remove_stale_temp_files
+        self.temp_key = run_key[:16]
+        self.sla_extension = sla_extension
+        self.manifest = manifest
+        self.lock = threading.Lock()
+        self.file = None
+
+        # (document, output name, manifest digest) of the documents completed, and PDF files exported
+        self.documents = []
+        self.exported = set()
+
+
+    def load(self):
+        # Entries of the journal of an interrupted run of the same generation, if any.
+        # A line cut short by a crash ends the journal.
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                header = json.loads(file.readline())
+
+                if header.get('version') != self.VERSION or header.get('run') != self.run_key:
+                    logging.info('Checkpoint %s is of another generation, generating all files.' % self.path)
+
+                    return
+
+                for line in file:
+                    entry = json.loads(line)
+
+                    if 'document' in entry:
+                        self.documents.append((entry['document'], entry['output'], entry.get('digest')))
+
+                    else:
+                        self.exported.add(entry['exported'])
+
+        except FileNotFoundError:
+            return
+
+        except (OSError, ValueError, KeyError, AttributeError) as exception:
+            logging.debug('Checkpoint %s ends: %s' % (self.path, exception))
+
+
+    def resume(self, documents: range) -> int:
+        # Number of leading *documents* completed, whose files are still there, from
+        # which the journal is started again.
+        entries = dict((entry[0], entry) for entry in self.documents)
+        completed = 0
+
+        for document in documents:
+            if document not in entries:
+                break
+
+            output_name = entries[document][1]
+
+            if not (os.path.isfile(self.file_path(output_name, self.sla_extension))
+                    or self.is_exported(output_name, CONST.FILE_EXTENSION_PDF)):
+                break
+
+            completed += 1
+
+        self.documents = [entries[document] for document in documents[:completed]]
+        self.exported.intersection_update(output_name for (document, output_name, digest) in self.documents)
+
+        if completed:
+            logging.info('Resuming generation after %s completed document(s), recorded in %s' % (completed, self.path))
+
+        # Outputs of the completed documents are still current (incremental generation only)
+        if self.manifest is not None:
+            for (document, output_name, digest) in self.documents:
+                if digest is not None:
+                    self.manifest.record(output_name, digest)
+
+        # Temporary files of the interrupted run are of no use
+        removed = remove_stale_temp_files(self.directory, self.temp_key)
+
+        if removed:
+            logging.info('Removed %s partially written file(s) of the interrupted run.' % removed)
+
+        # Written anew with the entries kept, then appended to
+        (handle, temp_file) = create_temp_file(self.directory, key=self.temp_key)
+
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as file:
+                file.write(json.dumps({'version': self.VERSION, 'run': self.run_key}) + '\n')
+
+                for (document, output_name, digest) in self.documents:
+                    file.write(json.dumps({'document': document, 'output': output_name, 'digest': digest}) + '\n')
+
+                for output_name in sorted(self.exported):
+                    file.write(json.dumps({'exported': output_name}) + '\n')
+
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temp_file, self.path)
+            sync_directory(self.directory)
+
+        except BaseException:
+            os.remove(temp_file)
+
+            raise
+
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+        return completed
+
+
+    def outputs(self) -> list:
+        # Names of the outputs of the completed documents, in order.
+        return [output_name for (document, output_name, digest) in self.documents]
+
+
+    def is_exported(self, output_name: str, extension: str) -> bool:
+        return output_name in self.exported and os.path.isfile(self.file_path(output_name, extension))
+
+
+    def complete(self, document: int, output_name: str):
+        # Record *document* as completed, once its output is written (or skipped).
+        digest = self.manifest.current.get(output_name) if self.manifest is not None else None
+
+        self.__write({'document': document, 'output': output_name, 'digest': digest})
+
+
+    def export(self, output_name: str):
+        # Record the PDF file of *output_name* as exported, from any thread.
+        self.exported.add(output_name)
+        self.__write({'exported': output_name})
+
+
+    def file_path(self, output_name: str, extension: str) -> str:
+        return self.directory + CONST.SEP_PATH + output_name + CONST.SEP_EXT + extension
+
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+    def remove(self):
+        # Forget the journal, once the run completed.
+        self.close()
+
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+    def __write(self, entry: dict):
+        with self.lock:
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+
+class Shard:
+    # Part *number* (from 1) of *count* of a generation, run for instance by one of
+    # several render nodes. Documents (batches of records) are dealt out in
+    # 'contiguous' blocks or 'round-robin', and keep their numbering & output names
+    # in all documents. Each completed shard is recorded in a manifest in the output
+    # directory (CONST.SHARD_MANIFEST_FILE), see check().
+
+    MODES = ('contiguous', 'round-robin')
+    VERSION = 1
+
+    def __init__(self, number: int, count: int, mode=CONST.SHARD_MODE):
+        if count < 1 or not 1 <= number <= count:
+            raise ValueError('shard must be from 1 to the number of shards')
+
+        if mode not in self.MODES:
+            raise ValueError('mode must be one of %s' % ', '.join(self.MODES))
+
+        self.number = number
+        self.count = count
+        self.mode = mode
+        self.name = '%s-of-%s' % (number, count)
+
+
+    @classmethod
+    def parse(cls, text: str, mode=CONST.SHARD_MODE):
+        # Shard "i/N"
+        try:
+            (number, count) = [int(part) for part in str(text).split('/')]
+
+        except ValueError:
+            raise ValueError('shard must be written i/N')
+
+        return cls(number, count, mode)
+
+
+    def batches(self, total: int) -> range:
+        # Documents of this shard, among *total* documents numbered from 0.
+        if self.mode == 'round-robin':
+            return range(self.number - 1, total, self.count)
+
+        return range(total * (self.number - 1) // self.count, total * self.number // self.count)
+
+
+    @staticmethod
+    def manifest_path(directory: str, scribus_file: str, number, count) -> str:
+        return os.path.join(directory, CONST.SHARD_MANIFEST_FILE % (
+            os.path.basename(strip_sla_extension(scribus_file)), number, count
+        ))
+
+
+    def write_manifest(self, directory: str, scribus_file: str, analysis, data_count: int, outputs: list):
+        # Record the completion of this shard, with what it depends on & generated.
+        total = math.ceil(data_count / analysis.records_in_document)
+        documents = self.batches(total)
+        path = self.manifest_path(directory, scribus_file, self.number, self.count)
+
+        os.makedirs(directory, exist_ok=True)
+        (handle, temp_file) = create_temp_file(directory)
+
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as file:
+                json.dump({
+                    'version': self.VERSION, 'template': os.path.abspath(scribus_file), 'template_key': analysis.key,
+                    'shard': self.number, 'shards': self.count, 'mode': self.mode, 'records': data_count,
+                    'documents': total, 'range': [documents.start, documents.stop, documents.step],
+                    'outputs': outputs, 'completed': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+                }, file, sort_keys=True, indent=1)
+
+            os.replace(temp_file, path)
+
+        except BaseException:
+            os.remove(temp_file)
+
+            raise
+
+        logging.info('Shard %s/%s completed, recorded in %s' % (self.number, self.count, path))
+
+
+    @classmethod
+    def check(cls, directory: str, scribus_file: str) -> list:
+        # Problems with the shard manifests of *scribus_file* in *directory*: missing
+        # shards, shards of different generations, documents generated more than once
+        # or not at all, and output names generated by several documents.
+        name = CONST.SHARD_MANIFEST_FILE % (os.path.basename(strip_sla_extension(scribus_file)), '\0', '\0')
+        pattern = re.compile(r'\d+'.join(re.escape(part) for part in name.split('\0')) + '$')
+        manifests = {}
+
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if pattern.match(name):
+                try:
+                    with open(os.path.join(directory, name), 'r', encoding='utf-8') as file:
+                        manifest = json.load(file)
+
+                except (OSError, ValueError) as exception:
+                    return ['could not read shard manifest %s: %s' % (name, exception)]
+
+                if manifest.get('version') == cls.VERSION:
+                    manifests[(manifest['shard'], manifest['shards'])] = manifest
+
+        if not manifests:
+            return ['no shard manifest for %s in %s' % (os.path.basename(scribus_file), directory)]
+
+        problems = []
+        runs = set((m['shards'], m['mode'], m['template_key'], m['records'], m['documents']) for m in manifests.values())
+
+        if len(runs) > 1:
+            return ['shard manifests of different generations (shards, mode, template or data): %s' % sorted(
+                '%s/%s' % key for key in manifests
+            )]
+
+        (count, mode, template_key, records, total) = runs.pop()
+        problems.extend('shard %s/%s did not complete' % (number, count) for number in range(1, count + 1)
+                        if (number, count) not in manifests)
+
+        generated = bytearray(total)
+        names = {}
+
+        for ((number, count), manifest) in sorted(manifests.items()):
+            for document in range(*manifest['range']):
+                generated[document] += 1
+
+            for name in manifest['outputs']:
+                if name in names:
+                    problems.append('%s generated by shards %s and %s' % (name, names[name], number))
+
+                names[name] = number
+
+        missing = generated.count(0)
+        repeated = total - missing - generated.count(1)
+
+        if missing:
+            problems.append('%s document(s) of %s not generated by any shard' % (missing, total))
+
+        if repeated:
+            problems.append('%s document(s) of %s generated more than once' % (repeated, total))
+
+        return problems
+
+
+class PDFExportPool:
+    # Pool of headless Scribus processes exporting SLA files to PDF in parallel.
+    # Each process runs CONST.PDF_EXPORT_SCRIPT, that reads the files to export on
+    # its standard input and reports the outcome of each on its standard output.
+    # Files are handed out to the processes through a queue, a process that dies
+    # (eg Scribus crash) fails its current file and is restarted for the next ones.
+
+    def __init__(self, processes=1, executable=CONST.SCRIBUS_EXECUTABLE, key=None, timeout=CONST.PDF_EXPORT_TIMEOUT):
+        self.processes = max(processes, 1)
+        self.executable = executable
+        self.timeout = timeout
+        # key of the temporary PDF files, see create_temp_file
+        self.key = key
+        self.script = os.path.join(
+            os.path.abspath(os.path.dirname(__file__)), CONST.PDF_EXPORT_SCRIPT
+        )
+
+
+    def export(self, pdf_files: list, exported=None) -> list:
+        # Export all (sla_file, pdf_file) of *pdf_files*, returns the list of
+        # (sla_file, pdf_file, error) in the same order, error is None on success.
+        # *exported* is called (from the thread of a process) with the position
+        # of each file in *pdf_files* as soon as it is exported.
+        tasks = queue.Queue()
+        results = []
+
+        for (position, (sla_file, pdf_file)) in enumerate(pdf_files):
+            tasks.put((position, sla_file, pdf_file))
+            results.append((sla_file, pdf_file, 'not exported'))
+
+        workers = [
+            threading.Thread(target=self.__work, args=(tasks, results, exported))
+            for i in range(min(self.processes, len(results)))
+        ]
+
+        logging.info('Exporting %s PDF file(s) with %s Scribus process(es)' % (len(results), len(workers)))
+
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+        return results
+
+
+    def start_process(self):
+        process = subprocess.Popen(
+            [self.executable, '-g', '-ns', '-py', self.script],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            encoding='utf-8', bufsize=1
+        )
+
+        # lines of its output, read by a thread of their own so that waiting for them
+        # can time out (a hung Scribus, eg on a modal dialog), None once it ends
+        process.lines = queue.SimpleQueue()
+        threading.Thread(target=self.__read, args=(process,), daemon=True).start()
+
+        return process
+
+
+    def __read(self, process):
+        try:
+            with process.stdout:
+                for line in process.stdout:
+                    process.lines.put(line)
 
-        # (3) Inform about it
-        logging.info('Source document consumes %s data record(s) from %s.' % (
-            records_in_document, data_count
-        ))
+        except (OSError, ValueError) as exception:
+            logging.debug('Lost output of Scribus process: %s' % exception)
 
-        # Overwrite attributes from their /*/ItemAttribute[Parameter=SGAttribute] sibling, when applicable
-        # Initialize template element & document properties
-        template_element = self.overwrite_with_sg_attributes(root)
-        pages_count = page_height = vertical_gap = groups_count = objects_count = 0
+        finally:
+            process.lines.put(None)
 
-        # Store keys of data items
-        self.headers = list(data[0].keys())
 
-        logging.info('Variables from data file(s): %s' % self.headers)
+    def __work(self, tasks: queue.Queue, results: list, exported=None):
+        # Export files from the *tasks* queue with one Scribus process, until the queue is empty.
+        process = None
 
-        # Create list for generated files & set index for current data record
-        output_files = []
-        index_current = 1
-        index_first_of_batch = 1
+        try:
+            while True:
+                try:
+                    (position, sla_file, pdf_file) = tasks.get_nowait()
 
-        # Create buffer & output variable
-        buffer = []
-        output = ''        
+                except queue.Empty:
+                    return
 
-        for item in data:
-        # each iteration substitutions 1 x the template, consuming required 
-        # data entries per active options.
-        #
-        # invariant: data has been substituted up to data[index_current-1], and
-        # SLA code is stored accordingly in output,
-        # SLA files have been generated up to index_current-1 entry as per generation
-        # options and number of records consumed by the source template.
+                if process is None:
+                    try:
+                        process = self.start_process()
 
-            # Add values to buffer
-            buffer.append(item)
+                    except OSError as exception:
+                        results[position] = (sla_file, pdf_file, 'Could not start %s: %s' % (self.executable, exception))
 
-            # Check if ..
-            # (1) .. done buffering data for current document OR
-            # (2) .. last data record
-            if index_current % records_in_document == 0 or index_current == data_count:
-                logging.debug(
-                    'Substituting buffer, with index_current being %s and index_first_of_batch %s' % (index_current, index_first_of_batch)
-                )
-                
-                # Generate output
-                output = self.substitute_data(self.headers,
-                    self.encode_scribus_xml(buffer),
-                    ET.tostring(template_element, method='xml').decode().split('\n'),
-                    CONST.KEEP_TAB_LINEBREAK, index_first_of_batch=index_first_of_batch
-                )
-                
-                # Check if merge-mode is selected ..
-                if merge_mode:
-                    # Update DOCUMENT properties on first substitution
-                    if index_current == min(records_in_document, data_count):
-                        logging.debug('Generating reference content from buffer at #%s' % index_current)
-                        scribus_element= ET.fromstring(output)
-                        document_element = scribus_element.find('DOCUMENT')
-                        pages_count = int(document_element.get('ANZPAGES'))
-                        page_height = float(document_element.get('PAGEHEIGHT'))
-                        vertical_gap = float(document_element.get('GapVertical'))
-                        groups_count = int(document_element.get('GROUPC'))
-                        objects_count = len(scribus_element.findall('.//PAGEOBJECT'))
-                        version = str(scribus_element.get('Version')) #str(document_element.get('DOCDATE'))
+                        continue
 
-                        logging.debug('Current template has #%s page objects' % objects_count)
+                error = self.__export(process, sla_file, pdf_file)
+                results[position] = (sla_file, pdf_file, error)
 
-                        document_element.set('ANZPAGES',
-                            str(math.ceil(pages_count * data_count // records_in_document))
-                        )
+                if error is None and exported is not None:
+                    exported(position)
 
-                        document_element.set('DOCCONTRIB',
-                            document_element.get('DOCCONTRIB') + CONST.CONTRIB_TEXT
-                        )
+                if process.poll() is not None:
+                    self.__close(process)
+                    process = None
 
-                    # Append DOCUMENT content
-                    logging.debug('Merging content from buffer up to entry index_current #%s' % index_current)
-
-                    shifted_elements = self.shift_pages_and_objects(
-                        ET.fromstring(output).find('DOCUMENT'),
-                        pages_count,
-                        page_height,
-                        vertical_gap,
-                        index_current - 1,
-                        records_in_document,
-                        groups_count,
-                        objects_count,
-                        version
-                    )
+        finally:
+            if process is not None:
+                self.__close(process)
 
-                    if index_current > records_in_document:
-                        document_element.extend(shifted_elements)
 
-                # .. otherwise, write one of multiple SLA files
-                else:
-                    #logging.debug('writing one file with buffer %s' % item)
-                    output_file = self.create_output_file(
-                        index_current, self.__dataObject.getOutputFileName(), item, len(str(data_count))
-                    )
+    def __close(self, process):
+        # End of input for *process*, that exits (unless it did already) & is waited for.
+        try:
+            process.stdin.close()
 
-                    self.write_sla_file(ET.fromstring(output), output_file)
-                    output_files.append(output_file)
+        except OSError:
+            pass
 
-                buffer = []
-                index_first_of_batch = index_current + 1
+        process.wait()
 
-            index_current += 1
 
-        # Clean & write single SLA file (merge-mode only)
-        if merge_mode:
-            var_names_dic = dict(list(zip(self.headers,self.headers)))
-            #logging.debug('writing merged file with dic %s' % var_names_dic)
-            output_file = self.create_output_file(
-                index_current-1, self.__dataObject.getOutputFileName(), var_names_dic, len(str(data_count))
-            )
+    def __export(self, process, sla_file: str, pdf_file: str):
+        # Send one file to export to *process* & wait for its outcome, at most *timeout*
+        # seconds: the process is then killed, and restarted for the next files.
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
 
-            self.write_sla_file(scribus_element, output_file)
-            output_files.append(output_file)
+        try:
+            process.stdin.write(json.dumps([os.path.abspath(sla_file), os.path.abspath(pdf_file), self.key]) + '\n')
+            process.stdin.flush()
 
-        return output_files
+            # Skip anything else Scribus may print
+            while True:
+                line = process.lines.get(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
 
+                if line is None:
+                    break
 
-    def overwrite_with_sg_attributes(self, root):
-        # modifies root such that
-        # attributes have been rewritten from their /*/ItemAttribute[Parameter=SGAttribute] sibling, when applicable.
-        #
-        # allows to use %VAR_<var-name>% in Item Attribute to overwrite internal attributes (eg FONT)
+                if line.startswith(CONST.PDF_EXPORT_MARKER):
+                    return json.loads(line[len(CONST.PDF_EXPORT_MARKER):])[1]
 
-        for page_object in root.findall('.//ItemAttribute[@Parameter="SGAttribute"]/../..'):
-            for sga in page_object.findall('.//ItemAttribute[@Parameter="SGAttribute"]'):
-                reference = sga.get('RelationshipTo')
+        except queue.Empty:
+            process.kill()
+            process.wait()
 
-                # Cannot use 'default' on .get() as it is '' (empty string) by default in SLA file
-                if reference == '':
-                    # target is page_object by default. Cannot use ".|*" as not supported by ET
-                    reference = '.'
+            return 'Scribus process did not export the file within %s seconds, killed' % self.timeout
 
-                # ET cannot use absolute path on element
-                elif reference.startswith('/'):
-                    reference = '.' + reference
+        except (OSError, ValueError) as exception:
+            logging.debug('Lost Scribus process: %s' % exception)
 
-                attribute = sga.get('Name')
-                value = sga.get('Value')
-                #logging.debug('parsing SGAttribute with Name %s and Value %s, while reference is "%s"' % (attribute, value, reference)
+        process.kill()
 
-                try:
-                    targets = page_object.findall(reference)
+        return 'Scribus process exited with code %s' % process.wait()
 
-                    if targets:
-                        for target in targets:
-                            logging.debug('Overwriting value of %s in %s with "%s"' % (
-                                attribute, target.tag, value
-                            ))
 
-                            target.set(attribute, value)
-                    else:
-                        # TODO: Message to user
-                        logging.error(
-                            'Target "%s" could be parsed but designated no node. ' +
-                            'Check it out as it is probably not what you expected to replace %s.' % (
-                                reference, attribute
-                            )
-                        )
+class GenerationStats:
+    # Time spent in each stage of the generation, and counters of what was done,
+    # reported by --stats. Stages of parallel generation are timed in each worker
+    # process and summed, they can thus add up to more than the elapsed time.
 
-                except SyntaxError:
-                    # TODO: Message to user
-                    logging.error(
-                        'XPATH expression "%s" could not be parsed ' +
-                        'by ElementTree to overwrite %s. Skipping.' % (
-                            reference, attribute
-                        )
-                    )
+    STAGES = (
+        'template_parse', 'data_parse', 'substitution', 'cleanup', 'xml_reparse',
+        'serialization', 'file_write', 'pdf_export'
+    )
+    COUNTERS = (
+        'templates', 'records', 'files_generated', 'files_skipped', 'bytes_written',
+        'variables_substituted', 'variables_cleaned', 'empty_texts_removed',
+        'empty_frames_removed', 'pdf_files_exported'
+    )
+    METRICS_PREFIX = 'scribusgenerator_'
 
-        return root
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.reset()
 
 
-    def multiple_replace(self, string: str, replacements: dict) -> str:
-        # multiple simultaneous string replacements, per http://stackoverflow.com/a/15448887/1694411)
-        # combine with dictionary = dict(zip(keys, values)) to use on arrays
-        pattern = re.compile("|".join([re.escape(k) for k in replacements.keys()]), re.M)
+    def reset(self):
+        self.durations = dict.fromkeys(self.STAGES, 0.0)
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
 
-        return pattern.sub(lambda x: replacements[x.group(0)], str(string))
 
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
 
-    def encode_scribus_xml(self, data: list) -> list:
-        # Encode some characters that can be found in CSV into XML entities
-        # not all are needed as Scribus handles most UTF8 characters just fine.
-        replacements = {'&': '&amp;', '"': '&quot;', '<': '&lt;'}
+        try:
+            yield
 
-        result = []
+        finally:
+            self.durations[name] += time.perf_counter() - start
 
-        for item in data:
-            result.append([
-                self.multiple_replace(value, replacements) for value in item.values()
-            ])
 
-        return result
+    def add_time(self, name: str, seconds: float):
+        self.durations[name] += seconds
 
 
-    def substitute_data(self, var_names: list, data: list, template: list, keep_tabs_lf=0, clean=CONST.CLEAN_UNUSED_EMPTY_VARS, index_first_of_batch=0):
-        # for each list of *data* array, substitute all %VAR_*var_names*% placeholders in 
-        # *template* array with the *data* value at the same index (in local data subset).
-        #  Return concatenated substituted template.
-        
-        # done in string instead of XML for lack of efficient
-        # attribute-value-based substring-search in ElementTree
-        # but that makes NEXT-RECORD token position in XML critical.
-        
-        result = ''
-        index = 0
-        replacements_outdated = 1
-
-        for line in template:
-            
-            # Skip redundant computations & preserve colors declarations
-            if re.search('%VAR_|' + CONST.NEXT_RECORD, line) == None or re.search('\s*<COLOR\s+', line) != None:
-                result = result + line
-                # logging.debug("  keeping intact %s"%line[:30])
-                continue
+    def count(self, name: str, value=1):
+        self.counters[name] += value
 
-            # Initialize data record replacements
-            if replacements_outdated:
-                if index < len(data):
-                    replaced_strings = data[index]                
-                else: # empty remplacements after available data is consumed.
-                    replaced_strings = [""] * len(var_names)
-                
-                replacements = dict(list(zip(
-                    ['%VAR_' + n + '%' for n in var_names],
-                    replaced_strings
-                )))
-                replacements['%VAR_' + CONST.OUTPUTCOUNT_VAR + '%'] = str(index + index_first_of_batch)
-
-                logging.debug('Replacements updated: %s' % replacements)
-                replacements_outdated = 0
-            
-            
-            # Look for 'NEXT_RECORD' entry
-            if CONST.NEXT_RECORD in line:
-                index += 1
-                replacements_outdated = 1
-                
-            # Replace placeholders with actual data
-            logging.debug("replacing VARS_* in %s" % line[:50].strip())
-            #logging.debug("  with replacements %s" % replacements)
-            line = self.multiple_replace(line, replacements)
-            #logging.debug("replaced in line: %s" % line)
-
-            # Remove (& trim) any (unused) %VAR_\w*% like string
-            if clean:
-                # TODO: is there a way to input warning
-                # "data not found for variable named XX"
-                # instead of the number
-                if CONST.REMOVE_CLEANED_ELEMENT_PREFIX:
-                    (line, count) = re.subn('\s*[,;-]*\s*%VAR_\w*%\s*', '', line)
-
-                # TODO: is there a way to input warning
-                # "data not found for variable named XX"
-                # instead of the number
-                else:
-                    (line, count) = re.subn('\s*%VAR_\w*%\s*', '', line)
 
-                if (count > 0):
-                    logging.debug("cleaned %d empty variable(s)" % count)
+    def iterate(self, name: str, iterable):
+        # Items of *iterable*, the time spent getting each of them is added to stage *name*.
+        iterator = iter(iterable)
 
-                (line, count) = re.subn('\s*%s\w*\s*' % CONST.NEXT_RECORD, '', line)
+        while True:
+            start = time.perf_counter()
 
-            # convert \t and \n into scribus <tab/> and <linebreak/>
-            if keep_tabs_lf == 1 and re.search('[\t\n]+', line, flags=re.MULTILINE):
-                matches = re.search(
-                    '(<ITEXT.* CH=")([^"]+)(".*/>)', line, flags=re.MULTILINE | re.DOTALL)
+            try:
+                item = next(iterator)
 
-                if matches:
-                    matches_start = matches.group(1)
-                    matches_stop = matches.group(3)
-                    # logging.debug("converting tabs and linebreaks in line: %s"%(line))
+            except StopIteration:
+                return
 
-                    line = re.sub(
-                        '([\t\n]+)', matches_stop + '\g<1>' + matches_start, line, flags=re.MULTILINE
-                    )
+            finally:
+                self.durations[name] += time.perf_counter() - start
 
-                    # Replace \t and \n
-                    line = re.sub('\t', '<tab />', line)
-                    line = re.sub('\n', '<breakline />', line, flags=re.MULTILINE)
+            yield item
 
-                    logging.debug('Converted tabs and linebreaks in line: %s' % line)
 
-                else:
-                    logging.warning(
-                        'Could not convert tabs and linebreaks in this line, ' +
-                        'kindly report this to the developers: %s' % line
-                    )
+    def take(self) -> tuple:
+        # (durations, counters) since the last call, for merge() in the main process.
+        taken = (self.durations, self.counters)
+        self.reset()
 
-            result = result + line
+        return taken
 
-        return result
 
+    def merge(self, taken):
+        (durations, counters) = taken
 
-    def shift_pages_and_objects(self,
-        document_element,
-        pages_count,
-        page_height,
-        vertical_gap,
-        index,
-        records_in_document,
-        groups_count,
-        objects_count, version
-    ):
-        vertical_offset = (
-            (float(page_height) + float(vertical_gap))
-            * (index // records_in_document)
-            * (pages_count // 2 if document_element.get("BOOK") == "1" else pages_count)
-        )
+        for (name, seconds) in durations.items():
+            self.durations[name] += seconds
 
-        #logging.debug("shifting to vertical_offset %s " % (vertical_offset))
+        for (name, value) in counters.items():
+            self.counters[name] += value
 
-        shifted = []
 
-        for page in document_element.findall('PAGE'):
-            page.set('PAGEYPOS', str(float(page.get('PAGEYPOS')) + vertical_offset))
-            page.set('NUM', str(int(page.get('NUM')) + pages_count))
+    def peak_rss(self) -> tuple:
+        # Peak resident memory in bytes of this process and of its terminated child
+        # processes (generation workers & headless Scribus), None if unknown.
+        if resource is None:
+            return (None, None)
 
-            shifted.append(page)
+        # kilobytes on Linux, bytes on macOS
+        unit = 1 if sys.platform == 'darwin' else 1024
 
-        for page_object in document_element.findall('PAGEOBJECT'):
-            y_position = page_object.get('YPOS')
+        return (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+        )
 
-            if y_position == '':
-                y_position = 0
 
-            #logging.debug("original YPOS is %s " % (y_position))
+    def report(self) -> dict:
+        elapsed = time.perf_counter() - self.start_time
+        (peak_rss, peak_rss_children) = self.peak_rss()
 
-            page_object.set('YPOS', str(float(y_position) + vertical_offset))
-            page_object.set('OwnPage', str(int(page_object.get('OwnPage')) + pages_count))
+        return {
+            'version': CONST.SG_VERSION,
+            'elapsed_seconds': elapsed,
+            'stages_seconds': dict(self.durations),
+            'counters': dict(self.counters),
+            'records_per_second': self.counters['records'] / elapsed if elapsed else 0.0,
+            'bytes_written_per_second': self.counters['bytes_written'] / elapsed if elapsed else 0.0,
+            'peak_rss_bytes': peak_rss,
+            'peak_rss_children_bytes': peak_rss_children
+        }
 
-            # Update ID and links
-            if version.startswith('1.4'):
-                #                if not (int(page_object.get('NUMGROUP')) == 0):
-                #                    page_object.set('NUMGROUP', str(int(page_object.get('NUMGROUP')) + groups_count * index))
-                # next linked frame by position
 
-                if (page_object.get('NEXTITEM') != None and (str(page_object.get('NEXTITEM')) != "-1")):
-                    page_object.set('NEXTITEM', str(
-                        int(page_object.get('NEXTITEM')) + (objects_count * index))
-                    )
+    def write_json(self, path: str):
+        self.__write(path, json.dumps(self.report(), indent=2, sort_keys=True) + '\n')
 
-                # previous linked frame by position
-                if (page_object.get('BACKITEM') != None and (str(page_object.get('BACKITEM')) != "-1")):
-                    page_object.set('BACKITEM', str(
-                        int(page_object.get('BACKITEM')) + (objects_count * index))
-                    )
+        logging.info('Generation statistics written to %s' % path)
 
-            # Version 1.5 / 1.6
-            else:
-                logging.debug("version is %s shifting object %s (#%s)" %
-                              (version, page_object.tag, page_object.get('ItemID')))
-                logging.debug("index is %s" %(index))
-
-                # TODO: Update ID with something unlikely allocated
-                # TODO: Ensure unique ID instead of 6:, issue #101
-                page_object.set('ItemID',
-                    str(objects_count * index) + str(int(page_object.get('ItemID')))[7:]
-                )
 
-                # next linked frame by ItemID
-                if (page_object.get('NEXTITEM') != None and (str(page_object.get('NEXTITEM')) != '-1')):
-                    page_object.set('NEXTITEM',
-                        str(objects_count * index) + str(int(page_object.get('NEXTITEM')))[7:]
-                    )
+    def write_openmetrics(self, path: str):
+        # OpenMetrics text format, as read by the textfile collector of the
+        # Prometheus node exporter (that needs the file to be replaced atomically).
+        report = self.report()
+        lines = []
 
-                # previous linked frame by ItemID
-                if (page_object.get('BACKITEM') != None and (str(page_object.get('BACKITEM')) != '-1')):
-                    page_object.set('BACKITEM',
-                        str(objects_count * index) + str(int(page_object.get('BACKITEM')))[7:]
-                    )
+        def metric(name, help_text, samples):
+            name = self.METRICS_PREFIX + name
+            lines.append('# TYPE %s gauge' % name)
+            lines.append('# HELP %s %s' % (name, help_text))
 
-            shifted.append(page_object)
+            for (labels, value) in samples:
+                if value is not None:
+                    lines.append('%s%s %s' % (name, labels, repr(float(value))))
 
-        logging.debug("shifted page %s element of %s" % (index, vertical_offset))
+        metric('elapsed_seconds', 'Elapsed time of the generation.', [('', report['elapsed_seconds'])])
+        metric('stage_seconds', 'Time spent in each stage of the generation, summed over processes.', [
+            ('{stage="%s"}' % stage, seconds) for (stage, seconds) in sorted(report['stages_seconds'].items())
+        ])
 
-        return shifted
+        for (name, value) in sorted(report['counters'].items()):
+            metric(name, 'Number of %s during the generation.' % name.replace('_', ' '), [('', value)])
 
+        metric('records_per_second', 'Data records generated per second.', [('', report['records_per_second'])])
+        metric('peak_rss_bytes', 'Peak resident memory of the generation process.', [('', report['peak_rss_bytes'])])
+        metric('peak_rss_children_bytes', 'Peak resident memory of its child processes.', [('', report['peak_rss_children_bytes'])])
 
-    def create_output_file(self, index, filename, dico, fill_count):
-        # If the User has not set an Output File Name, an internal unique file name
-        # will be generated which is the index of the loop.
-        result = str(index).zfill(max(fill_count, CONST.OUTPUTCOUNT_FILL))
+        lines.append('# EOF')
 
-        # Following characters are not allowed for File-Names on WINDOWS: < > ? " : | \ / *
-        # Note / is still allowed in filename as it allows dynamic subdirectory in Linux (issue 102);
-        # TODO: Check & fix for Windows
-        if filename != CONST.EMPTY:
-            table = {
-                # ord(u'ä'): u'ae',
-                # ord(u'Ä'): u'Ae',
-                # ord(u'ö'): u'oe',
-                # ord(u'Ö'): u'Oe',
-                # ord(u'ü'): u'ue',
-                # ord(u'Ü'): u'Ue',
-                # ord(u'ß'): u'ss',
-                ord('<'): '_',
-                ord('>'): '_',
-                ord('?'): '_',
-                ord('"'): '_',
-                ord(':'): '_',
-                ord('|'): '_',
-                ord('\\'): '_',
-                # ord(u'/'): u'_',
-                ord('*'): '_'
-            }
-            
-            list_vars = list(dico.keys())
-            list_vars.append(CONST.OUTPUTCOUNT_VAR)
-            list_values = list(dico.values())
-            list_values.append(result)
-            logging.debug('computing output file name from %s (count is %s)'%(filename,result))
-            result = self.substitute_data(list_vars, [list_values], [filename], index_first_of_batch=index)
+        self.__write(path, '\n'.join(lines) + '\n')
 
-            # TODO: check for utf8 characters support in windows filesystem
-            result = result.translate(table)
-            logging.debug('output file name is %s' % result)
+        logging.info('Generation metrics written to %s' % path)
 
-        return result
 
+    def __write(self, path: str, text: str):
+        # written under a temporary name then renamed, so that readers never see a partial file
+        directory = os.path.dirname(os.path.abspath(path))
+        (handle, temp_file) = create_temp_file(directory)
 
-    def write_sla_file(self, sla_element, output_file, clean=CONST.CLEAN_UNUSED_EMPTY_VARS, sla_indent=CONST.INDENT_SLA):
-        # write SLA to filepath computed from given elements, optionally cleaning empty ITEXT elements and their empty PAGEOBJECTS
-        sla_file = self.build_file_path(
-            self.__dataObject.getOutputDirectory(), output_file, CONST.FILE_EXTENSION_SCRIBUS
-        )
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as file:
+                file.write(text)
 
-        directory = os.path.dirname(sla_file)
+            os.replace(temp_file, path)
 
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+        except BaseException:
+            os.remove(temp_file)
 
-        output_tree = ET.ElementTree(sla_element)
+            raise
 
-        if (clean):
-            self.remove_empty_texts(output_tree.getroot())
 
-        if (sla_indent):
-            from xml.dom import minidom
+class WriteBehind:
+    # Files written by a pool of threads while the caller goes on: waiting on the
+    # storage (eg network file systems) overlaps with rendering the next files.
+    # write() blocks once *queue_size* files are waiting, to bound the memory they
+    # hold. Directories are created with *create_directory*, and files written
+    # under a temporary name (see written_atomically, for *sync* & *key*). Writes of
+    # the same path are done in turn, the last one is kept. The first write error
+    # is raised by the next write() or close().
 
-            xml_string = minidom.parseString(ET.tostring(output_tree.getroot())).toprettyxml(indent="   ")
+    def __init__(self, create_directory, threads=CONST.WRITE_THREADS, queue_size=CONST.WRITE_QUEUE_SIZE, sync=False, key=None):
+        self.create_directory = create_directory
+        self.sync = sync
+        self.key = key
+        self.pool = concurrent.futures.ThreadPoolExecutor(threads, thread_name_prefix='ScribusGenerator-write')
+        self.slots = threading.BoundedSemaphore(max(queue_size, 1))
+        self.lock = threading.Lock()
+        self.errors = []
+        self.elapsed = 0.0
 
-            with open(sla_file, 'w', encoding='utf-8') as file:
-                file.write(xml_string)
+        # future of the write of each path being written
+        self.pending = {}
 
-        else:
-            output_tree.write(sla_file, encoding='utf-8')
 
-        logging.info('Scribus file created: %s' % sla_file)
+    def write(self, path: str, data: bytes, written=None):
+        # Write *data* to the file *path*, *written* is called (from a write thread) once done.
+        self.check()
 
-        return sla_file
+        with self.lock:
+            previous = self.pending.get(path)
 
+        # after the previous write of the same path (eg names of outputs from data values)
+        if previous is not None:
+            concurrent.futures.wait([previous])
 
-    def remove_empty_texts(self, root):
-        # *modifies* root `ElementTree` by removing empty text elements and their empty placeholders.
-        # returns number of ITEXT elements deleted.
-        #   1. clean text in which some variable-like text is not substituted (ie: known or unknown variable):
-        #      <ITEXT CH="empty %VAR_empty% variable should not show" FONT="Arial Regular" />
-        #   2. remove <ITEXT> with empty @CH and precedings <para/> if any
-        #   3. remove any <PAGEOBJECT> that has no <ITEXT> child left
-        empty_xpath = "ITEXT[@CH='']"
-        removal_count = 0
+        self.slots.acquire()
 
-        # little obscure because its parent is needed to remove an element, and `ElementTree` has no parent() method.
-        for page in root.findall('.//%s/../..' % empty_xpath):
-            # Collect empty_xpath and preceding <para> for removal
-            # Iteration is needed due to lack of sibling-previous navigation in `ElementTree`
-            for page_object in page.findall('.//%s/..' % empty_xpath):
-                # Initialize trash bin
-                trash = []
+        try:
+            future = self.pool.submit(self.__write, path, data, written)
 
-                for position, item in enumerate(page_object):
-                    if (item.tag == 'ITEXT') and (item.get('CH') == ''):
-                        logging.debug('Cleaning 1 empty ITEXT and preceding linefeed (opt.)')
-                        if (CONST.REMOVE_CLEANED_ELEMENT_PREFIX and page_object[position-1].tag == 'para'):
-                            trash.append(position - 1)
+        except BaseException:
+            self.slots.release()
 
-                        trash.append(position)
+            raise
 
-                        removal_count += 1
+        with self.lock:
+            self.pending[path] = future
 
-                trash.reverse()
+        future.add_done_callback(functools.partial(self.__forget, path))
 
-                # Remove trashed elements as stack (lifo order), to preserve positions validity
-                for removed_position in trash:
-                    page_object.remove(page_object[removed_position])
 
-                if len(page_object.findall('ITEXT')) == 0:
-                    logging.debug('Cleaning 1 empty PAGEOBJECT')
-                    page.remove(page_object)
+    def __forget(self, path: str, future):
+        with self.lock:
+            if self.pending.get(path) is future:
+                del self.pending[path]
 
-        logging.debug('Removed %d empty texts items' % removal_count)
 
-        return removal_count
+    def close(self, check=True):
+        # Wait for all files to be written.
+        self.pool.shutdown()
 
+        if check:
+            self.check()
 
-    # Part III : PDF EXPORT & CLEANUP
 
-    def export_pdf(self, sla_file: str, pdf_file: str):
-        import scribus
+    def check(self):
+        with self.lock:
+            if self.errors:
+                raise self.errors[0]
 
-        # Create filepath (if needed)
-        directory = os.path.dirname(pdf_file)
 
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+    def take_elapsed(self) -> float:
+        # Time spent writing since last taken, summed over all threads.
+        with self.lock:
+            (elapsed, self.elapsed) = (self.elapsed, 0.0)
 
-        # Export PDF using Scribus API
-        # (1) Open template file
-        scribus.openDoc(sla_file)
+        return elapsed
 
-        # (2) Determine pages
-        i = 0
-        pages_count = []
 
-        while (i < scribus.pageCount()):
-            i += 1
-            pages_count.append(i)
+    def __write(self, path: str, data: bytes, written):
+        start = time.perf_counter()
 
-        # (3) Setup PDF exporter
-        pdf_exporter = scribus.PDFfile()
-        pdf_exporter.info = CONST.APP_NAME
-        pdf_exporter.file = str(pdf_file)
-        pdf_exporter.pages = pages_count
+        try:
+            self.create_directory(os.path.dirname(path))
 
-        # (4) Save PDF file
-        pdf_exporter.save()
+            with written_atomically(path, self.sync, self.key) as partial_file, open(partial_file, 'wb') as file:
+                file.write(data)
 
-        # (5) Close document
-        scribus.closeDoc()
+            logging.info('Scribus file created: %s', path)
 
+            if written is not None:
+                written()
 
-    # UTILITIES
+        except BaseException as exception:
+            with self.lock:
+                self.errors.append(exception)
 
-    def build_file_path(self, directory: str, filename: str, extension: str):
-        # Build an absolute path
-        # Examples:
-        # "C:/tmp/template.sla" on Windows
-        # "/tmp/template.sla" on macOS & Unix-like OS
-        return directory + CONST.SEP_PATH + filename + CONST.SEP_EXT + extension
+        finally:
+            with self.lock:
+                self.elapsed += time.perf_counter() - start
 
+            self.slots.release()
 
-    def get_log(self):
-        return logging
 
+class TimedWriter:
+    # write() callable for SLASerializer, that writes the serialized text to *file*
+    # by chunks of *parts* strings, timing the writes separately from serialization.
 
-    def get_saved_settings(self):
-        logging.debug('Parsing Scribus source file %s for user settings' % (
-            self.__dataObject.getScribusSourceFile()
-        ))
+    def __init__(self, file, parts=2048):
+        self.file = file
+        self.parts = parts
+        self.buffer = []
+        self.elapsed = 0.0
 
-        try:
-            tree = ET.parse(self.__dataObject.getScribusSourceFile())
-            root = tree.getroot()
 
-            doc = root.find('DOCUMENT')
-            storage = doc.find('./JAVA[@NAME="' + CONST.STORAGE_NAME + '"]')
+    def write(self, text: str):
+        self.buffer.append(text)
 
-            return storage.get('SCRIPT')
+        if len(self.buffer) >= self.parts:
+            self.flush()
 
-        except SyntaxError as exception:
-            logging.error(
-                'Loading settings is only possible with Python 2.7 and later, ' +
-                'please update your system: %s' % exception
-            )
 
-            return None
+    def flush(self):
+        start = time.perf_counter()
 
-        except Exception as exception:
-            logging.debug('Could not load the user settings: %s' % exception)
+        self.file.write(''.join(self.buffer))
+        self.buffer = []
 
-            return None
+        self.elapsed += time.perf_counter() - start
 
 
 class GeneratorDataObject:
@@ -913,7 +4663,17 @@ class GeneratorDataObject:
         firstRow=CONST.EMPTY,
         lastRow=CONST.EMPTY,
         saveSettings=CONST.TRUE,
-        closeDialog=CONST.FALSE
+        closeDialog=CONST.FALSE,
+        jobs=CONST.JOBS,
+        scribusExecutable=CONST.SCRIBUS_EXECUTABLE,
+        templateCache=CONST.TRUE,
+        incremental=CONST.FALSE,
+        compression=CONST.COMPRESSION,
+        dataQuery=CONST.EMPTY,
+        csvIndex=CONST.FALSE,
+        shard=CONST.EMPTY,
+        shardMode=CONST.SHARD_MODE,
+        resume=CONST.FALSE
     ):
         self.__scribusSourceFile = scribusSourceFile
         self.__dataSourceFile = dataSourceFile
@@ -928,6 +4688,16 @@ class GeneratorDataObject:
         self.__lastRow = lastRow
         self.__saveSettings = saveSettings
         self.__closeDialog = closeDialog
+        self.__jobs = jobs
+        self.__scribusExecutable = scribusExecutable
+        self.__templateCache = templateCache
+        self.__incremental = incremental
+        self.__compression = compression
+        self.__dataQuery = dataQuery
+        self.__csvIndex = csvIndex
+        self.__shard = shard
+        self.__shardMode = shardMode
+        self.__resume = resume
 
 
     # Getters
@@ -971,6 +4741,36 @@ class GeneratorDataObject:
     def getCloseDialog(self):
         return self.__closeDialog
 
+    def getJobs(self):
+        return self.__jobs
+
+    def getScribusExecutable(self):
+        return self.__scribusExecutable
+
+    def getTemplateCache(self):
+        return self.__templateCache
+
+    def getIncremental(self):
+        return self.__incremental
+
+    def getCompression(self):
+        return self.__compression
+
+    def getDataQuery(self):
+        return self.__dataQuery
+
+    def getCsvIndex(self):
+        return self.__csvIndex
+
+    def getShard(self):
+        return self.__shard
+
+    def getShardMode(self):
+        return self.__shardMode
+
+    def getResume(self):
+        return self.__resume
+
 
     # Setters
 
@@ -1013,13 +4813,44 @@ class GeneratorDataObject:
     def setCloseDialog(self, value):
         self.__closeDialog = value
 
+    def setJobs(self, value):
+        self.__jobs = value
+
+    def setScribusExecutable(self, value):
+        self.__scribusExecutable = value
+
+    def setTemplateCache(self, value):
+        self.__templateCache = value
+
+    def setIncremental(self, value):
+        self.__incremental = value
+
+    def setCompression(self, value):
+        self.__compression = value
+
+    def setDataQuery(self, query):
+        self.__dataQuery = query
+
+    def setCsvIndex(self, value):
+        self.__csvIndex = value
+
+    def setShard(self, value):
+        self.__shard = value
+
+    def setShardMode(self, value):
+        self.__shardMode = value
+
+    def setResume(self, value):
+        self.__resume = value
+
 
-    # (de)Serialize all options but scribusSourceFile and saveSettings
+    # (de)Serialize all options but scribusSourceFile, saveSettings, scribusExecutable, templateCache, incremental, csvIndex, shards and resume
     def toString(self):
         return json.dumps({
             '_comment': "this is an automated placeholder for ScribusGenerator default settings. more info at https://github.com/berteh/ScribusGenerator/. modify at your own risks.",
             # 'scribusfile':self.__scribusSourceFile NOT saved
             'datafile': self.__dataSourceFile,
+            'query': self.__dataQuery,
             'outdir': self.__outputDirectory,
             'outname': self.__outputFileName,
             'outformat': self.__outputFormat,
@@ -1029,7 +4860,9 @@ class GeneratorDataObject:
             'single': self.__singleOutput,
             'from': self.__firstRow,
             'to': self.__lastRow,
-            'close': self.__closeDialog
+            'close': self.__closeDialog,
+            'jobs': self.__jobs,
+            'compression': self.__compression
             # 'savesettings':self.__saveSettings NOT saved
         }, sort_keys=True)
 
@@ -1053,6 +4886,10 @@ class GeneratorDataObject:
         self.__firstRow = j["from"]
         self.__lastRow = j["to"]
         self.__closeDialog = j["close"]
+        # absent from settings saved by older versions
+        self.__jobs = j.get("jobs", CONST.JOBS)
+        self.__compression = j.get("compression", CONST.COMPRESSION)
+        self.__dataQuery = j.get("query", CONST.EMPTY)
         # self.__saveSettings NOT loaded
         logging.debug("loaded %d user settings" %
                       (len(j)-1))  # -1 for the artificial "comment"
@@ -29,8 +29,7 @@ import argparse
 import sys
 import os
 import traceback
-import ScribusGeneratorBackend
-from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject, ArchiveSink, Shard, strip_sla_extension
 
 # defaults
 outDir = os.getcwd()
@@ -66,31 +65,97 @@ examples:
     Generated files will have a name constructed from the "doc_" prefix
     and the input sla file name.
 
+  %(prog)s --pdfOnly --jobs 4 my-template.sla
+    generates PDF files for each line of 'my-template.csv', exported by
+    4 headless Scribus processes in parallel. Intermediate Scribus files
+    are deleted.
+
+  %(prog)s --pdfOnly --incremental -o out my-template.sla
+    same, but only for the lines of 'my-template.csv' that changed since
+    the previous run in the 'out' directory. The PDF files of lines that
+    were removed are deleted.
+
+  %(prog)s --pdfOnly --archive cards.zip my-template.sla
+    generates PDF files for each line of 'my-template.csv', all stored in
+    the 'cards.zip' archive as soon as they are exported.
+
+  %(prog)s --archive - my-template.sla | ssh host 'tar -x -C /srv/cards'
+    streams the generated Scribus files as a tar archive to another host.
+
+  %(prog)s -c shop.sqlite -q "select * from products where stock > 0" catalogue.sla
+    generates Scribus files for each product in stock, read from the
+    'shop.sqlite' SQLite database.
+
+  %(prog)s --gzip --merge my-template.sla.gz
+    generates a single gzip compressed Scribus file from a compressed
+    template, that Scribus opens as any other.
+
+  %(prog)s --pdfOnly --resume -o out my-template.sla
+    generates PDF files for each line of 'my-template.csv', and resumes
+    after the last file completed when run again after an interruption.
+
+  %(prog)s --pdfOnly --shard 2/4 -o /shared/out my-template.sla
+    generates the second quarter of the PDF files for 'my-template.csv',
+    while 3 other hosts generate the other ones with --shard 1/4, 3/4
+    and 4/4. Once all are done,
+  %(prog)s --check-shards -o /shared/out my-template.sla
+    checks that all 4 shards completed, and generated each file once.
+
 
  more information: https://github.com/berteh/ScribusGenerator/
  ''')
 parser.add_argument('infiles', nargs='+',
-                    help='SLA file(s) to use as template(s) for the generation, wildcards are supported')
+                    help='SLA file(s) to use as template(s) for the generation, possibly gzip compressed (.sla.gz), wildcards are supported')
 parser.add_argument('-c', '--dataFile', default=None,
-                    help='CSV/JSON data file containing the data to substitute in each template during generation. Default is scribus source file(s) name with "csv" extension instead of "sla". If csv file is not found, generation from this particular template is skipped.')
+                    help='CSV/JSON/JSON Lines (.jsonl, .ndjson)/SQLite (.sqlite, .sqlite3, .db) data file containing the data to substitute in each template during generation. Default is scribus source file(s) name with "csv" extension instead of "sla". If csv file is not found, generation from this particular template is skipped.')
+parser.add_argument('-q', '--query', default=CONST.EMPTY, dest='dataQuery', metavar='SQL',
+                    help='SQL query selecting the data records from a SQLite data file, or name of its table. Only the columns used by the template and the rows from --firstrow to --lastrow are read. Default is all rows of its only table.')
 parser.add_argument('-d', '--csvDelimiter', default=CONST.CSV_SEP,
                     help='CSV field delimiter character. Default is comma: ","')
 parser.add_argument('-e', '--csvEncoding', default=CONST.CSV_ENCODING,
                     help='Encoding of the CSV file (default: utf-8)')
-# parser.add_argument('-f', '--fast', '--noPdf', action='store_true', default=False, # commented utile Scribus allows pdf generation from command line
-#    help='no PDF generation, scribus SLA only (much faster)')
 parser.add_argument('-n', '--outName', default=CONST.EMPTY,
                     help='name of the generated files, with no extension. Default is a simple incremental index. Using SG variables is allowed to define the name of generated documents. Use %%VAR_COUNT%% as a unique counter defined automatically from the data entry position.')
 parser.add_argument('-o', '--outDir', default=None,
                     help='directory were generated files are stored. Default is the directory of the scribus source file. outputDir will be created if it does not exist.')
-# parser.add_argument('-p', '--pdfOnly', '--noSla', action='store_true', default=False, # for pdf from CLI
-#    help='discard Scribus SLA, generate PDF only. This option is not used when --fast or --noPdf is used.')
+parser.add_argument('--pdf', action='store_true', default=False,
+                    help='also export each generated SLA file to PDF, using headless Scribus processes (see --scribus and --jobs).')
+parser.add_argument('-p', '--pdfOnly', '--noSla', action='store_true', default=False,
+                    help='discard Scribus SLA, generate PDF only. Implies --pdf.')
+parser.add_argument('--scribus', default=CONST.SCRIBUS_EXECUTABLE, dest='scribusExecutable',
+                    help='Scribus executable used for PDF export. Default is "%s".' % CONST.SCRIBUS_EXECUTABLE)
 parser.add_argument('-m', '--merge', '--single', action='store_true', default=False,
                     help='generate a single output (SLA) file that combines all data rows, for each source file.')
 parser.add_argument('-from', '--firstrow', default=CONST.EMPTY, dest='firstRow',
                     help='Starting row of data to merge (not counting the header row), first row by default.')
 parser.add_argument('-to', '--lastrow', default=CONST.EMPTY, dest='lastRow',
                     help='Last row of data to merge (not counting the header row), last row by default.')
+parser.add_argument('--csv-index', action='store_true', default=False, dest='csvIndex',
+                    help='index the rows of the CSV data file (in a .sgindex file next to it) to read a range of rows (see --firstrow) without parsing the rows before it. The index is built once, and again when the CSV file changes.')
+parser.add_argument('--shard', default=CONST.EMPTY, metavar='i/N',
+                    help='only generate the files of shard i of N (from 1/N to N/N), for instance on one of N hosts, with the same file names and %%VAR_COUNT%% values as a complete generation. Completed shards are recorded in the output directory, see --check-shards.')
+parser.add_argument('--shard-mode', default=CONST.SHARD_MODE, choices=Shard.MODES, dest='shardMode',
+                    help='deal the files out to shards in contiguous blocks of data rows (default), or round-robin.')
+parser.add_argument('--check-shards', action='store_true', default=False, dest='checkShards',
+                    help='instead of generating files, check that all shards of the previous generation in the output directory completed and generated each file once. Exits with status 1 otherwise.')
+parser.add_argument('--resume', action='store_true', default=False,
+                    help='record the progress of the generation in the output directory, and resume the previous generation with --resume that did not complete (eg Scribus crash, reboot) after its last completed file, instead of generating all files again.')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='Number of processes generating SLA files in parallel (when not merging output) and exporting PDF files. 0 uses all CPU cores. Default is 1.')
+parser.add_argument('--no-template-cache', action='store_false', default=True, dest='templateCache',
+                    help='always parse and analyze the Scribus input file(s), instead of reusing their analysis cached by previous runs.')
+parser.add_argument('--incremental', action='store_true', default=False,
+                    help='only generate the files whose data records, template or options changed since the previous generation in the same output directory, and remove the files of data records that disappeared.')
+parser.add_argument('--archive', default=None, metavar='FILE',
+                    help='store all generated files in a single zip or tar archive FILE instead of the output directory, as they are generated. The format follows the extension of FILE (.zip, .tar, .tar.gz or .tgz), - writes a tar archive to the standard output.')
+parser.add_argument('--archive-format', default=None, choices=ArchiveSink.FORMATS, dest='archiveFormat',
+                    help='format of the archive, when it can not be guessed from its name.')
+parser.add_argument('-z', '--gzip', nargs='?', type=int, const=CONST.GZIP_LEVEL, default=CONST.COMPRESSION, metavar='LEVEL', dest='compression',
+                    help='write gzip compressed Scribus files (.sla.gz), as they are generated, with compression LEVEL from 1 (fastest) to 9 (smallest). Default level is %s. Compressed templates are always read transparently.' % CONST.GZIP_LEVEL)
+parser.add_argument('--stats', default=None, metavar='FILE',
+                    help='write a JSON report of the time spent in each stage of the generation, of the amount of records, files, bytes and variables processed, and of the peak memory use.')
+parser.add_argument('--stats-openmetrics', default=None, metavar='FILE', dest='statsOpenMetrics',
+                    help='write the same report in OpenMetrics text format, for instance for the textfile collector of the Prometheus node exporter.')
 parser.add_argument('-s', '--save', action='store_true', default=False,
                     help='Save current generator settings in (each) Scribus input file(s).')
 parser.add_argument('-l', '--load', action='store_true', default=False,
@@ -105,80 +170,134 @@ def ife(test, if_result, else_result):
     return else_result
 
 
-# handle arguments
-args = parser.parse_args()
-
-# if(args.pdfOnly or (not args.fast)): # for pdf from CLI
-#     print("\nPDF generation is currently not available from command line, but SLA is. \nSimply add the '--noPdf' option to your command and it will run just fine.\n")
-#    sys.exit()
-
-# create outDir if needed
-if ((not(args.outDir is None)) and (not os.path.exists(args.outDir))):
-    #print('creating output directory: '+args.outDir)
-    os.makedirs(args.outDir)
-
-# generate
-# Collect the settings made and build the Data Object
-dataObject = GeneratorDataObject(
-    dataSourceFile=ife(not(args.dataFile is None), args.dataFile, CONST.EMPTY),
-    outputDirectory=ife(not(args.outDir is None), args.outDir, CONST.EMPTY),
-    outputFileName=args.outName,    # is CONST.EMPTY by default
-    # ife(args.fast, CONST.FORMAT_SLA, CONST.FORMAT_PDF),
-    outputFormat=CONST.FORMAT_SLA,
-    # ife(args.pdfOnly, CONST.FALSE, CONST.TRUE), # not used if outputFormat is sla.
-    keepGeneratedScribusFiles=CONST.TRUE,
-    csvSeparator=args.csvDelimiter,  # is CONST.CSV_SEP by default
-    csvEncoding=args.csvEncoding, # is CONST.CSV_ENCODING by default
-    singleOutput=args.merge,
-    firstRow=args.firstRow,
-    lastRow=args.lastRow,
-    saveSettings=args.save)
-
-generator = ScribusGenerator(dataObject)
-log = generator.get_log()
-log.debug("ScribusGenerator is starting generation for %s template(s)." %
-          (str(len(args.infiles))))
-
-for infile in args.infiles:
-    dataObject.setScribusSourceFile(infile)
-
-    if(args.load):
-        saved = generator.get_saved_settings()
-
-        if (saved):
-            dataObject.loadFromString(saved)
-            log.info("settings loaded from %s:" % (os.path.split(infile)[1]))
-
-        else:
-            log.warning("could not load settings from %s. using arguments and defaults instead" % (
-                os.path.split(infile)[1]))
-
-    if(dataObject.getDataSourceFile() is CONST.EMPTY):  # default data file is template-sla+csv
-        dataObject.setDataSourceFile(os.path.splitext(infile)[0]+".csv")
-    if not(os.path.exists(dataObject.getDataSourceFile()) and os.path.isfile(dataObject.getDataSourceFile())):
-        log.warning("found no data file for %s. skipped.   was looking for %s" % (
-            os.path.split(infile)[1], dataObject.getDataSourceFile()))
-        continue  # skip current template for lack of matching data.
-    if(dataObject.getOutputDirectory() is CONST.EMPTY):  # default outDir is template dir
-        dataObject.setOutputDirectory(os.path.split(infile)[0])
-        if not os.path.exists(dataObject.getOutputDirectory()):
-            log.info("creating output directory: %s" %
-                     (dataObject.getOutputDirectory()))
-            os.makedirs(dataObject.getOutputDirectory())
-    if(dataObject.getSingleOutput() and (len(args.infiles) > 1)):
-        dataObject.setOutputFileName(
-            args.outName+'__'+os.path.split(infile)[1])
-    log.info("Generating all files for %s in directory %s" %
-             (os.path.split(infile)[1], dataObject.getOutputDirectory()))
-    try:
-        generator.run()
-        log.info("Scribus Generation completed. Congrats!")
-    except ValueError as e:
-        log.error("\nerror: could likely not replace a variable with its value.\nplease check your CSV data and CSV separator.       moreover: %s\n\n" % e)
-        traceback.print_exc()
-    except IndexError as e:
-        log.error("\nerror: could likely not find the value for one variable.\nplease check your CSV data and CSV separator.\n       moreover: %s\n" % e)
-        traceback.print_exc
-    except Exception:
-        log.error("\nerror: "+traceback.format_exc())
-        traceback.print_exc
+def main(argv):
+    # handle arguments
+    args = parser.parse_args(argv[1:])
+
+    # create outDir if needed, archives are written elsewhere
+    if ((args.archive is None) and (not(args.outDir is None)) and (not os.path.exists(args.outDir))):
+        #print('creating output directory: '+args.outDir)
+        os.makedirs(args.outDir)
+
+    # generate
+    # Collect the settings made and build the Data Object
+    dataObject = GeneratorDataObject(
+        dataSourceFile=ife(not(args.dataFile is None), args.dataFile, CONST.EMPTY),
+        outputDirectory=ife(not(args.outDir is None), args.outDir, CONST.EMPTY),
+        outputFileName=args.outName,    # is CONST.EMPTY by default
+        outputFormat=ife(args.pdf or args.pdfOnly, CONST.FORMAT_PDF, CONST.FORMAT_SLA),
+        keepGeneratedScribusFiles=ife(args.pdfOnly, CONST.FALSE, CONST.TRUE), # not used if outputFormat is sla.
+        csvSeparator=args.csvDelimiter,  # is CONST.CSV_SEP by default
+        csvEncoding=args.csvEncoding, # is CONST.CSV_ENCODING by default
+        singleOutput=args.merge,
+        firstRow=args.firstRow,
+        lastRow=args.lastRow,
+        saveSettings=args.save,
+        jobs=args.jobs,
+        scribusExecutable=args.scribusExecutable,
+        templateCache=args.templateCache,
+        incremental=args.incremental,
+        compression=args.compression,
+        dataQuery=args.dataQuery,
+        csvIndex=args.csvIndex,
+        shard=args.shard,
+        shardMode=args.shardMode,
+        resume=args.resume)
+
+    # one archive for all templates
+    sink = None
+    archive = None
+
+    if args.archive == '-':
+        # the archive alone is written to the standard output: anything else written
+        # there (logs, worker processes, Scribus) goes to the standard error instead
+        sys.stdout.flush()
+        archive = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+        sink = ArchiveSink(archive, args.archiveFormat)
+
+    elif args.archive:
+        sink = ArchiveSink(args.archive, args.archiveFormat)
+
+    generator = ScribusGenerator(dataObject)
+    log = generator.get_log()
+    log.debug("ScribusGenerator is starting generation for %s template(s)." %
+              (str(len(args.infiles))))
+    failed = False
+
+    for infile in args.infiles:
+        dataObject.setScribusSourceFile(infile)
+
+        if(args.load):
+            saved = generator.get_saved_settings()
+
+            if (saved):
+                dataObject.loadFromString(saved)
+                log.info("settings loaded from %s:" % (os.path.split(infile)[1]))
+
+            else:
+                log.warning("could not load settings from %s. using arguments and defaults instead" % (
+                    os.path.split(infile)[1]))
+
+        if(dataObject.getDataSourceFile() is CONST.EMPTY):  # default data file is template-sla+csv
+            dataObject.setDataSourceFile(strip_sla_extension(infile)+".csv")
+        if not(os.path.exists(dataObject.getDataSourceFile()) and os.path.isfile(dataObject.getDataSourceFile())):
+            log.warning("found no data file for %s. skipped.   was looking for %s" % (
+                os.path.split(infile)[1], dataObject.getDataSourceFile()))
+            continue  # skip current template for lack of matching data.
+        if(dataObject.getOutputDirectory() is CONST.EMPTY):  # default outDir is template dir
+            dataObject.setOutputDirectory(os.path.split(infile)[0])
+            if (sink is None) and (not os.path.exists(dataObject.getOutputDirectory())):
+                log.info("creating output directory: %s" %
+                         (dataObject.getOutputDirectory()))
+                os.makedirs(dataObject.getOutputDirectory())
+        if(dataObject.getSingleOutput() and (len(args.infiles) > 1)):
+            dataObject.setOutputFileName(
+                args.outName+'__'+os.path.split(infile)[1])
+        if args.checkShards:
+            problems = generator.check_shards()
+
+            for problem in problems:
+                log.error("%s: %s" % (os.path.split(infile)[1], problem))
+
+            if not problems:
+                log.info("%s: all shards completed in %s" % (os.path.split(infile)[1], dataObject.getOutputDirectory()))
+
+            failed = failed or bool(problems)
+            continue
+
+        log.info("Generating all files for %s in directory %s" %
+                 (os.path.split(infile)[1], dataObject.getOutputDirectory()))
+        try:
+            generator.run(sink=sink)
+            log.info("Scribus Generation completed. Congrats!")
+        except ValueError as e:
+            log.error("\nerror: could likely not replace a variable with its value.\nplease check your CSV data and CSV separator.       moreover: %s\n\n" % e)
+            traceback.print_exc()
+        except IndexError as e:
+            log.error("\nerror: could likely not find the value for one variable.\nplease check your CSV data and CSV separator.\n       moreover: %s\n" % e)
+            traceback.print_exc
+        except Exception:
+            log.error("\nerror: "+traceback.format_exc())
+            traceback.print_exc
+
+    if sink is not None:
+        sink.close()
+
+        if archive is not None:
+            archive.close()
+
+    # report statistics of all generations
+    if args.stats:
+        generator.stats.write_json(args.stats)
+
+    if args.statsOpenMetrics:
+        generator.stats.write_openmetrics(args.statsOpenMetrics)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -34,7 +34,7 @@ import inspect
 import traceback
 
 import ScribusGeneratorBackend
-from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject, strip_sla_extension
 
 
 class GeneratorControl:
@@ -59,7 +59,7 @@ class GeneratorControl:
             doc = scribus.getDocName()
             self.__scribusSourceFileEntryVariable = doc
             self.__outputDirectoryEntryVariable = os.path.split(doc)[0]
-            self.__dataSourceFileEntryVariable = os.path.splitext(doc)[0]+".csv"
+            self.__dataSourceFileEntryVariable = strip_sla_extension(doc)+".csv"
         else:
             doc = ''
 
@@ -243,7 +243,7 @@ class GeneratorDialog:
 
     def show(self):
         scribus.messageBox("Scribus Generator","SCRIBUS GENERATOR\nYou will be asked in a series of dialogs for the Scribus template and data files, as well as what output format you would like.",scribus.ICON_NONE,scribus.BUTTON_OK)
-        scribusFile = scribus.fileDialog('Select Scribus Template File:', 'Scribus(*.sla *.SLA)', defaultname=''+self.__ctrl.getScribusSourceFileEntryVariable()+'')
+        scribusFile = scribus.fileDialog('Select Scribus Template File:', 'Scribus(*.sla *.SLA *.sla.gz)', defaultname=''+self.__ctrl.getScribusSourceFileEntryVariable()+'')
         if (scribusFile == ''):
             self.__ctrl.buttonCancelHandler()
         self.__ctrl.setScribusSourceFileEntryVariable(scribusFile)
@@ -297,7 +297,7 @@ class GeneratorDialog:
                 storedSettings = 0
         # Either there are no Saved Settings OR the User did not want to use them.
         if (storedSettings == 0):
-            dataFile = scribus.fileDialog('Select Data File:', 'Data(*.csv *.CSV *.tsv *.TSV *.txt *.TXT)', defaultname=''+self.__ctrl.getDataSourceFileEntryVariable()+'')
+            dataFile = scribus.fileDialog('Select Data File:', 'Data(*.csv *.CSV *.tsv *.TSV *.txt *.TXT *.json *.jsonl *.ndjson)', defaultname=''+self.__ctrl.getDataSourceFileEntryVariable()+'')
             if (dataFile == ''):
                 self.__ctrl.buttonCancelHandler()
             self.__ctrl.setDataSourceFileEntryVariable(dataFile)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+=================
+Automatic document generation for Scribus.
+=================
+
+For further information (manual, description, etc.) please visit:
+http://berteh.github.io/ScribusGenerator/
+
+This script is the PDF export worker of ScribusGenerator, run by a headless
+Scribus process (scribus -g -ns -py ScribusGeneratorPDFExport.py) started by
+PDFExportPool. It is not meant to be run by hand.
+
+Each line of its standard input is a JSON list [sla_file, pdf_file, key] to export,
+key tagging the temporary PDF file (see create_temp_file) may be null.
+For each of them one line is written to its standard output, starting with
+CONST.PDF_EXPORT_MARKER and followed by the JSON list [sla_file, error], where
+error is null on success. It exits at the end of its standard input.
+
+=================
+The MIT License
+=================
+
+Copyright (c) 2010-2014 Ekkehard Will (www.ekkehardwill.de), 2014-2024 Berteh (https://github.com/berteh/)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions: The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import sys
+import json
+import traceback
+
+# Scribus does not add the script directory to the module search path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scribus
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject
+
+
+def main(argv):
+    generator = ScribusGenerator(GeneratorDataObject())
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+
+        (sla_file, pdf_file, key) = json.loads(line)
+        error = None
+
+        try:
+            generator.export_pdf(sla_file, pdf_file, key)
+
+        except Exception:
+            error = traceback.format_exc()
+
+            # leave no document open for the next file
+            if scribus.haveDoc():
+                scribus.closeDoc()
+
+        sys.stdout.write(CONST.PDF_EXPORT_MARKER + json.dumps([sla_file, error]) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+=================
+Automatic document generation for Scribus.
+=================
+
+For further information (manual, description, etc.) please visit:
+http://berteh.github.io/ScribusGenerator/
+
+This script is the ScribusGenerator server: a long-running process that
+generates documents for the jobs it receives over HTTP, on localhost or on a
+Unix socket. Templates are analyzed once by each of its worker processes and
+then kept in memory, so that generating one document takes milliseconds
+instead of the startup of a command line run.
+
+=================
+The MIT License
+=================
+
+Copyright (c) 2010-2014 Ekkehard Will (www.ekkehardwill.de), 2014-2024 Berteh (https://github.com/berteh/)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions: The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import argparse
+import base64
+import collections
+import concurrent.futures
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject, TemplateCache, CallbackSink, configure_logging, configure_worker_logging, worker_logging, strip_sla_extension
+
+# parse options
+parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+                                 description=''' Serve the generation of Scribus (SLA) documents to local clients, over HTTP.
+ Templates are kept in memory between jobs.''',
+                                 epilog='''API
+  POST /jobs   generates the documents of the JSON job in the request body,
+               and replies with the JSON list of the generated files when done:
+                 {"outputs": ["/out/001.sla"], "elapsed": 0.004}
+  GET /status  replies with the JSON counts of jobs accepted, running,
+               completed, failed and rejected.
+
+  A job is a JSON object with the following members:
+    template   path of the SLA template file, mandatory.
+    rows       list of data records (objects), used instead of a data file.
+    dataFile   CSV/JSON/JSON Lines data file. Default is the template file
+               name with "csv" extension, when no rows are given.
+    options    object of generation options, named as the parameters of
+               GeneratorDataObject (outputDirectory, outputFileName,
+               outputFormat, singleOutput, firstRow, lastRow, ...), with
+               values as in the GUI: outputFormat is "Scribus" or "PDF".
+               Settings are not saved in templates unless saveSettings is 1.
+    content    true to reply with the base64-encoded content of each generated
+               file instead, in a "content" object keyed by path: files are
+               then generated in memory and not written (outputDirectory
+               does not need to exist).
+
+  Invalid jobs are answered with status 400, jobs failing during generation
+  with status 500, and jobs exceeding the queue with status 503. Error replies
+  hold an "error" message.
+
+examples:
+
+  %(prog)s --jobs 4
+    serves on http://127.0.0.1:8765/ with 4 worker processes.
+
+  %(prog)s --socket /tmp/scribus-generator.sock
+    serves on a Unix socket, for instance to be used with
+      curl --unix-socket /tmp/scribus-generator.sock http://localhost/jobs \\
+        -d '{"template": "card.sla", "rows": [{"name": "Ann"}]}'
+
+ The server runs jobs with the permissions of its user, on any file it can
+ read or write: only expose it to trusted local clients.
+
+ more information: https://github.com/berteh/ScribusGenerator/
+ ''')
+parser.add_argument('--host', default='127.0.0.1',
+                    help='address the HTTP server listens on. Default is "127.0.0.1", for local clients only.')
+parser.add_argument('--port', type=int, default=8765,
+                    help='port the HTTP server listens on. Default is 8765.')
+parser.add_argument('--socket', default=None,
+                    help='path of a Unix socket to listen on, instead of a TCP port.')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='Number of worker processes generating documents in parallel. 0 uses all CPU cores. Default is 1.')
+parser.add_argument('--queue', type=int, default=CONST.JOBS_QUEUE_SIZE,
+                    help='Number of jobs waiting for (or being run by) each worker process, further jobs are rejected. Default is %s.' % CONST.JOBS_QUEUE_SIZE)
+
+
+class JobError(Exception):
+    # Invalid job, replied with status 400
+    pass
+
+
+# Generation options of a job, all parameters of GeneratorDataObject but the files
+OPTIONS = [name for name in inspect.signature(GeneratorDataObject).parameters
+           if name not in ('scribusSourceFile', 'dataSourceFile')]
+
+
+def check_job(job) -> dict:
+    # *job* decoded from a request, raises JobError if it can't be run.
+    if not isinstance(job, dict):
+        raise JobError('job must be a JSON object')
+
+    template = job.get('template')
+
+    if not isinstance(template, str) or not os.path.isfile(template):
+        raise JobError('template file not found: %s' % template)
+
+    options = job.get('options', {})
+
+    if not isinstance(options, dict):
+        raise JobError('options must be a JSON object')
+
+    unknown = sorted(set(options).difference(OPTIONS))
+
+    if unknown:
+        raise JobError('unknown option(s): %s' % ', '.join(unknown))
+
+    rows = job.get('rows')
+
+    if rows is not None:
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise JobError('rows must be a list of JSON objects')
+
+    else:
+        data_file = job.get('dataFile') or strip_sla_extension(template) + '.csv'
+
+        if not os.path.isfile(data_file):
+            raise JobError('data file not found: %s' % data_file)
+
+    return job
+
+
+# Worker processes: each keeps the analysis of the templates it used in memory.
+def _init_worker(logging_args):
+    TemplateCache.memory = collections.OrderedDict()
+
+    configure_worker_logging(*logging_args)
+
+
+def _ready():
+    return True
+
+
+def run_job(job: dict) -> dict:
+    # Generate the files of a job checked by check_job(), returns their paths
+    # along with the time it took. Files whose content is asked for are not
+    # written, but returned by the path they would have.
+    start = time.perf_counter()
+    template = job['template']
+    options = dict(job.get('options', {}))
+
+    # like the command line, files are generated next to the template by default.
+    # Jobs run in parallel rather than their batches.
+    options.setdefault('outputDirectory', os.path.dirname(os.path.abspath(template)))
+    options.setdefault('outputFormat', CONST.FORMAT_SLA)
+    options.setdefault('saveSettings', CONST.FALSE)
+    options['jobs'] = 1
+
+    if job.get('rows') is not None:
+        data_file = CONST.EMPTY
+
+    else:
+        data_file = job.get('dataFile') or strip_sla_extension(template) + '.csv'
+
+    generator = ScribusGenerator(GeneratorDataObject(scribusSourceFile=template, dataSourceFile=data_file, **options))
+
+    if job.get('content'):
+        content = {}
+
+        def store(output_name, data, extension):
+            path = generator.build_file_path(options['outputDirectory'], output_name, extension)
+            content[path] = base64.b64encode(data).decode('ascii')
+
+        generator.run(job.get('rows'), CallbackSink(store))
+        result = {'outputs': list(content), 'content': content}
+
+    else:
+        generator.run(job.get('rows'))
+        result = {'outputs': generator.outputs}
+
+    result['elapsed'] = time.perf_counter() - start
+
+    return result
+
+
+class JobQueue:
+    # Pool of worker processes, and bounded amount of jobs waiting for them.
+    # Worker processes are started anew (not forked) as the server runs threads.
+
+    def __init__(self, workers: int, queue_size: int):
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+            initargs=(worker_logging(),)
+        )
+        self.slots = threading.BoundedSemaphore(workers * max(queue_size, 1))
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+
+        # start worker processes right away, rather than on the first jobs
+        for worker in range(workers):
+            self.pool.submit(_ready)
+
+
+    def run(self, job: dict) -> dict:
+        # Result of run_job(), raises JobError if the queue is full.
+        if not self.slots.acquire(blocking=False):
+            self.count('rejected')
+
+            raise JobError('queue is full')
+
+        self.count('accepted')
+
+        try:
+            result = self.pool.submit(run_job, job).result()
+
+        except Exception:
+            self.count('failed')
+
+            raise
+
+        finally:
+            self.slots.release()
+
+        self.count('completed')
+
+        return result
+
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+
+    def status(self) -> dict:
+        with self.lock:
+            status = dict((name, self.counts[name]) for name in ('accepted', 'completed', 'failed', 'rejected'))
+
+        status['running'] = status['accepted'] - status['completed'] - status['failed']
+
+        return status
+
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between jobs of the same client
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ScribusGenerator/' + CONST.SG_VERSION
+
+    def do_GET(self):
+        if self.path != '/status':
+            return self.reply(404, {'error': 'not found: %s' % self.path})
+
+        self.reply(200, self.server.jobs.status())
+
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            return self.reply(404, {'error': 'not found: %s' % self.path})
+
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            job = check_job(json.loads(body.decode('utf-8')))
+
+        except (ValueError, JobError) as exception:
+            return self.reply(400, {'error': str(exception)})
+
+        try:
+            self.reply(200, self.server.jobs.run(job))
+
+        except JobError as exception:
+            self.reply(503, {'error': str(exception)})
+
+        except Exception as exception:
+            logging.error('Job failed for template %s: %s' % (job['template'], exception))
+            self.reply(500, {'error': '%s: %s' % (type(exception).__name__, exception)})
+
+
+    def reply(self, status: int, content: dict):
+        body = json.dumps(content).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        # clients of a Unix socket have no address
+        logging.debug('Server request: %s', format % args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main(argv):
+    args = parser.parse_args(argv[1:])
+    configure_logging()
+
+    jobs = JobQueue(args.jobs if args.jobs > 0 else (os.cpu_count() or 1), args.queue)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+        server = UnixHTTPServer(args.socket, JobHandler)
+        address = args.socket
+
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), JobHandler)
+        address = 'http://%s:%s/' % server.server_address[:2]
+
+    server.jobs = jobs
+    logging.info('ScribusGenerator server listening on %s' % address)
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.server_close()
+        jobs.shutdown()
+
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+        logging.info('ScribusGenerator server stopped')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Stand-in for a headless Scribus running ScribusGeneratorPDFExport.py, for the
+# tests of PDFExportPool: started as "stub_scribus.py -g -ns -py <script>", it
+# speaks the same protocol on its standard input and output (see CONST.PDF_EXPORT_MARKER).
+# The "PDF" file written holds the SLA file name. SLA files whose name contains:
+#  - 'crash' make the process exit at once, as a Scribus crash would,
+#  - 'fail' are reported with a traceback, as a failed export would,
+#  - 'hang' are never reported, as a Scribus stuck on a dialog would.
+
+import os
+import sys
+import json
+import time
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ScribusGeneratorBackend import CONST
+
+
+def export_pdf(sla_file, pdf_file):
+    name = os.path.basename(sla_file)
+
+    if 'crash' in name:
+        os._exit(3)
+
+    if 'hang' in name:
+        time.sleep(3600)
+
+    if 'fail' in name:
+        raise RuntimeError('Could not export %s' % name)
+
+    with open(pdf_file, 'w') as file:
+        file.write(name)
+
+
+def main(argv):
+    # Scribus prints its own messages, that are to be skipped
+    sys.stdout.write('Scribus 1.6 (stub) started\n')
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+
+        (sla_file, pdf_file, key) = json.loads(line)
+        error = None
+
+        try:
+            export_pdf(sla_file, pdf_file)
+
+        except Exception:
+            error = traceback.format_exc()
+
+        sys.stdout.write(CONST.PDF_EXPORT_MARKER + json.dumps([sla_file, error]) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the tar archive streamed to the standard output by the command line
+# (--archive -), that nothing else may be written to, even by worker processes.
+# Run from the repository with: python -m unittest discover tests
+
+import csv
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import unittest
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPOSITORY, 'ScribusGeneratorCLI.py')
+EXAMPLE = os.path.join(REPOSITORY, 'example')
+
+
+class ArchiveStdoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.template = os.path.join(self.directory, 'Business_Card.sla')
+        self.data = os.path.join(self.directory, 'Business_Card.csv')
+        shutil.copy(os.path.join(EXAMPLE, 'Business_Card.sla'), self.template)
+
+        # names with a tab, that worker processes log a warning about
+        with open(os.path.join(EXAMPLE, 'Business_Card_long.csv'), newline='', encoding='utf-8') as file:
+            rows = list(csv.reader(file))
+
+        for row in rows[1:]:
+            row[0] += '\tjr'
+
+        with open(self.data, 'w', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerows(rows)
+
+        # log file & template cache of this test only
+        self.environment = dict(os.environ, HOME=self.directory, XDG_CACHE_HOME=self.directory)
+
+
+    def generate(self, *options):
+        return subprocess.run(
+            [sys.executable, CLI, '-f', 'sla', '-c', self.data] + list(options) + [self.template],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=self.environment, check=True
+        )
+
+
+    def expected(self):
+        # files generated in the output directory, by name
+        output = os.path.join(self.directory, 'output')
+        os.mkdir(output)
+        self.generate('-o', output)
+        files = {}
+
+        for name in os.listdir(output):
+            with open(os.path.join(output, name), 'rb') as file:
+                files[name] = file.read()
+
+        return files
+
+
+    def archived(self, *options):
+        result = self.generate('--archive', '-', *options)
+        # logs are written to the standard error
+        self.assertIn(b'Scribus Generation completed', result.stderr)
+        self.assertIn(b'Could not convert tabs', result.stderr)
+
+        with tarfile.open(fileobj=io.BytesIO(result.stdout), mode='r:') as archive:
+            return dict((member.name, archive.extractfile(member).read()) for member in archive.getmembers())
+
+
+    def test_archive(self):
+        self.assertEqual(self.archived(), self.expected())
+
+
+    def test_archive_parallel(self):
+        self.assertEqual(self.archived('-j', '2'), self.expected())
+
+
+    def test_archive_output_directory(self):
+        # nothing is written to the output directory, that is not created
+        output = os.path.join(self.directory, 'missing')
+        self.archived('-o', output)
+        self.assertFalse(os.path.exists(output))
+
+        archive = os.path.join(self.directory, 'cards.zip')
+        self.generate('--archive', archive, '-o', output)
+        self.assertTrue(os.path.isfile(archive))
+        self.assertFalse(os.path.exists(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the benchmark of the generation (utils/BenchmarkGeneration.py), on
+# small synthetic workloads. Run from the repository with: python -m unittest discover tests
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK = os.path.join(REPOSITORY, 'utils', 'BenchmarkGeneration.py')
+
+sys.path.insert(0, os.path.join(REPOSITORY, 'utils'))
+
+import BenchmarkGeneration
+from BenchmarkGeneration import MEASURES
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        # log file & template cache of this test only
+        self.environment = dict(os.environ, HOME=self.directory, XDG_CACHE_HOME=self.directory)
+
+
+    def benchmark(self, name, *options, check=True):
+        # (results written to *name*, process) of a small synthetic benchmark
+        output = os.path.join(self.directory, name)
+        process = subprocess.run(
+            [sys.executable, BENCHMARK, '--no-examples', '--pages', '2', '--frames', '3', '--rows', '20',
+             '--repeat', '1', '--output', output] + list(options),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=self.environment, check=check
+        )
+
+        with open(output, encoding='utf-8') as file:
+            return (json.load(file), process)
+
+
+    def synthesize(self, name, *options):
+        # content of the synthetic template & dataset
+        args = BenchmarkGeneration.parser.parse_args(['--pages', '2', '--rows', '50'] + list(options))
+        files = [os.path.join(self.directory, name + '.sla'), os.path.join(self.directory, name + '.' + args.format)]
+        BenchmarkGeneration.synthesize_template(args, files[0])
+        BenchmarkGeneration.synthesize_data(args, files[1])
+        contents = []
+
+        for path in files:
+            with open(path, 'rb') as file:
+                contents.append(file.read())
+
+        return contents
+
+
+    def test_reproducible(self):
+        # same workload from the same seed, another one from another seed
+        for options in ((), ('--format', 'json'), ('--next-records', '3', '--scribus-version', '1.4.5')):
+            self.assertEqual(self.synthesize('first', *options), self.synthesize('second', *options), options)
+            self.assertNotEqual(self.synthesize('first', *options)[1], self.synthesize('second', '--seed', '1', *options)[1], options)
+
+
+    def test_workloads(self):
+        for options in ((), ('--format', 'json'), ('--next-records', '2', '--scribus-version', '1.4.5'), ('--empty-ratio', '1')):
+            (results, process) = self.benchmark('results.json', *options)
+            measures = results['workloads']['synthetic']
+
+            self.assertEqual(measures['records'], 20, options)
+            self.assertGreater(measures['template_bytes'], 0)
+
+            for name in MEASURES:
+                self.assertGreater(measures[name]['seconds'], 0, (options, name))
+                self.assertGreater(measures[name]['peak_bytes'], 0, (options, name))
+
+
+    def test_compare(self):
+        (results, process) = self.benchmark('previous.json')
+        (results, process) = self.benchmark('results.json', '--compare', os.path.join(self.directory, 'previous.json'),
+                                            '--threshold', '1000')
+        self.assertIn(b'0 regression(s)', process.stdout)
+        self.assertNotIn(b'warning', process.stdout)
+
+        # previous results of another workload, that took no time
+        for name in MEASURES:
+            results['workloads']['synthetic'][name]['seconds'] /= 1e6
+
+        results['config']['rows'] = 10
+
+        with open(os.path.join(self.directory, 'faster.json'), 'w', encoding='utf-8') as file:
+            json.dump(results, file)
+
+        (results, process) = self.benchmark('results.json', '--compare', os.path.join(self.directory, 'faster.json'), check=False)
+        self.assertEqual(process.returncode, 1)
+        self.assertIn(b'warning: the synthetic workload differs', process.stdout)
+        self.assertEqual(process.stdout.count(b'REGRESSION'), len(MEASURES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the index of the rows of CSV data files (--csv-index, see CSVIndex),
+# run from the repository with: python -m unittest discover tests
+
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ScribusGeneratorBackend
+from ScribusGeneratorBackend import CONST, CSVIndex, ScribusGenerator, GeneratorDataObject
+
+
+def setUpModule():
+    # log records are not written to the log file of the user
+    ScribusGeneratorBackend._logging_configured = True
+
+
+class CSVIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.csv_file = os.path.join(self.directory.name, 'data.csv')
+
+
+    def write(self, rows, **options):
+        with open(self.csv_file, 'w', newline='', encoding='utf-8') as file:
+            csv.writer(file, **options).writerows([['name', 'note']] + rows)
+
+
+    def rows(self, index, first_item):
+        return [row for row in index.rows(first_item) if row]
+
+
+    def test_rows(self):
+        # multi-line quoted fields, blank lines and CRLF line ends within the blocks indexed
+        rows = [['name%02d' % number, 'line 1\nline 2' if number % 4 == 0 else 'é, "ü"'] for number in range(1, 21)]
+        self.write(rows, lineterminator='\r\n')
+
+        with open(self.csv_file, 'a', newline='', encoding='utf-8') as file:
+            file.write('\r\n\r\nname21,last\r\n')
+
+        rows.append(['name21', 'last'])
+
+        for step in (1, 2, 3, 5, 1024):
+            index = CSVIndex(self.csv_file, 'utf-8', ',', step)
+            self.assertTrue(index.build())
+            self.assertEqual(index.count, 21)
+
+            for first_item in range(1, 23):
+                self.assertEqual(self.rows(index, first_item), rows[first_item - 1:], (step, first_item))
+
+
+    def test_store(self):
+        rows = [['name%02d' % number, ''] for number in range(1, 11)]
+        self.write(rows)
+        index = CSVIndex(self.csv_file, 'utf-8', ',', 3)
+        self.assertFalse(index.load())
+        self.assertTrue(index.build())
+        index.store()
+
+        stored = CSVIndex(self.csv_file, 'utf-8', ',', 3)
+        self.assertTrue(stored.load())
+        self.assertEqual((stored.count, stored.offsets), (index.count, index.offsets))
+        self.assertEqual(self.rows(stored, 5), rows[4:])
+
+        # outdated once the file or the options change
+        self.assertFalse(CSVIndex(self.csv_file, 'utf-8', ';', 3).load())
+        self.assertFalse(CSVIndex(self.csv_file, 'utf-8', ',', 4).load())
+
+        self.write(rows + [['name11', '']])
+        self.assertFalse(CSVIndex(self.csv_file, 'utf-8', ',', 3).load())
+
+
+    def test_encoding(self):
+        # a newline is not a single byte in UTF-16
+        self.write([['name01', '']])
+        with self.assertLogs(level='WARNING'):
+            self.assertFalse(CSVIndex(self.csv_file, 'utf-16', ',').build())
+
+
+    def test_data_range(self):
+        # ranges starting on each side of the edges of the blocks indexed
+        step = CONST.CSV_INDEX_STEP
+        names = ['name%05d' % number for number in range(1, 2 * step + 11)]
+        self.write([[name, 'a\nb' if number % 7 == 0 else ''] for (number, name) in enumerate(names)])
+
+        for (first_row, last_row) in ((2, 3), (step - 1, step + 2), (step, CONST.EMPTY), (step + 1, step + 1),
+                                       (step + 2, 2 * step + 1), (2 * step + 1, CONST.EMPTY), (len(names), CONST.EMPTY),
+                                       (len(names) + 1, CONST.EMPTY)):
+            generator = ScribusGenerator(GeneratorDataObject(
+                dataSourceFile=self.csv_file, csvIndex=CONST.TRUE, firstRow=str(first_row), lastRow=str(last_row),
+                saveSettings=CONST.FALSE
+            ))
+            expected = names[first_row - 1:last_row or None]
+
+            self.assertEqual([record['name'] for record in generator.parse_data()], expected, (first_row, last_row))
+            self.assertEqual(generator.count_data(), len(expected))
+
+        self.assertTrue(os.path.isfile(self.csv_file + CSVIndex.EXTENSION))
+
+
+if __name__ == '__main__':
+    unittest.main()
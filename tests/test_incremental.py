@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the incremental generation by the command line (--incremental, see
+# GenerationManifest): unchanged files are skipped, changed ones generated again,
+# and those of removed data records deleted.
+# Run from the repository with: python -m unittest discover tests
+
+import csv
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPOSITORY, 'ScribusGeneratorCLI.py')
+EXAMPLE = os.path.join(REPOSITORY, 'example')
+
+FIELDS = ['name', 'position', 'email', 'logo', 'color1', 'color2', 'color3', 'font', 'top']
+SUMMARY = re.compile(rb'Incremental generation: (\d+) file\(s\) generated, (\d+) unchanged file\(s\) skipped, (\d+) removed')
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.template = os.path.join(self.directory, 'Business_Card.sla')
+        self.data = os.path.join(self.directory, 'Business_Card.csv')
+        self.output = os.path.join(self.directory, 'output')
+        shutil.copy(os.path.join(EXAMPLE, 'Business_Card.sla'), self.template)
+
+        self.rows = [
+            ['person%02d' % number, 'Director', 'person%02d' % number, 'sun.pdf', 'Blue1', 'Blue2', 'Blue3', 'FreeMono', '17']
+            for number in range(1, 11)
+        ]
+
+        # log file & template cache of this test only
+        self.environment = dict(os.environ, HOME=self.directory, XDG_CACHE_HOME=self.directory)
+
+
+    def generate(self, *options):
+        # (generated, skipped, removed) file counts of an incremental generation
+        with open(self.data, 'w', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerows([FIELDS] + self.rows)
+
+        result = subprocess.run(
+            [sys.executable, CLI, '-f', 'sla', '--incremental', '-n', '%VAR_name%', '-o', self.output] + list(options) + [self.template],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=self.environment, check=True
+        )
+
+        return tuple(int(count) for count in SUMMARY.search(result.stdout + result.stderr).groups())
+
+
+    def files(self):
+        # content of the files generated, by name
+        files = {}
+
+        for name in os.listdir(self.output):
+            if not name.startswith('.'):
+                with open(os.path.join(self.output, name), 'rb') as file:
+                    files[name] = file.read()
+
+        return files
+
+
+    def test_incremental(self):
+        self.assertEqual(self.generate(), (10, 0, 0))
+        files = self.files()
+        self.assertEqual(sorted(files), ['person%02d.sla' % number for number in range(1, 11)])
+
+        # nothing changed
+        self.assertEqual(self.generate(), (0, 10, 0))
+        self.assertEqual(self.files(), files)
+
+        # one record changed
+        self.rows[2][1] = 'Manager'
+        self.assertEqual(self.generate(), (1, 9, 0))
+        changed = self.files()
+        self.assertNotEqual(changed.pop('person03.sla'), files.pop('person03.sla'))
+        self.assertEqual(changed, files)
+
+        # one record added, the last one removed
+        self.rows.append(['person11'] + self.rows[0][1:])
+        self.assertEqual(self.generate(), (1, 10, 0))
+        del self.rows[-2]
+        self.assertEqual(self.generate(), (1, 9, 1))
+        self.assertNotIn('person10.sla', self.files())
+        self.assertIn('person11.sla', self.files())
+
+        # records after a removed one moved: they are generated again, as their
+        # position (eg %VAR_COUNT%) may change their file
+        del self.rows[4]
+        self.assertEqual(self.generate(), (5, 4, 1))
+        self.assertNotIn('person05.sla', self.files())
+
+
+    def test_template_changed(self):
+        self.assertEqual(self.generate(), (10, 0, 0))
+
+        with open(self.template, 'rb') as file:
+            template = file.read()
+
+        with open(self.template, 'wb') as file:
+            file.write(template.replace(b'Blue', b'Red'))
+
+        self.assertEqual(self.generate(), (10, 0, 0))
+
+
+    def test_options_changed(self):
+        self.assertEqual(self.generate(), (10, 0, 0))
+        self.assertEqual(self.generate('--lastrow', '5'), (5, 0, 5))
+        self.assertEqual(sorted(self.files()), ['person%02d.sla' % number for number in range(1, 6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
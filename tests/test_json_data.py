@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the data records read from a JSON data file (see load_json), that are
+# decoded one by one: as json.load() would, for any size of the blocks read.
+# Run from the repository with: python -m unittest discover tests
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ScribusGeneratorBackend
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject
+
+VALID = [
+    '[]', '  [ ]\n', '[{"a": 1}]', '[{"a": 1} , {"b": "x,]"},\n {}]', '[ {"a": 12345} ,\n {"a": 6} ]\n', '{"a": 1}'
+]
+MALFORMED = [
+    '[,,{"a": 1},,]', '[{"a": 1}{"b": 2}]', '[{"a": 1},]', '[,]', '[{"a": 1}', '[{"a": 1},', '[{"a": 1}] x', '[{"a": 1}]]'
+]
+
+
+def setUpModule():
+    # log records are not written to the log file of the user
+    ScribusGeneratorBackend._logging_configured = True
+
+
+class JSONDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.json_file = os.path.join(self.directory.name, 'data.json')
+
+
+    def load(self, text, chunk_size):
+        with open(self.json_file, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+        generator = ScribusGenerator(GeneratorDataObject(saveSettings=CONST.FALSE))
+
+        with mock.patch.object(CONST, 'JSON_CHUNK_SIZE', chunk_size):
+            return list(generator.load_json(self.json_file))
+
+
+    def test_valid(self):
+        for text in VALID:
+            expected = json.loads(text)
+            expected = [item for item in (expected if isinstance(expected, list) else [expected]) if item]
+
+            for chunk_size in (1, 3, 65536):
+                self.assertEqual(self.load(text, chunk_size), expected, (text, chunk_size))
+
+
+    def test_malformed(self):
+        for text in MALFORMED:
+            with self.assertRaises(ValueError):
+                json.loads(text)
+
+            for chunk_size in (1, 3, 65536):
+                with self.assertRaises(json.JSONDecodeError, msg=(text, chunk_size)):
+                    self.load(text, chunk_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of PDFExportPool with a stub Scribus executable (see stub_scribus.py),
+# run from the repository with: python -m unittest discover tests
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ScribusGeneratorBackend import PDFExportPool
+
+STUB_SCRIBUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_scribus.py')
+
+
+class PDFExportPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+
+    def files(self, *names):
+        return [
+            (os.path.join(self.directory.name, name + '.sla'), os.path.join(self.directory.name, name + '.pdf'))
+            for name in names
+        ]
+
+
+    def export(self, pdf_files, processes=2, executable=STUB_SCRIBUS, timeout=None):
+        exported = []
+        lock = threading.Lock()
+
+        def record(position):
+            with lock:
+                exported.append(position)
+
+        results = PDFExportPool(processes, executable, timeout=timeout).export(pdf_files, record)
+
+        return (results, sorted(exported))
+
+
+    def test_success(self):
+        pdf_files = self.files('card1', 'card2', 'card3', 'card4', 'card5')
+        (results, exported) = self.export(pdf_files)
+
+        self.assertEqual(results, [(sla_file, pdf_file, None) for (sla_file, pdf_file) in pdf_files])
+        self.assertEqual(exported, [0, 1, 2, 3, 4])
+
+        for (sla_file, pdf_file) in pdf_files:
+            with open(pdf_file) as file:
+                self.assertEqual(file.read(), os.path.basename(sla_file))
+
+
+    def test_crash(self):
+        # the file being exported fails, the process is restarted for the next ones
+        pdf_files = self.files('card1', 'crash2', 'card3', 'card4')
+        (results, exported) = self.export(pdf_files, processes=1)
+
+        self.assertEqual(results[1], pdf_files[1] + ('Scribus process exited with code 3',))
+        self.assertEqual([error for (sla_file, pdf_file, error) in results], [None, results[1][2], None, None])
+        self.assertEqual(exported, [0, 2, 3])
+        self.assertFalse(os.path.exists(pdf_files[1][1]))
+
+
+    def test_traceback(self):
+        pdf_files = self.files('card1', 'fail2', 'card3')
+        (results, exported) = self.export(pdf_files)
+
+        error = results[1][2]
+        self.assertIn('Traceback', error)
+        self.assertIn('RuntimeError: Could not export fail2.sla', error)
+        self.assertIsNone(results[0][2])
+        self.assertIsNone(results[2][2])
+        self.assertEqual(exported, [0, 2])
+
+
+    def test_timeout(self):
+        # the process that does not reply in time is killed, and restarted for the next files
+        pdf_files = self.files('card1', 'hang2', 'card3')
+        (results, exported) = self.export(pdf_files, processes=1, timeout=2)
+
+        self.assertTrue(results[1][2].startswith('Scribus process did not export the file within 2 seconds'))
+        self.assertIsNone(results[0][2])
+        self.assertIsNone(results[2][2])
+        self.assertEqual(exported, [0, 2])
+
+
+    def test_missing_executable(self):
+        pdf_files = self.files('card1', 'card2')
+        (results, exported) = self.export(pdf_files, executable=os.path.join(self.directory.name, 'scribus'))
+
+        for (sla_file, pdf_file, error) in results:
+            self.assertTrue(error.startswith('Could not start'))
+
+        self.assertEqual(exported, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
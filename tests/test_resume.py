@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the generation resumed after an interrupted run (--resume, see
+# GenerationCheckpoint), run from the repository with: python -m unittest discover tests
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ScribusGeneratorBackend
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example')
+
+
+def setUpModule():
+    # log records are not written to the log file of the user
+    ScribusGeneratorBackend._logging_configured = True
+
+
+class Interrupted(Exception):
+    pass
+
+
+class ResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.template = os.path.join(self.directory.name, 'card.sla')
+        shutil.copy(os.path.join(EXAMPLE, 'Business_Card.sla'), self.template)
+        shutil.copy(os.path.join(EXAMPLE, 'Business_Card_long.csv'), os.path.join(self.directory.name, 'card.csv'))
+        self.checkpoint = os.path.join(self.directory.name, 'out', CONST.CHECKPOINT_FILE % 'card')
+
+
+    def generate(self, output, fail_after=None, **options):
+        # files generated in directory *output*, and documents rendered to generate them,
+        # interrupted after *fail_after* documents
+        rendered = []
+        generate_file = ScribusGenerator.generate_file
+
+        def render(generator, template, buffer, index, *args):
+            if len(rendered) == fail_after:
+                raise Interrupted()
+
+            rendered.append(index)
+
+            return generate_file(generator, template, buffer, index, *args)
+
+        generator = ScribusGenerator(GeneratorDataObject(
+            scribusSourceFile=self.template, dataSourceFile=os.path.join(self.directory.name, 'card.csv'),
+            outputDirectory=os.path.join(self.directory.name, output), outputFormat=CONST.FORMAT_SLA,
+            saveSettings=CONST.FALSE, templateCache=CONST.FALSE, resume=CONST.TRUE, **options
+        ))
+
+        with mock.patch.object(ScribusGenerator, 'generate_file', render):
+            generator.run()
+
+        return rendered
+
+
+    def files(self, output):
+        # content of the files generated in directory *output*, by name
+        files = {}
+
+        for name in os.listdir(os.path.join(self.directory.name, output)):
+            with open(os.path.join(self.directory.name, output, name), 'rb') as file:
+                files[name] = file.read()
+
+        return files
+
+
+    def test_resume(self):
+        expected = self.generate('expected')
+        self.assertEqual(len(expected), 155)
+
+        with self.assertRaises(Interrupted):
+            self.generate('out', fail_after=60)
+
+        self.assertTrue(os.path.isfile(self.checkpoint))
+
+        # only the documents not completed yet are rendered again
+        resumed = self.generate('out')
+        self.assertTrue(resumed)
+        self.assertLessEqual(len(resumed), len(expected) - 50)
+        self.assertEqual(resumed, expected[-len(resumed):])
+
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertEqual(self.files('out'), self.files('expected'))
+
+
+    def test_other_generation(self):
+        with self.assertRaises(Interrupted):
+            self.generate('out', fail_after=60)
+
+        # the journal of another generation in the same directory is not resumed
+        self.assertEqual(len(self.generate('out', lastRow='100')), 100)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+
+    @unittest.skipUnless(os.name == 'posix', 'temporary files are only removed on POSIX')
+    def test_stale_temp_files(self):
+        with self.assertRaises(Interrupted):
+            self.generate('out', fail_after=10)
+
+        with open(self.checkpoint, encoding='utf-8') as file:
+            key = json.loads(file.readline())['run'][:16]
+
+        # files of a killed process of this run are removed, not those of others
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        host = ScribusGeneratorBackend._host_name()
+        stale = 'tmp0123456789ab.%s.%s.%s.part' % (process.pid, host, key)
+        kept = [
+            'tmp0123456789ab.%s.other-host.%s.part' % (process.pid, key),
+            'tmp0123456789ab.%s.%s.0123456789abcdef.part' % (process.pid, host),
+            'tmp0123456789ab.%s.%s.part' % (process.pid, host),
+            'tmp0123456789ab.%s.%s.%s.part' % (os.getpid(), host, key),
+        ]
+
+        for name in [stale] + kept:
+            open(os.path.join(self.directory.name, 'out', name), 'w').close()
+
+        self.generate('out')
+        names = os.listdir(os.path.join(self.directory.name, 'out'))
+        self.assertNotIn(stale, names)
+
+        for name in kept:
+            self.assertIn(name, names)
+
+
+if __name__ == '__main__':
+    unittest.main()
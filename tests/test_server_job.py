@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the jobs run by the generation server (see run_job),
+# run from the repository with: python -m unittest discover tests
+
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ScribusGeneratorBackend
+from ScribusGeneratorServer import run_job
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example')
+ROWS = [{'name': 'Ann', 'position': 'CEO'}, {'name': 'Bob', 'position': 'CTO'}]
+
+
+def setUpModule():
+    # log records are not written to the log file of the user
+    ScribusGeneratorBackend._logging_configured = True
+
+
+class ServerJobTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.template = os.path.join(self.directory.name, 'card.sla')
+        shutil.copy(os.path.join(EXAMPLE, 'Business_Card.sla'), self.template)
+
+    def test_files(self):
+        output_directory = os.path.join(self.directory.name, 'out')
+        os.mkdir(output_directory)
+        result = run_job({'template': self.template, 'rows': ROWS,
+                          'options': {'outputDirectory': output_directory}})
+
+        self.assertEqual(len(result['outputs']), 2)
+        self.assertNotIn('content', result)
+        for path in result['outputs']:
+            self.assertTrue(os.path.isfile(path))
+
+    def test_content(self):
+        # content is generated in memory, the output directory is not even needed
+        output_directory = os.path.join(self.directory.name, 'missing')
+        result = run_job({'template': self.template, 'rows': ROWS, 'content': True,
+                          'options': {'outputDirectory': output_directory}})
+
+        self.assertEqual(len(result['outputs']), 2)
+        self.assertEqual(sorted(result['content']), sorted(result['outputs']))
+        self.assertFalse(os.path.exists(output_directory))
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['card.sla'])
+
+        for path in result['outputs']:
+            self.assertEqual(os.path.dirname(path), output_directory)
+            self.assertTrue(path.endswith('.sla'))
+            self.assertIn(b'<SCRIBUSUTF8NEW', base64.b64decode(result['content'][path]))
+
+        (ann, bob) = [base64.b64decode(result['content'][path]) for path in result['outputs']]
+        self.assertIn(b'Ann', ann)
+        self.assertIn(b'Bob', bob)
+
+
+if __name__ == '__main__':
+    unittest.main()
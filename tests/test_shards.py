@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the generation split in shards (--shard, --shard-mode) and of their
+# check (--check-shards) by the command line.
+# Run from the repository with: python -m unittest discover tests
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPOSITORY, 'ScribusGeneratorCLI.py')
+EXAMPLE = os.path.join(REPOSITORY, 'example')
+
+sys.path.insert(0, REPOSITORY)
+
+from ScribusGeneratorBackend import Shard
+
+
+class ShardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.template = os.path.join(self.directory, 'Business_Card.sla')
+        shutil.copy(os.path.join(EXAMPLE, 'Business_Card.sla'), self.template)
+        shutil.copy(os.path.join(EXAMPLE, 'Business_Card_long.csv'), os.path.join(self.directory, 'Business_Card.csv'))
+
+        # log file & template cache of this test only
+        self.environment = dict(os.environ, HOME=self.directory, XDG_CACHE_HOME=self.directory)
+
+
+    def generate(self, output, *options, check=True):
+        return subprocess.run(
+            [sys.executable, CLI, '-f', 'sla', '-o', os.path.join(self.directory, output)] + list(options) + [self.template],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=self.environment, check=check
+        )
+
+
+    def files(self, output):
+        # content of the files generated in directory *output*, by name (not the manifests)
+        files = {}
+
+        for name in os.listdir(os.path.join(self.directory, output)):
+            if not name.startswith('.'):
+                with open(os.path.join(self.directory, output, name), 'rb') as file:
+                    files[name] = file.read()
+
+        return files
+
+
+    def check(self, output):
+        # exit status of --check-shards, and the problems it logs
+        result = self.generate(output, '--check-shards', check=False)
+
+        return (result.returncode, result.stdout + result.stderr)
+
+
+    def test_batches(self):
+        # each document is in one shard
+        for mode in Shard.MODES:
+            for (total, count) in ((0, 1), (1, 3), (10, 3), (155, 4), (7, 7), (5, 8)):
+                documents = [document for number in range(1, count + 1)
+                             for document in Shard(number, count, mode).batches(total)]
+
+                self.assertEqual(sorted(documents), list(range(total)), (mode, total, count))
+
+
+    def test_parse(self):
+        shard = Shard.parse('2/3', 'round-robin')
+        self.assertEqual((shard.number, shard.count, shard.mode, shard.name), (2, 3, 'round-robin', '2-of-3'))
+
+        for text in ('2', '0/3', '4/3', 'a/b', '1/0'):
+            with self.assertRaises(ValueError, msg=text):
+                Shard.parse(text)
+
+
+    def test_shards(self):
+        self.generate('expected')
+        expected = self.files('expected')
+        self.assertEqual(len(expected), 155)
+
+        for mode in Shard.MODES:
+            output = 'out-' + mode
+
+            for number in (1, 2, 3):
+                self.generate(output, '--shard', '%s/3' % number, '--shard-mode', mode)
+                self.assertEqual(self.check(output)[0], 0 if number == 3 else 1)
+
+            self.assertEqual(self.files(output), expected, mode)
+
+
+    def test_check_shards(self):
+        (status, problems) = self.check('out')
+        self.assertEqual(status, 1)
+        self.assertIn(b'no shard manifest', problems)
+
+        self.generate('out', '--shard', '1/3')
+        self.generate('out', '--shard', '3/3')
+        (status, problems) = self.check('out')
+        self.assertEqual(status, 1)
+        self.assertIn(b'shard 2/3 did not complete', problems)
+        self.assertIn(b'not generated by any shard', problems)
+
+        # shards of another generation are not mixed up with these
+        self.generate('out', '--shard', '2/3', '--lastrow', '100')
+        (status, problems) = self.check('out')
+        self.assertEqual(status, 1)
+        self.assertIn(b'different generations', problems)
+
+        self.generate('out', '--shard', '2/3')
+        self.assertEqual(self.check('out')[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Tests of the data records read from a SQLite data file (see load_sqlite),
+# run from the repository with: python -m unittest discover tests
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ScribusGeneratorBackend
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject
+
+NAMES = ['name%02d' % number for number in range(1, 11)]
+
+
+def setUpModule():
+    # log records are not written to the log file of the user
+    ScribusGeneratorBackend._logging_configured = True
+
+
+class SQLiteDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db_file = os.path.join(self.directory.name, 'data.sqlite')
+
+        connection = sqlite3.connect(self.db_file)
+        connection.execute('CREATE TABLE "my ""card"" table" (name TEXT, position INTEGER)')
+        connection.executemany('INSERT INTO "my ""card"" table" VALUES (?, ?)', [
+            (name, position) for (position, name) in enumerate(NAMES)
+        ])
+        connection.execute('CREATE TABLE other (name TEXT)')
+        connection.commit()
+        connection.close()
+
+
+    def records(self, query, first_row=CONST.EMPTY, last_row=CONST.EMPTY):
+        # names of the records read, and as counted
+        generator = ScribusGenerator(GeneratorDataObject(
+            dataSourceFile=self.db_file, dataQuery=query, firstRow=first_row, lastRow=last_row, saveSettings=CONST.FALSE
+        ))
+        names = [record['name'] for record in generator.parse_data()]
+
+        self.assertEqual(generator.count_data(), len(names))
+
+        return names
+
+
+    def test_query(self):
+        self.assertEqual(self.records('SELECT name FROM "my ""card"" table" ORDER BY position DESC'), NAMES[::-1])
+
+
+    def test_query_comments(self):
+        table = '"my ""card"" table"'
+
+        for query in (
+            'SELECT name FROM %s -- all cards' % table,
+            'SELECT name FROM %s; -- all cards\n' % table,
+            'SELECT name FROM %s /* all cards */ ;\n\n' % table,
+            '-- all cards\nSELECT name FROM %s;; /* done */ -- really' % table,
+        ):
+            self.assertEqual(self.records(query), NAMES, query)
+
+
+    def test_query_semicolon(self):
+        # semicolons within literals do not end the query
+        self.assertEqual(self.records("SELECT 'a;b' AS name; -- literal"), ['a;b'])
+
+
+    def test_table_name(self):
+        self.assertEqual(self.records('my "card" table'), NAMES)
+        self.assertEqual(self.records('  my "card" table\n', '3', '4'), NAMES[2:4])
+
+
+    def test_range(self):
+        # rows of the data range only are read, by LIMIT & OFFSET
+        query = 'SELECT name FROM "my ""card"" table" ORDER BY position; -- in order'
+
+        for (first_row, last_row, names) in (
+            ('1', '10', NAMES), ('3', CONST.EMPTY, NAMES[2:]), ('3', '4', NAMES[2:4]), (CONST.EMPTY, '5', NAMES[:5]),
+            ('10', '10', NAMES[9:]), ('0', '2', NAMES[:2]), ('8', '20', NAMES[7:]), ('11', CONST.EMPTY, []),
+            ('5', '3', []), (CONST.EMPTY, '0', []),
+        ):
+            self.assertEqual(self.records(query, first_row, last_row), names, (first_row, last_row))
+
+
+if __name__ == '__main__':
+    unittest.main()
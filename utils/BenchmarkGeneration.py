@@ -0,0 +1,370 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+#
+# reproducible benchmark of the generation: synthesizes a SLA template & a CSV/JSON dataset of
+# configurable size, then times (best of --repeat runs) and measures the memory high-water mark
+# (tracemalloc, in a separate run) of:
+#   generate_templates  one SLA file per batch of records, with an already loaded dataset
+#   substitute_data     one-shot substitution of each batch of records in the template lines
+#   render              substitution of each batch of records in the compiled template
+#   write_sla_file      writing the parsed documents of all batches
+#   merge               merge-mode generation end to end, as run() from the command line
+# on the synthetic workload and on the templates of the example directory (fixed reference
+# workloads). Results are written as JSON, and compared with those of a previous run to spot
+# regressions between versions. run, for instance:
+#    python ./BenchmarkGeneration.py --output results-4.0.json
+#    python ./BenchmarkGeneration.py --pages 20 --frames 30 --rows 5000 --compare results-4.0.json
+#    python ./BenchmarkGeneration.py --no-examples --next-records 3 --format json --value-length 200
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject, CompiledTemplate
+
+example = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example')
+
+# (template, data) of the reference workloads, relative to the example directory
+EXAMPLES = [
+    ('Business_Card.sla', 'Business_Card.csv'),
+    ('Business_Card_scribus15.sla', 'Business_Card.csv'),
+    ('Business_Card.sla', 'Business_Card.json'),
+    ('Next_Record.sla', 'Next_Record.csv'),
+    ('linked_frames.sla', 'linked_frames.csv'),
+    ('linked_frames_scribus15.sla', 'linked_frames.csv'),
+    ('DynamicOutFile.sla', 'DynamicOutFile.csv'),
+    (os.path.join('MonsterCards', 'MonsterCards.sla'), os.path.join('MonsterCards', 'MonsterCards.csv'))
+]
+
+MEASURES = ('generate_templates', 'substitute_data', 'render', 'write_sla_file', 'merge')
+
+PAGE_HEIGHT = 841.89
+PAGE_GAP = 40
+FONTS = ['Arial Regular', 'DejaVu Sans', 'FreeMono']
+
+parser = argparse.ArgumentParser(description='Reproducible benchmark of ScribusGenerator.')
+parser.add_argument('--pages', type=int, default=4, help='pages of the synthetic template. Default is 4.')
+parser.add_argument('--frames', type=int, default=10, help='text frames per page. Default is 10.')
+parser.add_argument('--variables', type=int, default=3, help='variables per text frame. Default is 3.')
+parser.add_argument('--columns', type=int, default=12, help='data columns used by the variables. Default is 12.')
+parser.add_argument('--next-records', type=int, default=0, dest='nextRecords',
+                    help='%s tokens in the template, each document then consumes one more record. Default is 0.' % CONST.NEXT_RECORD.replace('%', '%%'))
+parser.add_argument('--sg-attributes', type=int, default=1, dest='sgAttributes',
+                    help='text frames per page whose font is set by a SGAttribute. Default is 1.')
+parser.add_argument('--linked', type=int, default=2,
+                    help='text frames per page linked in a chain. Default is 2.')
+parser.add_argument('--scribus-version', default='1.5.8', dest='scribusVersion',
+                    help='Scribus version of the synthetic template, 1.4.x links frames by position. Default is 1.5.8.')
+parser.add_argument('--rows', type=int, default=500, help='data rows of the synthetic dataset. Default is 500.')
+parser.add_argument('--value-length', type=int, default=20, dest='valueLength',
+                    help='length of the synthetic data values. Default is 20.')
+parser.add_argument('--empty-ratio', type=float, default=0.1, dest='emptyRatio',
+                    help='ratio of empty data values, whose texts are removed. Default is 0.1.')
+parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='format of the synthetic dataset. Default is csv.')
+parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic dataset. Default is 0.')
+parser.add_argument('--repeat', type=int, default=3, help='runs of each measure, the best time is kept. Default is 3.')
+parser.add_argument('--no-examples', action='store_false', default=True, dest='examples',
+                    help='only run the synthetic workload.')
+parser.add_argument('--no-synthetic', action='store_false', default=True, dest='synthetic',
+                    help='only run the reference workloads of the example directory.')
+parser.add_argument('--output', default=None, help='JSON file where results are written.')
+parser.add_argument('--compare', default=None, help='JSON results of a previous run, to compare with.')
+parser.add_argument('--threshold', type=float, default=0.1,
+                    help='relative increase of time or memory reported as a regression by --compare. Default is 0.1.')
+
+
+def synthesize_template(args, sla_file):
+    # SLA template of args.pages pages of args.frames text frames, each with args.variables
+    # variables in separate paragraphs. NEXT_RECORD tokens are spread over the frames.
+    by_position = args.scribusVersion.startswith('1.4')
+    frames = args.pages * args.frames
+    next_records = set((k + 1) * frames // (args.nextRecords + 1) for k in range(args.nextRecords))
+    step = (PAGE_HEIGHT - 80) / max(args.frames, 1)
+    lines = []
+
+    lines.append('<?xml version="1.0" encoding="UTF-8"?>')
+    lines.append('<SCRIBUSUTF8NEW Version="%s">' % args.scribusVersion)
+    lines.append('    <DOCUMENT ANZPAGES="%s" PAGEWIDTH="595.28" PAGEHEIGHT="%s" BOOK="0" FIRSTNUM="1" GapHorizontal="0" GapVertical="%s" DOCCONTRIB="" TITLE="benchmark">'
+                 % (args.pages, PAGE_HEIGHT, PAGE_GAP))
+    lines.append('        <COLOR NAME="Black" CMYK="#000000ff"/>')
+    lines.append('        <COLOR NAME="White" CMYK="#00000000"/>')
+
+    for page in range(args.pages):
+        lines.append('        <PAGE PAGEXPOS="100" PAGEYPOS="%s" PAGEWIDTH="595.28" PAGEHEIGHT="%s" NUM="%s" NAM="" MNAM="Normal"/>'
+                     % (20 + page * (PAGE_HEIGHT + PAGE_GAP), PAGE_HEIGHT, page))
+
+    for page in range(args.pages):
+        for frame in range(args.frames):
+            number = page * args.frames + frame
+            item_id = 1000 + number
+
+            # chain of the first linked frames of the page
+            linked = frame < args.linked
+            next_item = back_item = -1
+
+            if linked and frame + 1 < min(args.linked, args.frames):
+                next_item = number + 1 if by_position else item_id + 1
+
+            if linked and frame > 0:
+                back_item = number - 1 if by_position else item_id - 1
+
+            lines.append(
+                '        <PAGEOBJECT XPOS="140" YPOS="%.2f" OwnPage="%s" ItemID="%s" PTYPE="4" WIDTH="400" HEIGHT="%.2f" FRTYPE="0" NEXTITEM="%s" BACKITEM="%s" ANNAME="Text%s">'
+                % (20 + page * (PAGE_HEIGHT + PAGE_GAP) + 40 + frame * step, page, item_id, step, next_item, back_item, number)
+            )
+
+            for variable in range(args.variables):
+                column = (number * args.variables + variable) % args.columns
+
+                if variable:
+                    lines.append('            <para/>')
+
+                lines.append('            <ITEXT CH="%%VAR_col%s%%"/>' % column)
+
+            if number in next_records:
+                lines.append('            <ITEXT CH=%s/>' % quoteattr(CONST.NEXT_RECORD))
+
+            lines.append('            <trail/>')
+
+            if frame < args.sgAttributes:
+                lines.append('            <PageItemAttributes>')
+                lines.append('                <ItemAttribute Name="FONT" Type="none" Value="%VAR_font%" Parameter="SGAttribute" Relationship="none" RelationshipTo="//ITEXT" AutoAddTo="none"/>')
+                lines.append('            </PageItemAttributes>')
+
+            lines.append('        </PAGEOBJECT>')
+
+    lines.append('    </DOCUMENT>')
+    lines.append('</SCRIBUSUTF8NEW>')
+
+    with open(sla_file, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(lines) + '\n')
+
+
+def synthesize_data(args, data_file):
+    # args.rows records of random values, args.emptyRatio of them empty.
+    rng = random.Random(args.seed)
+    alphabet = string.ascii_letters + string.digits + '   &<"'
+    headers = ['col%s' % column for column in range(args.columns)] + ['font']
+    rows = []
+
+    for row in range(args.rows):
+        values = [
+            '' if rng.random() < args.emptyRatio else ''.join(rng.choice(alphabet) for i in range(args.valueLength))
+            for column in range(args.columns)
+        ]
+        rows.append(values + [FONTS[row % len(FONTS)]])
+
+    if args.format == 'json':
+        with open(data_file, 'w', encoding='utf-8') as file:
+            json.dump([dict(zip(headers, values)) for values in rows], file)
+
+    else:
+        with open(data_file, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(headers)
+            writer.writerows(rows)
+
+
+def measure(function, repeat):
+    # best time of *repeat* runs, and peak of memory allocated by another run
+    best = None
+
+    for run in range(repeat):
+        prepared = function()
+        start = time.perf_counter()
+        prepared()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    prepared = function()
+    tracemalloc.start()
+    prepared()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def data_object(template_file, data_file, output_directory, single=False):
+    return GeneratorDataObject(
+        scribusSourceFile=template_file, dataSourceFile=data_file, outputDirectory=output_directory,
+        outputFormat=CONST.FORMAT_SLA, singleOutput=single, saveSettings=CONST.FALSE, templateCache=CONST.FALSE
+    )
+
+
+def run_workload(template_file, data_file, repeat):
+    # results of all MEASURES on a template & its data. Each measure is a function
+    # preparing its input (not timed) and returning the function to time.
+    output_directory = tempfile.mkdtemp(prefix='sg-benchmark-')
+
+    try:
+        generator = ScribusGenerator(data_object(template_file, data_file, output_directory))
+
+        records = list(generator.parse_data())
+        headers = list(records[0].keys())
+        root = ET.parse(template_file).getroot()
+        records_in_document = 1 + ET.tostring(root, encoding='unicode').count(CONST.NEXT_RECORD)
+        template_text = ET.tostring(generator.overwrite_with_sg_attributes(root), method='xml').decode()
+        template = CompiledTemplate(template_text, CONST.KEEP_TAB_LINEBREAK)
+        batches = [
+            (first + 1, generator.encode_scribus_xml(records[first:first + records_in_document]))
+            for first in range(0, len(records), records_in_document)
+        ]
+
+        def generate_templates():
+            template_root = ET.parse(template_file).getroot()
+
+            return lambda: generator.generate_templates(template_root, records, len(records))
+
+        def substitute_data():
+            lines = template_text.split('\n')
+
+            def run():
+                for (first, data) in batches:
+                    generator.substitute_data(headers, data, lines, CONST.KEEP_TAB_LINEBREAK, index_first_of_batch=first)
+
+            return run
+
+        def render():
+            def run():
+                for (first, data) in batches:
+                    template.render(headers, data, first)
+
+            return run
+
+        def write_sla_file():
+            generator.headers = headers
+            documents = [ET.fromstring(template.render(headers, data, first)) for (first, data) in batches]
+
+            def run():
+                for (position, element) in enumerate(documents):
+                    generator.write_sla_file(element, 'document-%s' % position)
+
+            return run
+
+        def merge():
+            merge_generator = ScribusGenerator(data_object(template_file, data_file, output_directory, single=True))
+
+            return merge_generator.run
+
+        functions = {
+            'generate_templates': generate_templates, 'substitute_data': substitute_data, 'render': render,
+            'write_sla_file': write_sla_file, 'merge': merge
+        }
+        results = {'records': len(records), 'template_bytes': os.path.getsize(template_file)}
+
+        for name in MEASURES:
+            results[name] = measure(functions[name], repeat)
+            print('  %-20s %9.4f s %10.1f KiB peak' % (name, results[name]['seconds'], results[name]['peak_bytes'] / 1024.0))
+
+        return results
+
+    finally:
+        shutil.rmtree(output_directory)
+
+
+def compare(results, previous, threshold):
+    # print the relative change of each measure, returns the number of regressions
+    regressions = 0
+    ignored = ('output', 'compare', 'threshold', 'repeat', 'examples', 'synthetic')
+    config = dict((key, value) for (key, value) in results['config'].items() if key not in ignored)
+    previous_config = dict((key, value) for (key, value) in previous.get('config', {}).items() if key not in ignored)
+
+    if config != previous_config:
+        print('warning: the synthetic workload differs from the one of the previous results')
+
+    for (workload, measures) in sorted(results['workloads'].items()):
+        before = previous.get('workloads', {}).get(workload)
+
+        if before is None:
+            continue
+
+        for name in MEASURES:
+            if name not in measures or name not in before:
+                continue
+
+            for (key, label) in (('seconds', 'time'), ('peak_bytes', 'memory')):
+                if not before[name][key]:
+                    continue
+
+                change = measures[name][key] / float(before[name][key]) - 1
+
+                if change > threshold:
+                    regressions += 1
+                    print('REGRESSION %-40s %-20s %-6s %+.1f%%' % (workload, name, label, change * 100))
+
+    print('%s regression(s) above %.0f%% compared to ScribusGenerator v%s' % (
+        regressions, threshold * 100, previous.get('version')
+    ))
+
+    return regressions
+
+
+def main(argv):
+    args = parser.parse_args(argv[1:])
+
+    # logs of the generator would be timed too
+    logging.disable(logging.CRITICAL)
+
+    results = {
+        'version': CONST.SG_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'workloads': {}
+    }
+
+    if args.synthetic:
+        directory = tempfile.mkdtemp(prefix='sg-benchmark-')
+
+        try:
+            template_file = os.path.join(directory, 'synthetic.sla')
+            data_file = os.path.join(directory, 'synthetic.' + args.format)
+
+            synthesize_template(args, template_file)
+            synthesize_data(args, data_file)
+
+            print('synthetic: %s pages of %s frames, %s rows (%s)' % (args.pages, args.frames, args.rows, args.format))
+            results['workloads']['synthetic'] = run_workload(template_file, data_file, args.repeat)
+
+        finally:
+            shutil.rmtree(directory)
+
+    if args.examples:
+        for (template_name, data_name) in EXAMPLES:
+            workload = 'example/%s:%s' % (template_name.replace(os.sep, '/'), os.path.splitext(data_name)[1][1:])
+
+            print(workload)
+            results['workloads'][workload] = run_workload(
+                os.path.join(example, template_name), os.path.join(example, data_name), args.repeat
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+        print('results written to %s' % args.output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            previous = json.load(file)
+
+        if compare(results, previous, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
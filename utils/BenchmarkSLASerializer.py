@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+#
+# compare the indented output of generated SLA files: minidom pretty-print of the serialized
+# document (ScribusGenerator up to v4.0) and SLASerializer, on the documents generated from
+# a template and its data (MonsterCards example by default). Checks both outputs are identical.
+# run, for instance:
+#    python ./BenchmarkSLASerializer.py
+#    python ./BenchmarkSLASerializer.py ~/ScribusProjects/template.sla ~/ScribusProjects/data.csv 5
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ScribusGeneratorBackend import CONST, ScribusGenerator, GeneratorDataObject, CompiledTemplate, SLASerializer
+
+example = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example', 'MonsterCards')
+template_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(example, 'MonsterCards.sla')
+data_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(example, 'MonsterCards.csv')
+repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+
+def render_documents():
+    # documents of all data records, substituted & cleaned as by the generator
+    generator = ScribusGenerator(GeneratorDataObject(scribusSourceFile=template_file, dataSourceFile=data_file))
+    root = ET.parse(template_file).getroot()
+    records = 1 + ET.tostring(root, encoding='unicode').count(CONST.NEXT_RECORD)
+    template = CompiledTemplate(ET.tostring(generator.overwrite_with_sg_attributes(root), method='xml').decode(), CONST.KEEP_TAB_LINEBREAK)
+
+    data = list(generator.parse_data())
+    headers = list(data[0].keys())
+    documents = []
+
+    for first in range(0, len(data), records):
+        buffer = data[first:first + records]
+        element = ET.fromstring(template.render(headers, generator.encode_scribus_xml(buffer), first + 1))
+        generator.remove_empty_texts(element)
+        documents.append(element)
+
+    return documents
+
+
+def write_minidom(element, sla_file):
+    with open(sla_file, 'w', encoding='utf-8') as file:
+        file.write(minidom.parseString(ET.tostring(element)).toprettyxml(indent="   "))
+
+
+def write_serializer(element, sla_file):
+    with open(sla_file, 'w', encoding='utf-8') as file:
+        SLASerializer().write_document(file.write, element)
+
+
+def measure(write, documents, directory):
+    # best time of *repeat* runs, and peak of memory allocated while writing
+    best = None
+
+    for run in range(repeat):
+        start = time.perf_counter()
+
+        for position, element in enumerate(documents):
+            write(element, os.path.join(directory, '%s.sla' % position))
+
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+
+    for position, element in enumerate(documents):
+        write(element, os.path.join(directory, '%s.sla' % position))
+
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+
+documents = render_documents()
+print('%s documents generated from %s' % (len(documents), os.path.basename(template_file)))
+
+with tempfile.TemporaryDirectory() as minidom_directory, tempfile.TemporaryDirectory() as serializer_directory:
+    results = [
+        ('minidom', measure(write_minidom, documents, minidom_directory)),
+        ('SLASerializer', measure(write_serializer, documents, serializer_directory))
+    ]
+
+    for name, (elapsed, peak) in results:
+        print('%-14s %8.3f s %10.1f KiB peak' % (name, elapsed, peak / 1024.0))
+
+    print('speedup: %.1fx, memory: %.1fx less' % (
+        results[0][1][0] / results[1][1][0], results[0][1][1] / float(results[1][1][1])
+    ))
+
+    for position in range(len(documents)):
+        with open(os.path.join(minidom_directory, '%s.sla' % position), 'rb') as expected, \
+                open(os.path.join(serializer_directory, '%s.sla' % position), 'rb') as actual:
+            if expected.read() != actual.read():
+                print('output differs for document %s' % position)
+                sys.exit(1)
+
+    print('outputs are identical')